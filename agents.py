@@ -1,4 +1,10 @@
+import asyncio
+import functools
+import heapq
+import itertools
 import json
+import threading
+import time
 from swarm import Agent
 from cdp import *
 from typing import List, Dict, Any
@@ -10,51 +16,114 @@ from web3 import Web3
 from web3.exceptions import ContractLogicError
 from cdp.errors import ApiError, UnsupportedAssetError
 import requests
+import numpy as np
+from moralis_client import moralis_client
+from moralis_async import AsyncMoralisClient
+from wallet_provider import WalletProvider
+from tool_executor import MUTATING, READ_ONLY
+from tx_tracker import TransactionTracker
+from nft_minting import bulk_mint, read_recipients_csv
+from basenames import BasenameEncoder, bulk_register
+from tool_output import compact_record, compact_table
+from market_store import MarketSnapshotStore
+from token_screener import TokenTable, merge_token_responses
+from rebalancing import (RebalancePlan, parse_target_weights, plan_rebalance,
+                         rule_weights, target_vector)
 
 # Get configuration from environment variables
 API_KEY_NAME = os.environ.get("CDP_API_KEY_NAME")
 PRIVATE_KEY = os.environ.get("CDP_PRIVATE_KEY", "").replace('\\n', '\n')
 MORALIS_API_KEY = os.environ.get("MORALIS_API_KEY")
+MORALIS_FANOUT_CONCURRENCY = int(os.environ.get("MORALIS_FANOUT_CONCURRENCY", "8"))
+MORALIS_FANOUT_TIMEOUT = float(os.environ.get("MORALIS_FANOUT_TIMEOUT", "10"))
+
+# "verbose" returns labelled prose from the market data tools, "compact" a
+# dense table of the decision-relevant fields, ranked and cut to the limits below
+TOOL_OUTPUT_MODE = os.environ.get("TOOL_OUTPUT_MODE", "verbose")
+TOOL_OUTPUT_LIMITS = {
+    "get_wallet_tokens": {"top_k": 30, "max_chars": 2500},
+    "get_trending_tokens": {"top_k": 20, "max_chars": 2000},
+    "analyze_trending_tokens": {"top_k": 25, "max_chars": 3500},
+    "get_wallet_pnl": {"top_k": 20, "max_chars": 2000},
+    "get_token_pairs": {"top_k": 5, "max_chars": 1000},
+    "get_token_metadata_batch": {"top_k": None, "max_chars": 3000},
+    "get_wallet_nfts": {"top_k": 30, "max_chars": 2500},
+    "screen_trending_tokens": {"top_k": None, "max_chars": 3000},
+}
+# Token ids listed per NFT collection by get_wallet_nfts
+NFT_SAMPLE_TOKEN_IDS = 5
+
+# Every trending/details/pairs response the tools receive is recorded here,
+# so the agent can look at price history without re-querying Moralis.
+# Set MARKET_STORE_DIR to an empty string to disable recording.
+MARKET_STORE_DIR = os.environ.get("MARKET_STORE_DIR", "market_data")
+market_store = MarketSnapshotStore(MARKET_STORE_DIR) if MARKET_STORE_DIR else None
+if market_store is not None:
+    moralis_client.add_response_hook(market_store.ingest_moralis_response)
 
 # Configure CDP with environment variables
 Cdp.configure(API_KEY_NAME, PRIVATE_KEY)
 
-# Create a new wallet on the Base Sepolia testnet
-# You could make this a function for the agent to create a wallet on any network
-# If you want to use Base Mainnet, change Wallet.create() to Wallet.create(network_id="base-mainnet")
+# The agent's wallet is loaded lazily on first use, so importing this module
+# makes no CDP API calls. An existing wallet is reused from CDP_WALLET_DATA_FILE
+# (exported wallet data) or CDP_WALLET_SEED_FILE (seed saved with save_seed);
+# otherwise a new wallet is created on CDP_NETWORK_ID and its seed is saved.
+# If you want to use Base Mainnet, set CDP_NETWORK_ID=base-mainnet
 # see https://docs.cdp.coinbase.com/mpc-wallet/docs/wallets for more information
-# agent_wallet = Wallet.create(network_id="base-mainnet")
-
-
-
-# NOTE: the wallet is not currently persisted, meaning that it will be deleted after the agent is stopped. To persist the wallet, see https://docs.cdp.coinbase.com/mpc-wallet/docs/wallets#developer-managed-wallets
-# Here's an example of how to persist the wallet:
-# WARNING: This is for development only - implement secure storage in production!
-
-# # Export wallet data (contains seed and wallet ID)
-# wallet_data = agent_wallet.export_data()
-# wallet_dict = wallet_data.to_dict()
-
-# # Example of saving to encrypted local file
-# file_path = "wallet_seed.json"
-# agent_wallet.save_seed(file_path, encrypt=True)
-# print(f"Seed for wallet {agent_wallet.id} saved to {file_path}")
+# WARNING: The seed file is for development only - implement secure storage in production!
+wallet_provider = WalletProvider(
+    network_id=os.environ.get("CDP_NETWORK_ID", "base-sepolia"),
+    seed_file=os.environ.get("CDP_WALLET_SEED_FILE", "wallet_seed.json"),
+    wallet_data_file=os.environ.get("CDP_WALLET_DATA_FILE"),
+    wallet_id=os.environ.get("CDP_WALLET_ID"),
+)
 
-# Create a new wallet on the Base Sepolia testnet
-agent_wallet = Wallet.create(network_id="base-sepolia")
+# How onchain tools handle their transactions: "wait" blocks until the
+# transaction confirms, "track" returns a handle right away and confirms it in
+# the background (see get_transaction_status)
+TX_SUBMIT_MODE = os.environ.get("TX_SUBMIT_MODE", "wait")
+tx_tracker = TransactionTracker(
+    poll_interval=float(os.environ.get("TX_POLL_INTERVAL", "2")))
+# Confirms the transactions of bulk_mint_nft and bulk_register_basenames, kept
+# apart so a bulk run doesn't flood get_transaction_status and the triggers
+bulk_tx_tracker = TransactionTracker(
+    poll_interval=float(os.environ.get("TX_POLL_INTERVAL", "2")))
+# Maximum submitted but unconfirmed mints during bulk_mint_nft
+BULK_MINT_MAX_IN_FLIGHT = int(os.environ.get("BULK_MINT_MAX_IN_FLIGHT", "25"))
+# Maximum submitted but unconfirmed registrations during bulk_register_basenames
+BULK_BASENAME_MAX_IN_FLIGHT = int(os.environ.get("BULK_BASENAME_MAX_IN_FLIGHT", "10"))
+
+# Holdings considered by plan_portfolio_rebalance, and the fee and slippage it budgets per swap
+REBALANCE_MAX_ASSETS = int(os.environ.get("REBALANCE_MAX_ASSETS", "500"))
+REBALANCE_FEE_BPS = float(os.environ.get("REBALANCE_FEE_BPS", "30"))
+REBALANCE_SLIPPAGE_BPS = float(os.environ.get("REBALANCE_SLIPPAGE_BPS", "50"))
+# Plans computed by plan_portfolio_rebalance, waiting for execute_rebalance_plan
+# (plan_portfolio_rebalance is read-only, so several calls may run at once)
+rebalance_plans: Dict[str, RebalancePlan] = {}
+_rebalance_plan_ids = itertools.count(1)
+_rebalance_plans_lock = threading.Lock()
+
+
+def confirm_or_track(kind: str, operation, description: str,
+                     on_confirmed) -> str:
+    """
+    Wait for a submitted CDP operation, or hand it to the background tracker.
 
-# Save the wallet seed for future use
-file_path = "wallet_seed.json"
-agent_wallet.save_seed(file_path, encrypt=True)
-print(f"Seed for wallet {agent_wallet.id} saved to {file_path} (Base Sepolia)")
+    Args:
+        kind (str): Operation type, e.g. "swap"
+        operation: CDP SmartContract, ContractInvocation or Trade
+        description (str): Human readable description of the operation
+        on_confirmed (Callable): Builds the success message from the confirmed operation
 
-# Example of importing previously exported wallet data:
-# imported_wallet = Wallet.import_data(wallet_dict)
+    Returns:
+        str: The success message, or the transaction handle in track mode
+    """
+    if TX_SUBMIT_MODE != "track":
+        operation.wait()
+        return on_confirmed(operation)
 
-# Request funds from the faucet (only works on testnet)
-faucet = agent_wallet.faucet()
-print(f"Faucet transaction: {faucet}")
-print(f"Agent wallet address: {agent_wallet.default_address.address_id}")
+    handle_id = tx_tracker.submit(kind, operation, description, on_confirmed)
+    return f"Submitted {description}. Transaction handle: {handle_id}. Use get_transaction_status to check whether it confirmed."
 
 
 # Function to create a new ERC-20 token
@@ -70,9 +139,11 @@ def create_token(name, symbol, initial_supply):
     Returns:
         str: A message confirming the token creation with details
     """
-    deployed_contract = agent_wallet.deploy_token(name, symbol, initial_supply)
-    deployed_contract.wait()
-    return f"Token {name} ({symbol}) created with initial supply of {initial_supply} and contract address {deployed_contract.contract_address}"
+    deployed_contract = wallet_provider.wallet.deploy_token(name, symbol, initial_supply)
+    return confirm_or_track(
+        "create_token", deployed_contract,
+        f"deployment of token {name} ({symbol})",
+        lambda contract: f"Token {name} ({symbol}) created with initial supply of {initial_supply} and contract address {contract.contract_address}")
 
 
 # Function to request ETH from the faucet (testnet only)
@@ -83,10 +154,10 @@ def request_eth_from_faucet():
     Returns:
         str: Status message about the faucet request
     """
-    if agent_wallet.network_id == "base-mainnet":
+    if wallet_provider.network_id == "base-mainnet":
         return "Error: The faucet is only available on Base Sepolia testnet."
 
-    faucet_tx = agent_wallet.faucet()
+    faucet_tx = wallet_provider.request_faucet()
     return f"Requested ETH from faucet. Transaction: {faucet_tx}"
 
 
@@ -132,11 +203,12 @@ def deploy_nft(name, symbol, base_uri):
         str: Status message about the NFT deployment, including the contract address
     """
     try:
-        deployed_nft = agent_wallet.deploy_nft(name, symbol, base_uri)
-        deployed_nft.wait()
-        contract_address = deployed_nft.contract_address
+        deployed_nft = wallet_provider.wallet.deploy_nft(name, symbol, base_uri)
 
-        return f"Successfully deployed NFT contract '{name}' ({symbol}) at address {contract_address} with base URI: {base_uri}"
+        return confirm_or_track(
+            "deploy_nft", deployed_nft,
+            f"deployment of NFT contract '{name}' ({symbol})",
+            lambda contract: f"Successfully deployed NFT contract '{name}' ({symbol}) at address {contract.contract_address} with base URI: {base_uri}")
 
     except Exception as e:
         return f"Error deploying NFT contract: {str(e)}"
@@ -157,16 +229,60 @@ def mint_nft(contract_address, mint_to):
     try:
         mint_args = {"to": mint_to, "quantity": "1"}
 
-        mint_invocation = agent_wallet.invoke_contract(
+        mint_invocation = wallet_provider.wallet.invoke_contract(
             contract_address=contract_address, method="mint", args=mint_args)
-        mint_invocation.wait()
 
-        return f"Successfully minted NFT to {mint_to}"
+        return confirm_or_track("mint_nft", mint_invocation,
+                                f"NFT mint to {mint_to}",
+                                lambda _: f"Successfully minted NFT to {mint_to}")
 
     except Exception as e:
         return f"Error minting NFT: {str(e)}"
 
 
+# Function to mint NFTs to many recipients
+def bulk_mint_nft(contract_address: str,
+                  recipients: str = "",
+                  csv_path: str = "",
+                  quantity: int = 1,
+                  checkpoint_path: str = ""):
+    """
+    Mint NFTs to many addresses in one call, e.g. for an airdrop.
+    Mints are submitted without waiting on each one and confirmed in batches.
+    Rerunning with the same checkpoint file resumes after the last confirmed mint.
+
+    Args:
+        contract_address (str): Address of the NFT contract
+        recipients (str): Comma-separated recipient addresses
+        csv_path (str): CSV file of recipients (address, optional quantity), used with or instead of recipients
+        quantity (int): Number of NFTs to mint to each recipient without a CSV quantity
+        checkpoint_path (str): Checkpoint file for resuming; defaults to one per contract
+
+    Returns:
+        str: Summary of confirmed and failed mints and the throughput in mints per minute
+    """
+    try:
+        mint_list = [(address, quantity)
+                     for address in parse_address_list(recipients)]
+        if csv_path:
+            mint_list.extend(read_recipients_csv(csv_path, quantity))
+        if not mint_list:
+            return "Error: No recipients provided."
+
+        report = bulk_mint(
+            wallet_provider.wallet,
+            contract_address,
+            mint_list,
+            checkpoint_path=checkpoint_path
+            or f"mint_checkpoint_{contract_address.lower()}.jsonl",
+            max_in_flight=BULK_MINT_MAX_IN_FLIGHT,
+            tracker=bulk_tx_tracker)
+        return report.summary()
+
+    except Exception as e:
+        return f"Error bulk minting NFTs: {str(e)}"
+
+
 # Function to swap assets (only works on Base Mainnet)
 def swap_assets(amount: Union[int, float, Decimal], from_asset_id: str,
                 to_asset_id: str):
@@ -182,17 +298,159 @@ def swap_assets(amount: Union[int, float, Decimal], from_asset_id: str,
     Returns:
         str: Status message about the swap
     """
-    if agent_wallet.network_id != "base-mainnet":
+    if wallet_provider.network_id != "base-mainnet":
         return "Error: Asset swaps are only available on Base Mainnet. Current network is not Base Mainnet."
 
     try:
-        trade = agent_wallet.trade(amount, from_asset_id, to_asset_id)
-        trade.wait()
-        return f"Successfully swapped {amount} {from_asset_id} for {to_asset_id}"
+        trade = wallet_provider.wallet.trade(amount, from_asset_id, to_asset_id)
+        return confirm_or_track(
+            "swap", trade, f"swap of {amount} {from_asset_id} for {to_asset_id}",
+            lambda _: f"Successfully swapped {amount} {from_asset_id} for {to_asset_id}")
     except Exception as e:
         return f"Error swapping assets: {str(e)}"
 
 
+# Function to plan a whole portfolio rebalance without executing it
+def plan_portfolio_rebalance(target_weights: str = "",
+                             rule: str = "",
+                             sell_unlisted: bool = False,
+                             min_trade_usd: float = 10.0,
+                             drift_threshold_pct: float = 1.0) -> str:
+    """
+    Compute every swap needed to move the wallet to target weights, without trading.
+    Give either target_weights or a rule. Execute the returned plan with execute_rebalance_plan.
+
+    Args:
+        target_weights (str): Comma-separated asset:weight pairs, assets by symbol or contract address, e.g. "ETH:50,USDC:30,0xabc...:20"
+        rule (str): Instead of target weights, "equal" for equal weights or "cap:<pct>" to cap every holding at pct percent
+        sell_unlisted (bool): Sell holdings missing from target_weights instead of leaving them alone
+        min_trade_usd (float): Skip trades smaller than this many USD
+        drift_threshold_pct (float): Skip assets whose weight is within this many percentage points of the target
+
+    Returns:
+        str: The plan id and its swaps, largest first, or an error message
+    """
+    if not target_weights and not rule:
+        return "Error: Provide target_weights or a rule."
+
+    is_mainnet = wallet_provider.network_id in ["base", "base-mainnet"]
+    chain = "base" if is_mainnet else "base sepolia"
+
+    try:
+        holdings = top_wallet_holdings(wallet_provider.address_id,
+                                       chain,
+                                       top_n=REBALANCE_MAX_ASSETS,
+                                       fresh=True)
+        assets = ["eth" if token.get("native_token") else token["token_address"]
+                  for token in holdings]
+        symbols = [token.get("symbol") or asset for token, asset in zip(holdings, assets)]
+        balances = [float(token.get("balance_formatted") or 0) for token in holdings]
+        prices = [float(token.get("usd_price") or 0) for token in holdings]
+
+        if target_weights:
+            weights = parse_target_weights(target_weights)
+            keys = [(symbol, token.get("token_address"), asset)
+                    for symbol, token, asset in zip(symbols, holdings, assets)]
+            known = {key.lower() for asset_keys in keys for key in asset_keys if key}
+            # Targets the wallet doesn't hold yet are only bought, so they need no price
+            for key in weights:
+                if key not in known:
+                    assets.append(key)
+                    symbols.append(key if key.startswith("0x") else key.upper())
+                    balances.append(0.0)
+                    prices.append(0.0)
+                    keys.append((key,))
+            targets = target_vector(keys, weights)
+            if not sell_unlisted:
+                listed = [any(key and key.lower() in weights for key in asset_keys)
+                          for asset_keys in keys]
+                assets, symbols, balances, prices, targets = (
+                    [asset for asset, keep in zip(assets, listed) if keep],
+                    [symbol for symbol, keep in zip(symbols, listed) if keep],
+                    [balance for balance, keep in zip(balances, listed) if keep],
+                    [price for price, keep in zip(prices, listed) if keep],
+                    targets[np.array(listed, dtype=bool)])
+        else:
+            values = np.array(balances) * np.array(prices)
+            priced = values > 0
+            assets = [asset for asset, keep in zip(assets, priced) if keep]
+            symbols = [symbol for symbol, keep in zip(symbols, priced) if keep]
+            balances = [balance for balance, keep in zip(balances, priced) if keep]
+            prices = [price for price, keep in zip(prices, priced) if keep]
+            if not assets:
+                return "Error: The wallet holds no priced assets to rebalance."
+            targets = rule_weights(rule, values[priced])
+
+        plan = plan_rebalance(assets,
+                              symbols,
+                              balances,
+                              prices,
+                              targets,
+                              min_trade_usd=min_trade_usd,
+                              drift_threshold=drift_threshold_pct / 100,
+                              fee_bps=REBALANCE_FEE_BPS,
+                              slippage_bps=REBALANCE_SLIPPAGE_BPS)
+        if not plan.swaps:
+            return "No swaps needed.\n" + plan.summary()
+        with _rebalance_plans_lock:
+            plan_id = f"plan-{next(_rebalance_plan_ids)}"
+            rebalance_plans[plan_id] = plan
+        return f"Plan {plan_id}:\n{plan.summary()}\nExecute it with execute_rebalance_plan(\"{plan_id}\")."
+
+    except requests.exceptions.RequestException as e:
+        return f"Error fetching wallet tokens: {str(e)}"
+    except ValueError as e:
+        return f"Error planning rebalance: {str(e)}"
+
+
+# Function to execute a plan from plan_portfolio_rebalance
+def execute_rebalance_plan(plan_id: str) -> str:
+    """
+    Execute every swap of a rebalance plan, in the planned order.
+    This function only works on Base Mainnet.
+
+    Args:
+        plan_id (str): Plan id returned by plan_portfolio_rebalance
+
+    Returns:
+        str: The outcome of each swap
+    """
+    if wallet_provider.network_id != "base-mainnet":
+        return "Error: Asset swaps are only available on Base Mainnet. Current network is not Base Mainnet."
+    with _rebalance_plans_lock:
+        plan = rebalance_plans.pop(plan_id, None)
+    if plan is None:
+        return f"Error: Unknown or already executed rebalance plan {plan_id}."
+    results = [swap_assets(swap.amount, swap.from_asset, swap.to_asset)
+               for swap in plan.swaps]
+    failed = sum(1 for result in results if result.startswith("Error"))
+    return (f"Executed {plan_id}: {len(results) - failed}/{len(results)} swaps succeeded or submitted.\n"
+            + "\n".join(f"{i}. {result}" for i, result in enumerate(results, 1)))
+
+
+# Function to check on transactions submitted in track mode
+def get_transaction_status(handle_id: str = "") -> str:
+    """
+    Report whether transactions submitted in the background are pending, confirmed or failed.
+
+    Args:
+        handle_id (str): Transaction handle returned by an onchain tool; leave empty to list all
+
+    Returns:
+        str: Status of the transaction(s)
+    """
+    if handle_id:
+        tracked = tx_tracker.get(handle_id)
+        if tracked is None:
+            return f"Error: Unknown transaction handle {handle_id}."
+        return tracked.summary()
+
+    tracked_transactions = tx_tracker.all()
+    if not tracked_transactions:
+        return "No transactions are being tracked."
+    return "\n".join(tracked.summary() for tracked in tracked_transactions)
+
+
 # Contract addresses for Basenames
 BASENAMES_REGISTRAR_CONTROLLER_ADDRESS_MAINNET = "0x4cCb0BB02FCABA27e82a56646E81d8c5bC4119a5"
 BASENAMES_REGISTRAR_CONTROLLER_ADDRESS_TESTNET = "0x49aE3cC2e3AA768B1e5654f5D3C6002144A59581"
@@ -214,32 +472,72 @@ def create_register_contract_method_args(base_name: str, address_id: str,
     Returns:
         dict: Formatted arguments for the register contract method
     """
-    w3 = Web3()
-
-    resolver_contract = w3.eth.contract(abi=l2_resolver_abi)
-
-    name_hash = w3.ens.namehash(base_name)
+    encoder = basename_encoder(is_mainnet)
+    return encoder.register_args(encoder.label(base_name), address_id)
+
+
+@functools.lru_cache(maxsize=None)
+def basename_encoder(is_mainnet: bool) -> BasenameEncoder:
+    """The register() argument encoder of the network's parent domain, built once."""
+    if is_mainnet:
+        return BasenameEncoder(".base.eth", L2_RESOLVER_ADDRESS_MAINNET)
+    return BasenameEncoder(".basetest.eth", L2_RESOLVER_ADDRESS_TESTNET)
+
+
+def basename_available(label: str) -> bool:
+    """Ask the registrar controller whether a label is still free; a read call, so no gas is paid."""
+    is_mainnet = wallet_provider.network_id == "base-mainnet"
+    return bool(SmartContract.read(
+        wallet_provider.network_id,
+        BASENAMES_REGISTRAR_CONTROLLER_ADDRESS_MAINNET
+        if is_mainnet else BASENAMES_REGISTRAR_CONTROLLER_ADDRESS_TESTNET,
+        "available",
+        abi=registrar_abi,
+        args={"name": label}))
+
+
+# Function to register many basenames
+def bulk_register_basenames(basenames: str,
+                            amount_per_name: float = 0.002,
+                            check_availability: bool = True,
+                            checkpoint_path: str = ""):
+    """
+    Register many basenames for the agent's wallet in one call.
+    Invalid, duplicate and already taken names are skipped before anything is paid.
+    Registrations are submitted without waiting on each one and confirmed together.
 
-    address_data = resolver_contract.encode_abi("setAddr",
-                                                args=[name_hash, address_id])
+    Args:
+        basenames (str): Comma-separated basenames, with or without the .base.eth/.basetest.eth suffix
+        amount_per_name (float): Amount of ETH to pay per registration (default 0.002)
+        check_availability (bool): Ask the registrar which names are still free before registering
+        checkpoint_path (str): Checkpoint file for resuming; defaults to one per wallet
 
-    name_data = resolver_contract.encode_abi("setName",
-                                             args=[name_hash, base_name])
+    Returns:
+        str: The result of every name
+    """
+    names = [name for name in basenames.split(",") if name.strip()]
+    if not names:
+        return "Error: No basenames provided."
+    is_mainnet = wallet_provider.network_id == "base-mainnet"
 
-    register_args = {
-        "request": [
-            base_name.replace(".base.eth" if is_mainnet else ".basetest.eth",
-                              ""),
-            address_id,
-            "31557600",  # 1 year in seconds
-            L2_RESOLVER_ADDRESS_MAINNET
-            if is_mainnet else L2_RESOLVER_ADDRESS_TESTNET,
-            [address_data, name_data],
-            True
-        ]
-    }
+    try:
+        report = bulk_register(
+            wallet_provider.wallet,
+            names,
+            basename_encoder(is_mainnet),
+            BASENAMES_REGISTRAR_CONTROLLER_ADDRESS_MAINNET
+            if is_mainnet else BASENAMES_REGISTRAR_CONTROLLER_ADDRESS_TESTNET,
+            registrar_abi,
+            amount=amount_per_name,
+            is_available=basename_available if check_availability else None,
+            checkpoint_path=checkpoint_path
+            or f"basename_checkpoint_{wallet_provider.address_id.lower()}.jsonl",
+            max_in_flight=BULK_BASENAME_MAX_IN_FLIGHT,
+            tracker=bulk_tx_tracker)
+        return report.summary()
 
-    return register_args
+    except Exception as e:
+        return f"Error bulk registering basenames: {str(e)}"
 
 
 # Function to register a basename
@@ -254,8 +552,8 @@ def register_basename(basename: str, amount: float = 0.002):
     Returns:
         str: Status message about the basename registration
     """
-    address_id = agent_wallet.default_address.address_id
-    is_mainnet = agent_wallet.network_id == "base-mainnet"
+    address_id = wallet_provider.address_id
+    is_mainnet = wallet_provider.network_id == "base-mainnet"
 
     suffix = ".base.eth" if is_mainnet else ".basetest.eth"
     if not basename.endswith(suffix):
@@ -269,7 +567,7 @@ def register_basename(basename: str, amount: float = 0.002):
                             if is_mainnet else
                             BASENAMES_REGISTRAR_CONTROLLER_ADDRESS_TESTNET)
 
-        invocation = agent_wallet.invoke_contract(
+        invocation = wallet_provider.wallet.invoke_contract(
             contract_address=contract_address,
             method="register",
             args=register_args,
@@ -277,14 +575,46 @@ def register_basename(basename: str, amount: float = 0.002):
             amount=amount,
             asset_id="eth",
         )
-        invocation.wait()
-        return f"Successfully registered basename {basename} for address {address_id}"
+        return confirm_or_track(
+            "register_basename", invocation,
+            f"registration of basename {basename}",
+            lambda _: f"Successfully registered basename {basename} for address {address_id}")
     except ContractLogicError as e:
         return f"Error registering basename: {str(e)}"
     except Exception as e:
         return f"Unexpected error registering basename: {str(e)}"
 
 
+def format_token_metadata(token_data: dict) -> str:
+    """
+    Format a Moralis ERC-20 metadata record for the agent.
+
+    Args:
+        token_data (dict): One entry of the /erc20/metadata response
+
+    Returns:
+        str: The token metadata as labelled lines
+    """
+    if TOOL_OUTPUT_MODE == "compact":
+        return compact_record([
+            ("symbol", token_data.get("symbol")),
+            ("name", token_data.get("name")),
+            ("decimals", token_data.get("decimals")),
+            ("supply", token_data.get("total_supply_formatted")),
+            ("verified", token_data.get("verified_contract")),
+            ("address", token_data.get("address")),
+        ]) + "\n"
+    return (
+        f"Token Name: {token_data.get('name')}\n"
+        f"Symbol: {token_data.get('symbol')}\n"
+        f"Decimals: {token_data.get('decimals')}\n"
+        f"Total Supply: {token_data.get('total_supply_formatted')}\n"
+        f"Contract Address: {token_data.get('address')}\n"
+        f"Verified: {token_data.get('verified_contract')}\n"
+        f"Logo URL: {token_data.get('logo')}\n"
+    )
+
+
 def get_token_metadata(token_address: str) -> str:
     """
     Fetch metadata for an ERC-20 token using the Moralis API.
@@ -301,37 +631,16 @@ def get_token_metadata(token_address: str) -> str:
         return "Error: Moralis API key is missing. Please set the MORALIS_API_KEY environment variable."
 
     # Determine the network dynamically based on the agent's current network ID
-    is_mainnet = agent_wallet.network_id in ["base", "base-mainnet"]
+    is_mainnet = wallet_provider.network_id in ["base", "base-mainnet"]
     chain = "base" if is_mainnet else "base sepolia"
 
-    # API endpoint and headers
-    url = "https://deep-index.moralis.io/api/v2.2/erc20/metadata"
-    headers = {
-        "accept": "application/json",
-        "X-API-Key": MORALIS_API_KEY
-    }
-    params = {
-        "chain": chain,
-        "addresses[0]": token_address
-    }
-
     # Fetch token metadata
     try:
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        metadata = response.json()
-
-        if metadata:
-            token_data = metadata[0]
-            return (
-                f"Token Name: {token_data.get('name')}\n"
-                f"Symbol: {token_data.get('symbol')}\n"
-                f"Decimals: {token_data.get('decimals')}\n"
-                f"Total Supply: {token_data.get('total_supply_formatted')}\n"
-                f"Contract Address: {token_data.get('address')}\n"
-                f"Verified: {token_data.get('verified_contract')}\n"
-                f"Logo URL: {token_data.get('logo')}\n"
-            )
+        token_data = moralis_client.get_erc20_metadata([token_address],
+                                                       chain)[0]
+
+        if token_data:
+            return format_token_metadata(token_data)
         else:
             return "No metadata found for the provided token address."
 
@@ -339,37 +648,181 @@ def get_token_metadata(token_address: str) -> str:
         return f"Error fetching token metadata: {str(e)}"
 
 
-def get_wallet_tokens() -> str:
+def parse_address_list(addresses: Union[str, List[str]]) -> List[str]:
     """
-    Fetch the list of ERC-20 tokens held by the agent's wallet using the Moralis API.
+    Split a comma or whitespace separated address string into a list.
+    Swarm describes every non-builtin parameter type to the model as a string,
+    so list-valued tool arguments arrive in this form.
+
+    Args:
+        addresses (Union[str, List[str]]): Addresses as a string or an already split list
 
     Returns:
-        str: A message with the list of tokens and balances or an error message if unsuccessful
+        List[str]: The non-empty addresses in order
     """
-    # Get the agent's wallet address
-    address_id = agent_wallet.default_address.address_id
+    if isinstance(addresses, str):
+        addresses = addresses.replace(",", " ").split()
+    return [address.strip() for address in addresses if address.strip()]
+
+
+def get_token_metadata_batch(token_addresses: str) -> str:
+    """
+    Fetch metadata for several ERC-20 tokens at once using the Moralis API.
+    Prefer this over repeated get_token_metadata calls when evaluating many tokens.
+
+    Args:
+        token_addresses (str): Comma-separated addresses of the ERC-20 tokens
+
+    Returns:
+        str: The metadata of each token in input order, or an error message if unsuccessful
+    """
+    if not MORALIS_API_KEY:
+        return "Error: Moralis API key is missing. Please set the MORALIS_API_KEY environment variable."
+
+    token_addresses = parse_address_list(token_addresses)
+    if not token_addresses:
+        return "Error: No token addresses provided."
 
     # Determine the network dynamically based on the agent's current network ID
-    is_mainnet = agent_wallet.network_id in ["base", "base-mainnet"]
+    is_mainnet = wallet_provider.network_id in ["base", "base-mainnet"]
     chain = "base" if is_mainnet else "base sepolia"
 
-    # API endpoint and headers
-    url = f"https://deep-index.moralis.io/api/v2.2/wallets/{address_id}/tokens"
-    headers = {
-        "accept": "application/json",
-        "X-API-Key": MORALIS_API_KEY
-    }
+    try:
+        metadata = moralis_client.get_erc20_metadata(token_addresses, chain)
+    except requests.exceptions.RequestException as e:
+        return f"Error fetching token metadata: {str(e)}"
+
+    if TOOL_OUTPUT_MODE == "compact":
+        return compact_table(
+            "Token metadata",
+            [token_data or {"address": token_address}
+             for token_address, token_data in zip(token_addresses, metadata)],
+            [
+                ("symbol", lambda t: t.get("symbol")),
+                ("name", lambda t: t.get("name")),
+                ("decimals", lambda t: t.get("decimals")),
+                ("verified", lambda t: t.get("verified_contract")),
+                ("address", lambda t: t.get("address")),
+            ],
+            **TOOL_OUTPUT_LIMITS["get_token_metadata_batch"])
+
+    return "\n".join(
+        format_token_metadata(token_data) if token_data else
+        f"Contract Address: {token_address}\nNo metadata found.\n"
+        for token_address, token_data in zip(token_addresses, metadata))
+
+
+def top_wallet_holdings(address_id: str,
+                        chain: str,
+                        top_n: int = 50,
+                        min_usd_value: float = 0.0,
+                        verified_only: bool = False,
+                        fresh: bool = False) -> List[dict]:
+    """
+    Return the most valuable ERC-20 holdings of a wallet, paging lazily through Moralis.
+
+    Moralis returns wallet tokens sorted by USD value, so paging stops as soon
+    as a holding falls below min_usd_value or can no longer make the top N,
+    as long as every value seen so far was in that order; if a page breaks
+    it, the remaining pages are scanned too. At most top_n holdings are kept
+    in memory regardless of wallet size.
+
+    Args:
+        address_id (str): Wallet address
+        chain (str): Moralis chain name
+        top_n (int): Number of holdings to return
+        min_usd_value (float): Drop holdings worth less than this many USD
+        verified_only (bool): Drop tokens whose contract is not verified
+        fresh (bool): Bypass cached pages
+
+    Returns:
+        List[dict]: Moralis token entries sorted by USD value, highest first
+    """
     params = {
-        "chain": chain
+        "chain": chain,
+        "limit": 100,
+        "exclude_spam": "true",
     }
+    if verified_only:
+        params["exclude_unverified_contracts"] = "true"
+
+    heap = []
+    # Early exit relies on the descending order, so it is only taken while
+    # every value seen so far confirms it; otherwise the whole wallet is scanned
+    sorted_so_far = True
+    previous = float("inf")
+    for position, token in enumerate(
+            moralis_client.paginate(f"/wallets/{address_id}/tokens",
+                                    params,
+                                    fresh=fresh)):
+        usd_value = float(token.get("usd_value") or 0)
+        sorted_so_far = sorted_so_far and usd_value <= previous
+        previous = usd_value
+        if verified_only and not token.get("verified_contract"):
+            continue
+        if min_usd_value and usd_value < min_usd_value:
+            if sorted_so_far:
+                break
+            continue
+        if len(heap) >= top_n and usd_value <= heap[0][0]:
+            if sorted_so_far:
+                break
+            continue
+        entry = (usd_value, -position, token)
+        if len(heap) < top_n:
+            heapq.heappush(heap, entry)
+        else:
+            heapq.heapreplace(heap, entry)
+
+    return [token for _, _, token in sorted(heap, reverse=True)]
+
+
+def get_wallet_tokens(force_refresh: bool = False,
+                      top_n: int = 50,
+                      min_usd_value: float = 0.0,
+                      verified_only: bool = False) -> str:
+    """
+    Fetch the most valuable ERC-20 tokens held by the agent's wallet using the Moralis API.
+
+    Args:
+        force_refresh (bool): Bypass cached balances and prices, e.g. right before a swap
+        top_n (int): Maximum number of holdings to list, most valuable first
+        min_usd_value (float): Skip dust holdings worth less than this many USD
+        verified_only (bool): Skip tokens with unverified contracts
+
+    Returns:
+        str: A message with the list of tokens and balances or an error message if unsuccessful
+    """
+    # Get the agent's wallet address
+    address_id = wallet_provider.address_id
+
+    # Determine the network dynamically based on the agent's current network ID
+    is_mainnet = wallet_provider.network_id in ["base", "base-mainnet"]
+    chain = "base" if is_mainnet else "base sepolia"
 
     # Fetch wallet token balances
     try:
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        tokens = response.json().get("result", [])
+        tokens = top_wallet_holdings(address_id,
+                                     chain,
+                                     top_n=top_n,
+                                     min_usd_value=min_usd_value,
+                                     verified_only=verified_only,
+                                     fresh=force_refresh)
 
         # Format the output
+        if tokens and TOOL_OUTPUT_MODE == "compact":
+            return compact_table(
+                f"Tokens held by {address_id}",
+                tokens, [
+                    ("symbol", lambda t: t.get("symbol")),
+                    ("balance", lambda t: t.get("balance_formatted")),
+                    ("usd_price", lambda t: t.get("usd_price")),
+                    ("usd_value", lambda t: t.get("usd_value")),
+                    ("verified", lambda t: t.get("verified_contract")),
+                    ("address", lambda t: t.get("token_address")),
+                ],
+                rank_by=lambda t: t.get("usd_value"),
+                **TOOL_OUTPUT_LIMITS["get_wallet_tokens"])
         if tokens:
             token_list = "\n".join(
                 [
@@ -389,13 +842,16 @@ def get_wallet_tokens() -> str:
         return f"Error fetching wallet tokens: {str(e)}"
 
 
-def get_trending_tokens(security_score=80, min_market_cap=100000) -> str:
+def get_trending_tokens(security_score=80,
+                        min_market_cap=100000,
+                        force_refresh: bool = False) -> str:
     """
     Fetch trending tokens with a minimum security score and market cap.
 
     Args:
         security_score (int): Minimum security score for tokens
         min_market_cap (int): Minimum market cap for tokens
+        force_refresh (bool): Bypass the cached trending list, e.g. right before a swap
 
     Returns:
         str: Trending token information or an error message
@@ -405,14 +861,9 @@ def get_trending_tokens(security_score=80, min_market_cap=100000) -> str:
         return "Error: Moralis API key is missing. Please set the MORALIS_API_KEY environment variable."
     
     # Determine the network dynamically based on the agent's current network ID
-    is_mainnet = agent_wallet.network_id in ["base", "base-mainnet"]
+    is_mainnet = wallet_provider.network_id in ["base", "base-mainnet"]
     chain = "base" if is_mainnet else "base sepolia"
     
-    url = "https://deep-index.moralis.io/api/v2.2/discovery/tokens/trending"
-    headers = {
-        "accept": "application/json",
-        "X-API-Key": MORALIS_API_KEY
-    }
     params = {
         "chain": chain,  # Use the correct chain based on network
         "security_score": security_score,
@@ -420,15 +871,27 @@ def get_trending_tokens(security_score=80, min_market_cap=100000) -> str:
     }
 
     try:
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        tokens = response.json()
+        tokens = moralis_client.get("/discovery/tokens/trending",
+                                    params,
+                                    fresh=force_refresh)
         
         # Check if tokens were returned
         if not tokens:
             return "No trending tokens found matching the criteria. Try adjusting the security score or market cap parameters."
 
         # Format the output
+        if TOOL_OUTPUT_MODE == "compact":
+            return compact_table(
+                "Trending Tokens",
+                tokens, [
+                    ("symbol", lambda t: t.get("token_symbol")),
+                    ("price_usd", lambda t: t.get("price_usd")),
+                    ("market_cap", lambda t: t.get("market_cap")),
+                    ("security", lambda t: t.get("security_score")),
+                    ("address", lambda t: t.get("token_address")),
+                ],
+                rank_by=lambda t: t.get("market_cap"),
+                **TOOL_OUTPUT_LIMITS["get_trending_tokens"])
         token_info = "\n".join(
             [
                 f"Token Name: {token.get('token_name', 'Unknown')} ({token.get('token_symbol', 'Unknown')})\n"
@@ -456,23 +919,30 @@ def get_wallet_pnl() -> str:
         str: Wallet PnL data or an error message if unsuccessful
     """
     # Get the agent's wallet address
-    address_id = agent_wallet.default_address.address_id
+    address_id = wallet_provider.address_id
 
-    url = f"https://deep-index.moralis.io/api/v2.2/wallets/{address_id}/profitability"
-    headers = {
-        "accept": "application/json",
-        "X-API-Key": MORALIS_API_KEY
-    }
     params = {
         "chain": "base"
     }
 
     try:
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        pnl_data = response.json().get("result", [])
+        response = moralis_client.get(f"/wallets/{address_id}/profitability", params)
+        pnl_data = response.get("result", [])
 
         # Format the output
+        if pnl_data and TOOL_OUTPUT_MODE == "compact":
+            return compact_table(
+                f"Wallet PnL for {address_id}",
+                pnl_data, [
+                    ("symbol", lambda e: e.get("symbol")),
+                    ("invested_usd", lambda e: e.get("total_usd_invested")),
+                    ("realized_usd", lambda e: e.get("realized_profit_usd")),
+                    ("avg_buy_usd", lambda e: e.get("avg_buy_price_usd")),
+                    ("bought", lambda e: e.get("total_tokens_bought")),
+                    ("address", lambda e: e.get("token_address")),
+                ],
+                rank_by=lambda e: e.get("total_usd_invested"),
+                **TOOL_OUTPUT_LIMITS["get_wallet_pnl"])
         if pnl_data:
             pnl_info = "\n".join(
                 [
@@ -493,143 +963,478 @@ def get_wallet_pnl() -> str:
         return f"Error fetching wallet PnL: {str(e)}"
 
 
-def get_wallet_nfts() -> str:
+def get_wallet_nfts(max_nfts: int = 500) -> str:
     """
-    Fetch the raw response of NFTs held by the agent's wallet on the Base blockchain.
+    Summarize the NFTs held by the agent's wallet on the Base blockchain, grouped per collection.
     Automatically determines if the network is mainnet or testnet.
 
+    Args:
+        max_nfts (int): Stop after scanning this many NFTs
+
     Returns:
-        str: Raw JSON response of NFTs or an error message if unsuccessful.
+        str: NFT counts and token ids per collection, or an error message if unsuccessful.
     """
     # Get the agent's wallet address
-    wallet_address = agent_wallet.default_address.address_id
+    wallet_address = wallet_provider.address_id
 
     # Determine the network dynamically based on the agent's current network ID
-    is_mainnet = agent_wallet.network_id in ["base", "base-mainnet"]
+    is_mainnet = wallet_provider.network_id in ["base", "base-mainnet"]
     chain = "base" if is_mainnet else "base sepolia"
 
-    # API endpoint and headers
-    url = f"https://deep-index.moralis.io/api/v2.2/{wallet_address}/nft"
-    headers = {
-        "accept": "application/json",
-        "X-API-Key": MORALIS_API_KEY
-    }
     params = {
         "chain": chain,
         "format": "decimal",
-        "media_items": "false"
+        "media_items": "false",
+        "normalizeMetadata": "false",
+        "limit": 100,
     }
 
+    # Only the selected fields of each NFT are kept; metadata blobs are discarded as they stream in
+    collections = {}
+    scanned = 0
     try:
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        return response.text  # Return the raw JSON response as text
-
-    except requests.exceptions.RequestException as e:
+        for nft in moralis_client.stream_paginate(f"/{wallet_address}/nft",
+                                                  params):
+            contract = nft.get("token_address")
+            collection = collections.setdefault(contract, {
+                "contract": contract,
+                "name": nft.get("name"),
+                "type": nft.get("contract_type"),
+                "count": 0,
+                "amount": 0,
+                "token_ids": [],
+            })
+            collection["count"] += 1
+            collection["amount"] += int(nft.get("amount") or 1)
+            if len(collection["token_ids"]) < NFT_SAMPLE_TOKEN_IDS:
+                collection["token_ids"].append(nft.get("token_id"))
+            scanned += 1
+            if scanned >= max_nfts:
+                break
+
+    except (requests.exceptions.RequestException, ValueError) as e:
         return f"Error fetching wallet NFTs: {str(e)}"
 
-def get_token_pairs(token_address: str) -> str:
+    if not collections:
+        return f"No NFTs found for wallet {wallet_address}."
+
+    title = f"NFTs held by {wallet_address}: {scanned} NFTs in {len(collections)} collections"
+    if scanned >= max_nfts:
+        title += f" (stopped after {max_nfts})"
+
+    return compact_table(
+        title,
+        list(collections.values()), [
+            ("collection", lambda c: c["name"]),
+            ("type", lambda c: c["type"]),
+            ("nfts", lambda c: c["count"]),
+            ("amount", lambda c: c["amount"]),
+            ("token_ids", lambda c: " ".join(f"#{i}" for i in c["token_ids"]) +
+             (" ..." if c["count"] > len(c["token_ids"]) else "")),
+            ("contract", lambda c: c["contract"]),
+        ],
+        rank_by=lambda c: c["count"],
+        **TOOL_OUTPUT_LIMITS["get_wallet_nfts"])
+
+def format_token_pairs(token_address: str, pairs: List[dict]) -> str:
+    """
+    Format Moralis trading pair records for the agent.
+
+    Args:
+        token_address (str): The address of the ERC-20 token.
+        pairs (List[dict]): The "pairs" entries of the /erc20/{address}/pairs response.
+
+    Returns:
+        str: The trading pairs as labelled lines.
+    """
+    if not pairs:
+        return f"No trading pairs found for token {token_address}."
+
+    if TOOL_OUTPUT_MODE == "compact":
+        return compact_table(
+            f"Trading pairs for token {token_address}",
+            pairs, [
+                ("pair", lambda p: p.get("pair_label")),
+                ("usd_price", lambda p: p.get("usd_price")),
+                ("chg_24h_pct", lambda p: p.get("usd_price_24hr_percent_change")),
+                ("liquidity_usd", lambda p: p.get("liquidity_usd")),
+                ("exchange", lambda p: p.get("exchange_address")),
+            ],
+            rank_by=lambda p: p.get("liquidity_usd"),
+            **TOOL_OUTPUT_LIMITS["get_token_pairs"])
+
+    pairs_info = "\n".join(
+        [
+            f"Pair: {pair['pair_label']}\n"
+            f"Price (USD): {pair['usd_price']}\n"
+            f"24hr Price Change (%): {pair['usd_price_24hr_percent_change']}\n"
+            f"Liquidity (USD): {pair['liquidity_usd']}\n"
+            f"Exchange Address: {pair['exchange_address']}\n"
+            f"Base Token: {pair['pair'][0]['token_name']} ({pair['pair'][0]['token_symbol']})\n"
+            f"Quote Token: {pair['pair'][1]['token_name']} ({pair['pair'][1]['token_symbol']})\n"
+            for pair in pairs
+        ]
+    )
+    return f"Trading pairs for token {token_address}:\n{pairs_info}"
+
+
+def get_token_pairs(token_address: str, force_refresh: bool = False) -> str:
     """
     Fetch trading pairs for a specific ERC-20 token on the Base blockchain.
     Automatically determines if the network is mainnet or testnet.
 
     Args:
         token_address (str): The address of the ERC-20 token.
+        force_refresh (bool): Bypass cached prices, e.g. right before a swap.
 
     Returns:
         str: Information about trading pairs or an error message if unsuccessful.
     """
     # Determine the network dynamically based on the agent's current network ID
-    is_mainnet = agent_wallet.network_id in ["base", "base-mainnet"]
+    is_mainnet = wallet_provider.network_id in ["base", "base-mainnet"]
     chain = "base" if is_mainnet else "base sepolia"
 
-    # API endpoint and headers
-    url = f"https://deep-index.moralis.io/api/v2.2/erc20/{token_address}/pairs"
-    headers = {
-        "accept": "application/json",
-        "X-API-Key": MORALIS_API_KEY
-    }
     params = {
         "chain": chain
     }
 
     try:
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        pairs = response.json().get("pairs", [])
-
-        # Format the output
-        if pairs:
-            pairs_info = "\n".join(
-                [
-                    f"Pair: {pair['pair_label']}\n"
-                    f"Price (USD): {pair['usd_price']}\n"
-                    f"24hr Price Change (%): {pair['usd_price_24hr_percent_change']}\n"
-                    f"Liquidity (USD): {pair['liquidity_usd']}\n"
-                    f"Exchange Address: {pair['exchange_address']}\n"
-                    f"Base Token: {pair['pair'][0]['token_name']} ({pair['pair'][0]['token_symbol']})\n"
-                    f"Quote Token: {pair['pair'][1]['token_name']} ({pair['pair'][1]['token_symbol']})\n"
-                    for pair in pairs
-                ]
-            )
-            return f"Trading pairs for token {token_address}:\n{pairs_info}"
-        else:
-            return f"No trading pairs found for token {token_address}."
+        response = moralis_client.get(f"/erc20/{token_address}/pairs",
+                                      params,
+                                      fresh=force_refresh)
+        return format_token_pairs(token_address, response.get("pairs", []))
 
     except requests.exceptions.RequestException as e:
         return f"Error fetching token pairs: {str(e)}"
 
-def get_token_details(token_address: str) -> str:
+def format_token_details(token_data: dict) -> str:
+    """
+    Format a Moralis token discovery record for the agent.
+
+    Args:
+        token_data (dict): The /discovery/token response.
+
+    Returns:
+        str: The token details as labelled lines.
+    """
+    if TOOL_OUTPUT_MODE == "compact":
+        return compact_record([
+            ("symbol", token_data.get("token_symbol")),
+            ("price_usd", token_data.get("price_usd")),
+            ("market_cap", token_data.get("market_cap")),
+            ("security", token_data.get("security_score")),
+            ("age_days", token_data.get("token_age_in_days")),
+            ("strength", token_data.get("on_chain_strength_index")),
+            ("holders_chg_1d", (token_data.get("holders_change") or {}).get("1d")),
+            ("vol_chg_usd_1d", (token_data.get("volume_change_usd") or {}).get("1d")),
+            ("price_chg_pct_1M", (token_data.get("price_percent_change_usd") or {}).get("1M")),
+        ]) + "\n"
+    return (
+        f"Token Name: {token_data.get('token_name')}\n"
+        f"Symbol: {token_data.get('token_symbol')}\n"
+        f"Price (USD): {token_data.get('price_usd')}\n"
+        f"Market Cap: {token_data.get('market_cap')}\n"
+        f"Security Score: {token_data.get('security_score')}\n"
+        f"Token Age (days): {token_data.get('token_age_in_days')}\n"
+        f"On-Chain Strength Index: {token_data.get('on_chain_strength_index')}\n"
+        f"1-Day Holders Change: {token_data['holders_change'].get('1d')}\n"
+        f"1-Day Volume Change (USD): {token_data['volume_change_usd'].get('1d')}\n"
+        f"1-Month Price Change (%): {token_data['price_percent_change_usd'].get('1M')}\n"
+        f"Logo: {token_data.get('token_logo')}\n"
+    )
+
+
+def get_token_details(token_address: str, force_refresh: bool = False) -> str:
     """
     Fetch detailed information about a specific ERC-20 token on the Base blockchain.
     Automatically determines if the network is mainnet or testnet.
 
     Args:
         token_address (str): The address of the ERC-20 token.
+        force_refresh (bool): Bypass cached prices, e.g. right before a swap.
 
     Returns:
         str: Information about the token or an error message if unsuccessful.
     """
     # Determine the network dynamically based on the agent's current network ID
-    is_mainnet = agent_wallet.network_id in ["base", "base-mainnet"]
+    is_mainnet = wallet_provider.network_id in ["base", "base-mainnet"]
     chain = "base" if is_mainnet else "base sepolia"
 
-    # API endpoint and headers
-    url = f"https://deep-index.moralis.io/api/v2.2/discovery/token"
-    headers = {
-        "accept": "application/json",
-        "X-API-Key": MORALIS_API_KEY
-    }
     params = {
         "chain": chain,
         "token_address": token_address
     }
 
     try:
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        token_data = response.json()
-
-        # Format the output
-        token_info = (
-            f"Token Name: {token_data.get('token_name')}\n"
-            f"Symbol: {token_data.get('token_symbol')}\n"
-            f"Price (USD): {token_data.get('price_usd')}\n"
-            f"Market Cap: {token_data.get('market_cap')}\n"
-            f"Security Score: {token_data.get('security_score')}\n"
-            f"Token Age (days): {token_data.get('token_age_in_days')}\n"
-            f"On-Chain Strength Index: {token_data.get('on_chain_strength_index')}\n"
-            f"1-Day Holders Change: {token_data['holders_change'].get('1d')}\n"
-            f"1-Day Volume Change (USD): {token_data['volume_change_usd'].get('1d')}\n"
-            f"1-Month Price Change (%): {token_data['price_percent_change_usd'].get('1M')}\n"
-            f"Logo: {token_data.get('token_logo')}\n"
-        )
-        return token_info
+        token_data = moralis_client.get("/discovery/token",
+                                        params,
+                                        fresh=force_refresh)
+        return format_token_details(token_data)
 
     except requests.exceptions.RequestException as e:
         return f"Error fetching token details: {str(e)}"
 
 
+def get_price_history(token_address: str, hours: float = 24) -> str:
+    """
+    Summarize the locally recorded market snapshots of a token, without calling Moralis.
+    Snapshots are recorded whenever trending, token detail or pair data is fetched.
+
+    Args:
+        token_address (str): The address of the ERC-20 token
+        hours (float): How far back to look
+
+    Returns:
+        str: Price, market cap and liquidity history summary or an error message
+    """
+    if market_store is None:
+        return "Error: Market data recording is disabled (MARKET_STORE_DIR is empty)."
+
+    market_store.flush()
+    now = time.time()
+    history = market_store.history(token_address, start=now - hours * 3600)
+    timestamps = history["timestamp"]
+    if len(timestamps) == 0:
+        return f"No recorded snapshots for token {token_address} in the last {hours} hours."
+
+    lines = [
+        f"Recorded history for {token_address}: {len(timestamps)} snapshots over the last {hours} hours, "
+        f"latest {(now - timestamps[-1]) / 60:.1f} minutes ago"
+    ]
+    for name in ("price_usd", "market_cap", "liquidity_usd", "security_score"):
+        column = history[name]
+        column = column[~np.isnan(column)]
+        if len(column) == 0:
+            continue
+        change = (column[-1] / column[0] - 1) * 100 if column[0] else float("nan")
+        lines.append(
+            f"{name}: first={column[0]:.6g} last={column[-1]:.6g} "
+            f"min={column.min():.6g} max={column.max():.6g} change={change:+.2f}%")
+    return "\n".join(lines)
+
+
+def format_trending_analysis_compact(token_addresses: List[str],
+                                     results: List[Any]) -> str:
+    """
+    Format the output of analyze_trending_tokens as one table row per token.
+
+    Args:
+        token_addresses (List[str]): The analyzed token addresses
+        results (List[Any]): Details and pairs responses, interleaved per token
+
+    Returns:
+        str: The compact table
+    """
+    rows = []
+    for i, token_address in enumerate(token_addresses):
+        details, pairs = results[2 * i], results[2 * i + 1]
+        row = {"address": token_address, "error": None}
+        if isinstance(details, BaseException):
+            row["error"] = "details"
+        else:
+            row.update(details)
+        if isinstance(pairs, BaseException):
+            row["error"] = "pairs" if row["error"] is None else "details+pairs"
+        else:
+            liquidity = [
+                float(pair["liquidity_usd"])
+                for pair in pairs.get("pairs", []) if pair.get("liquidity_usd")
+            ]
+            row["top_liquidity_usd"] = max(liquidity, default=None)
+            row["pair_count"] = len(pairs.get("pairs", []))
+        rows.append(row)
+
+    return compact_table(
+        "Trending Token Analysis",
+        rows, [
+            ("symbol", lambda r: r.get("token_symbol")),
+            ("price_usd", lambda r: r.get("price_usd")),
+            ("market_cap", lambda r: r.get("market_cap")),
+            ("security", lambda r: r.get("security_score")),
+            ("holders_chg_1d", lambda r: (r.get("holders_change") or {}).get("1d")),
+            ("vol_chg_usd_1d", lambda r: (r.get("volume_change_usd") or {}).get("1d")),
+            ("top_liquidity_usd", lambda r: r.get("top_liquidity_usd")),
+            ("pairs", lambda r: r.get("pair_count")),
+            ("address", lambda r: r.get("address")),
+            ("error", lambda r: r.get("error")),
+        ],
+        rank_by=lambda r: r.get("market_cap"),
+        **TOOL_OUTPUT_LIMITS["analyze_trending_tokens"])
+
+
+async def _fetch_trending_enrichment(token_addresses: List[str], chain: str,
+                                     force_refresh: bool) -> List[Any]:
+    requests_to_send = []
+    for token_address in token_addresses:
+        requests_to_send.append(("/discovery/token", {
+            "chain": chain,
+            "token_address": token_address
+        }))
+        requests_to_send.append((f"/erc20/{token_address}/pairs", {
+            "chain": chain
+        }))
+
+    async with AsyncMoralisClient.from_client(
+            moralis_client,
+            concurrency=MORALIS_FANOUT_CONCURRENCY,
+            request_timeout=MORALIS_FANOUT_TIMEOUT) as client:
+        return await client.gather(requests_to_send, fresh=force_refresh)
+
+
+def analyze_trending_tokens(security_score=80,
+                            min_market_cap=100000,
+                            max_tokens: int = 25,
+                            force_refresh: bool = False) -> str:
+    """
+    Fetch trending tokens and, in the same call, the details and trading pairs of every one of them.
+    Use this instead of calling get_token_details and get_token_pairs once per trending token.
+
+    Args:
+        security_score (int): Minimum security score for tokens
+        min_market_cap (int): Minimum market cap for tokens
+        max_tokens (int): Maximum number of trending tokens to analyze
+        force_refresh (bool): Bypass cached market data, e.g. right before a swap
+
+    Returns:
+        str: Details and trading pairs for each trending token, or an error message
+    """
+    if not MORALIS_API_KEY:
+        return "Error: Moralis API key is missing. Please set the MORALIS_API_KEY environment variable."
+
+    # Determine the network dynamically based on the agent's current network ID
+    is_mainnet = wallet_provider.network_id in ["base", "base-mainnet"]
+    chain = "base" if is_mainnet else "base sepolia"
+
+    params = {
+        "chain": chain,
+        "security_score": security_score,
+        "min_market_cap": min_market_cap
+    }
+
+    try:
+        tokens = moralis_client.get("/discovery/tokens/trending",
+                                    params,
+                                    fresh=force_refresh)
+    except requests.exceptions.RequestException as e:
+        return f"Error fetching trending tokens: {str(e)}"
+
+    token_addresses = [
+        token["token_address"] for token in (tokens or [])[:max_tokens]
+        if token.get("token_address")
+    ]
+    if not token_addresses:
+        return "No trending tokens found matching the criteria. Try adjusting the security score or market cap parameters."
+
+    results = asyncio.run(
+        _fetch_trending_enrichment(token_addresses, chain, force_refresh))
+
+    if TOOL_OUTPUT_MODE == "compact":
+        return format_trending_analysis_compact(token_addresses, results)
+
+    sections = []
+    for i, token_address in enumerate(token_addresses):
+        details, pairs = results[2 * i], results[2 * i + 1]
+        if isinstance(details, BaseException):
+            details_info = f"Error fetching token details: {details!r}\n"
+        else:
+            details_info = format_token_details(details)
+        if isinstance(pairs, BaseException):
+            pairs_info = f"Error fetching token pairs: {pairs!r}"
+        else:
+            pairs_info = format_token_pairs(token_address,
+                                            pairs.get("pairs", []))
+        sections.append(
+            f"Token Address: {token_address}\n{details_info}{pairs_info}\n")
+
+    return f"Trending Token Analysis ({len(token_addresses)} tokens):\n" + "\n".join(
+        sections)
+
+
+def screen_trending_tokens(filter_expr: str = "security_score >= 80 and liquidity_usd >= 50000",
+                           score_expr: str = "log1p(max(volume_change_usd, 0)) + holders_change / 100",
+                           top_k: int = 10,
+                           security_score: int = 0,
+                           min_market_cap: int = 0,
+                           max_tokens: int = 100,
+                           force_refresh: bool = False) -> str:
+    """
+    Screen trending tokens locally and return a ranked shortlist.
+    Fetches the trending list with every token's details and trading pairs, then filters and ranks them with expressions.
+    Expressions use the columns price_usd, market_cap, security_score, token_age_in_days, on_chain_strength_index,
+    holders_change (1d), holders_change_1w, volume_change_usd (1d), price_change_1d, price_change_1w, price_change_1M,
+    liquidity_usd (deepest pair), total_liquidity_usd and pair_count, with + - * / **, comparisons, and/or/not
+    and abs, log, log1p, sqrt, min, max, clip.
+
+    Args:
+        filter_expr (str): Condition a token must meet, e.g. "security_score >= 80 and market_cap > 1e6"; empty keeps all
+        score_expr (str): Score to rank by, highest first, e.g. "volume_change_usd / market_cap"; empty keeps trending order
+        top_k (int): Number of tokens to return
+        security_score (int): Minimum security score passed to the trending query
+        min_market_cap (int): Minimum market cap passed to the trending query
+        max_tokens (int): Maximum number of trending tokens to screen
+        force_refresh (bool): Bypass cached market data, e.g. right before a swap
+
+    Returns:
+        str: The shortlist with its scores and columns, or an error message
+    """
+    if not MORALIS_API_KEY:
+        return "Error: Moralis API key is missing. Please set the MORALIS_API_KEY environment variable."
+
+    is_mainnet = wallet_provider.network_id in ["base", "base-mainnet"]
+    chain = "base" if is_mainnet else "base sepolia"
+
+    params = {
+        "chain": chain,
+        "security_score": security_score,
+        "min_market_cap": min_market_cap
+    }
+
+    try:
+        tokens = moralis_client.get("/discovery/tokens/trending",
+                                    params,
+                                    fresh=force_refresh)
+    except requests.exceptions.RequestException as e:
+        return f"Error fetching trending tokens: {str(e)}"
+
+    tokens = [token for token in (tokens or []) if token.get("token_address")][:max_tokens]
+    if not tokens:
+        return "No trending tokens found matching the criteria. Try adjusting the security score or market cap parameters."
+
+    results = asyncio.run(
+        _fetch_trending_enrichment([token["token_address"] for token in tokens],
+                                   chain, force_refresh))
+    # Failed lookups leave their columns missing, which filters on them drop
+    records = [
+        merge_token_responses(
+            token,
+            None if isinstance(results[2 * i], BaseException) else results[2 * i],
+            None if isinstance(results[2 * i + 1], BaseException) else results[2 * i + 1])
+        for i, token in enumerate(tokens)
+    ]
+
+    try:
+        shortlist = TokenTable.from_records(records).screen(filter_expr, score_expr, top_k)
+    except ValueError as e:
+        return f"Error in screening expression: {str(e)}"
+
+    if not shortlist:
+        return f"None of the {len(records)} trending tokens passed the filter {filter_expr!r}."
+    return compact_table(
+        f"Screened Trending Tokens (filter: {filter_expr or 'none'}; score: {score_expr or 'none'}; {len(records)} screened)",
+        shortlist, [
+            ("symbol", lambda r: r["symbol"]),
+            ("score", lambda r: r["score"]),
+            ("price_usd", lambda r: r["price_usd"]),
+            ("market_cap", lambda r: r["market_cap"]),
+            ("security", lambda r: r["security_score"]),
+            ("holders_chg_1d", lambda r: r["holders_change"]),
+            ("vol_chg_usd_1d", lambda r: r["volume_change_usd"]),
+            ("liquidity_usd", lambda r: r["liquidity_usd"]),
+            ("address", lambda r: r["address"]),
+        ],
+        **TOOL_OUTPUT_LIMITS["screen_trending_tokens"])
+
+
 # Create the Based Agent with all available functions
 based_agent = Agent(
     name="Based Agent",
@@ -638,9 +1443,11 @@ based_agent = Agent(
         "Your primary goal is to identify profitable tokens in the market, review wallet balances, and make calculated swap decisions to enhance the portfolio value. "
         "Follow these steps when making investment decisions:\n"
         "\n1. Use trending data to identify promising tokens with potential profit.\n"
-        "2. For each trending token, retrieve detailed information to evaluate its market cap, liquidity, and security.\n"
+        "2. For each trending token, retrieve detailed information to evaluate its market cap, liquidity, and security. analyze_trending_tokens fetches the trending list together with every token's details and trading pairs in one call; screen_trending_tokens filters and ranks them locally with your own filter and score expressions and returns just the shortlist.\n"
         "3. Check the wallet balance to understand the available assets and decide on a safe percentage to invest.\n"
         "4. Execute swaps to acquire trending tokens, ensuring the chosen amount aligns with profitability goals and balance management.\n"
+        "Market data is cached for a few seconds; before executing a swap, re-check the prices you rely on with force_refresh=True.\n"
+        "To move the whole portfolio towards target weights, let plan_portfolio_rebalance compute the swaps and run them with execute_rebalance_plan instead of working out amounts yourself.\n"
         "Make data-driven decisions based on token performance, wallet balance, and profitability, while maximizing portfolio value with each trade. "
         "Use all available functions to analyze market trends, asset details, and wallet metrics to act with precision and efficiency."
     ),
@@ -650,18 +1457,55 @@ based_agent = Agent(
         # generate_art,  # Uncomment this line if you have configured the OpenAI API
         deploy_nft,
         mint_nft,
+        bulk_mint_nft,
         swap_assets,
+        plan_portfolio_rebalance,
+        execute_rebalance_plan,
         register_basename,
+        bulk_register_basenames,
+        get_transaction_status,
         get_token_metadata,
+        get_token_metadata_batch,
         get_wallet_tokens,
         get_trending_tokens,
+        analyze_trending_tokens,
+        screen_trending_tokens,
         get_wallet_pnl,
         get_wallet_nfts,
         get_token_pairs,
         get_token_details,
+        get_price_history,
     ],
 )
 
+# Whether each tool only reads data (READ_ONLY) or changes wallet/chain state (MUTATING).
+# Read-only tools emitted in the same turn run concurrently; mutating tools stay serialized.
+TOOL_ACCESS = {
+    "create_token": MUTATING,
+    "request_eth_from_faucet": MUTATING,
+    "generate_art": READ_ONLY,
+    "deploy_nft": MUTATING,
+    "mint_nft": MUTATING,
+    "bulk_mint_nft": MUTATING,
+    "swap_assets": MUTATING,
+    "plan_portfolio_rebalance": READ_ONLY,
+    "execute_rebalance_plan": MUTATING,
+    "register_basename": MUTATING,
+    "bulk_register_basenames": MUTATING,
+    "get_transaction_status": READ_ONLY,
+    "get_token_metadata": READ_ONLY,
+    "get_token_metadata_batch": READ_ONLY,
+    "get_wallet_tokens": READ_ONLY,
+    "get_trending_tokens": READ_ONLY,
+    "analyze_trending_tokens": READ_ONLY,
+    "screen_trending_tokens": READ_ONLY,
+    "get_wallet_pnl": READ_ONLY,
+    "get_wallet_nfts": READ_ONLY,
+    "get_token_pairs": READ_ONLY,
+    "get_token_details": READ_ONLY,
+    "get_price_history": READ_ONLY,
+}
+
 # add the following import to the top of the file, add the code below it, and add the new functions to the based_agent.functions list
 
 # from twitter_utils import TwitterBot
@@ -818,12 +1662,30 @@ registrar_abi = [{
     "payable",
     "type":
     "function"
+}, {
+    "inputs": [{
+        "internalType": "string",
+        "name": "name",
+        "type": "string"
+    }],
+    "name":
+    "available",
+    "outputs": [{
+        "internalType": "bool",
+        "name": "",
+        "type": "bool"
+    }],
+    "stateMutability":
+    "view",
+    "type":
+    "function"
 }]
 
 # To add a new function:
 # 1. Define your function above (follow the existing pattern)
 # 2. Add appropriate error handling
 # 3. Add the function to the based_agent's functions list
+# 3b. Classify it in TOOL_ACCESS as READ_ONLY or MUTATING
 # 4. If your function requires new imports or global variables, add them at the top of the file
 # 5. Test your new function thoroughly before deploying
 
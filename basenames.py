@@ -0,0 +1,236 @@
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
+from eth_abi import encode
+from web3 import Web3
+
+from nft_minting import SUBMITTED, MintCheckpoint
+from tx_tracker import CONFIRMED, FAILED, PENDING, TransactionTracker
+
+# Registration period passed to register(), one year in seconds
+REGISTRATION_DURATION = "31557600"
+
+# Labels Basenames accepts: lowercase letters, digits and hyphens, at least 3 characters
+VALID_LABEL = re.compile(r"^[a-z0-9-]{3,}$")
+
+
+def namehash(name: str) -> bytes:
+    """ENS namehash of a dot-separated name."""
+    node = b"\x00" * 32
+    if name:
+        for label in reversed(name.split(".")):
+            node = Web3.keccak(node + Web3.keccak(text=label))
+    return node
+
+
+class BasenameEncoder:
+    """
+    Builds register() arguments for Basenames of one parent domain.
+
+    The namehash of the parent (e.g. base.eth) and the setAddr/setName
+    selectors are computed once, so every name costs one label hash and two
+    ABI encodes instead of a Web3 instance, a contract object and an ABI
+    parse.
+    """
+
+    def __init__(self, suffix: str, resolver_address: str):
+        """
+        Args:
+            suffix (str): Parent domain with a leading dot, e.g. ".base.eth"
+            resolver_address (str): L2 resolver the names point to
+        """
+        self.suffix = suffix
+        self.resolver_address = resolver_address
+        self._parent_node = namehash(suffix.lstrip("."))
+        self._set_addr = Web3.keccak(text="setAddr(bytes32,address)")[:4]
+        self._set_name = Web3.keccak(text="setName(bytes32,string)")[:4]
+
+    def label(self, basename: str) -> str:
+        """The label of a name, with or without the parent suffix, lowercased."""
+        basename = basename.strip().lower()
+        if basename.endswith(self.suffix):
+            basename = basename[:-len(self.suffix)]
+        return basename
+
+    def node(self, label: str) -> bytes:
+        return Web3.keccak(self._parent_node + Web3.keccak(text=label))
+
+    def register_args(self, label: str, address_id: str) -> dict:
+        """
+        Args:
+            label (str): Name without the parent suffix
+            address_id (str): Address the name resolves to and is registered for
+
+        Returns:
+            dict: Arguments of the registrar controller's register method
+        """
+        node = self.node(label)
+        full_name = label + self.suffix
+        address_data = "0x" + (self._set_addr + encode(["bytes32", "address"], [node, address_id])).hex()
+        name_data = "0x" + (self._set_name + encode(["bytes32", "string"], [node, full_name])).hex()
+        return {
+            "request": [
+                label,
+                address_id,
+                REGISTRATION_DURATION,
+                self.resolver_address,
+                [address_data, name_data],
+                True
+            ]
+        }
+
+
+@dataclass
+class BulkRegistrationReport:
+    """Outcome of a bulk basename registration, per name in request order."""
+
+    results: Dict[str, str] = field(default_factory=dict)
+    registered: int = 0
+    failed: int = 0
+    skipped: int = 0
+    elapsed_seconds: float = 0.0
+
+    def summary(self) -> str:
+        lines = [
+            f"Bulk basename registration finished: {self.registered} registered, "
+            f"{self.failed} failed, {self.skipped} skipped before paying, in {self.elapsed_seconds:.1f}s."
+        ]
+        lines.extend(f"{name}: {result}" for name, result in self.results.items())
+        return "\n".join(lines)
+
+
+def bulk_register(wallet,
+                  names: Iterable[str],
+                  encoder: BasenameEncoder,
+                  contract_address: str,
+                  abi: list,
+                  amount: float = 0.002,
+                  is_available: Optional[Callable[[str], bool]] = None,
+                  checkpoint_path: Optional[str] = None,
+                  max_in_flight: int = 10,
+                  tracker: Optional[TransactionTracker] = None,
+                  confirm_timeout: float = 600.0) -> BulkRegistrationReport:
+    """
+    Register many basenames for a wallet with pipelined contract invocations.
+
+    Every name is checked before anything is paid for: invalid labels,
+    duplicates, names the checkpoint already records as registered and,
+    if is_available is given, names the registrar reports as taken are
+    skipped. The remaining registrations are submitted without waiting for
+    each to confirm; up to max_in_flight are outstanding at once and the
+    tracker confirms them together.
+
+    Args:
+        wallet (Wallet): CDP wallet paying for and owning the names
+        names (Iterable[str]): Names, with or without the parent suffix
+        encoder (BasenameEncoder): Encoder of the network's parent domain
+        contract_address (str): Registrar controller address
+        abi (list): Registrar controller ABI
+        amount (float): ETH paid per registration
+        is_available (Callable): label -> whether the registrar still has it free
+        checkpoint_path (str): JSON-lines checkpoint file; no checkpointing if omitted
+        max_in_flight (int): Maximum submitted but unconfirmed registrations
+        tracker (TransactionTracker): Tracker used to confirm registrations; a private one if omitted
+        confirm_timeout (float): Seconds to wait for each registration to confirm
+
+    Returns:
+        BulkRegistrationReport: The result of every name
+    """
+    tracker = tracker or TransactionTracker(poll_interval=1.0,
+                                            timeout=confirm_timeout)
+    checkpoint = MintCheckpoint(checkpoint_path)
+    report = BulkRegistrationReport()
+    address_id = wallet.default_address.address_id
+    start = time.time()
+
+    labels: List[str] = []
+    for name in names:
+        label = encoder.label(name)
+        full_name = label + encoder.suffix
+        if full_name in report.results:
+            continue
+        if not VALID_LABEL.match(label):
+            report.results[full_name] = "skipped: invalid name (use at least 3 lowercase letters, digits or hyphens)"
+        elif checkpoint.status(label) == CONFIRMED:
+            report.results[full_name] = "skipped: already registered in an earlier run"
+        elif checkpoint.status(label) == SUBMITTED:
+            report.results[full_name] = "skipped: submitted in an earlier run without a recorded outcome"
+        else:
+            labels.append(label)
+            report.results[full_name] = "pending"
+            continue
+        report.skipped += 1
+
+    if is_available is not None:
+        available_labels = []
+        for label in labels:
+            full_name = label + encoder.suffix
+            try:
+                available = is_available(label)
+            except Exception as e:
+                report.results[full_name] = f"skipped: availability check failed: {str(e)}"
+                report.skipped += 1
+                continue
+            if available:
+                available_labels.append(label)
+            else:
+                report.results[full_name] = "skipped: already taken"
+                report.skipped += 1
+        labels = available_labels
+
+    in_flight = deque()
+
+    def settle(oldest_only: bool):
+        while in_flight and (not oldest_only or len(in_flight) >= max_in_flight):
+            label, handle_id = in_flight.popleft()
+            full_name = label + encoder.suffix
+            tracked = tracker.wait(handle_id, confirm_timeout)
+            if tracked.status == CONFIRMED:
+                report.registered += 1
+                report.results[full_name] = f"registered for {address_id}"
+                if tracked.transaction_link:
+                    report.results[full_name] += f" ({tracked.transaction_link})"
+                checkpoint.record(label, CONFIRMED, transaction_link=tracked.transaction_link)
+            elif tracked.status == PENDING or tracked.timed_out:
+                # Still unknown; keep it recorded as submitted so a rerun won't pay twice
+                report.failed += 1
+                report.results[full_name] = f"not confirmed within {confirm_timeout:.0f}s"
+            else:
+                report.failed += 1
+                error = tracked.error or "No confirmation"
+                report.results[full_name] = f"failed: {error}"
+                checkpoint.record(label, FAILED, error=error)
+
+    try:
+        for label in labels:
+            full_name = label + encoder.suffix
+            settle(oldest_only=True)
+            try:
+                invocation = wallet.invoke_contract(
+                    contract_address=contract_address,
+                    method="register",
+                    args=encoder.register_args(label, address_id),
+                    abi=abi,
+                    amount=amount,
+                    asset_id="eth",
+                )
+            except Exception as e:
+                report.failed += 1
+                report.results[full_name] = f"failed: {str(e)}"
+                checkpoint.record(label, FAILED, error=str(e))
+                continue
+
+            checkpoint.record(label, SUBMITTED)
+            handle_id = tracker.submit("register_basename", invocation,
+                                       f"registration of basename {full_name}")
+            in_flight.append((label, handle_id))
+
+        settle(oldest_only=False)
+    finally:
+        checkpoint.close()
+
+    report.elapsed_seconds = time.time() - start
+    return report
@@ -0,0 +1,287 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import numpy as np
+
+from fake_services import FakeMoralisServer, FakeWallet
+
+TOKEN = "0x4200000000000000000000000000000000000006"
+NFT_CONTRACT = "0x" + "cd" * 20
+BATCH_ADDRESSES = ",".join("0x%040x" % i for i in range(1, 21))
+
+# (tool name, keyword arguments or a function of the call index building them,
+# whether the tool reads through the Moralis response cache)
+BENCHMARK_CASES = [
+    ("get_token_metadata", {"token_address": TOKEN}, True),
+    ("get_token_metadata_batch", {"token_addresses": BATCH_ADDRESSES}, True),
+    ("get_wallet_tokens", {}, True),
+    ("get_trending_tokens", {}, True),
+    ("analyze_trending_tokens", {"max_tokens": 10}, True),
+    ("screen_trending_tokens", {"max_tokens": 10}, True),
+    ("get_wallet_pnl", {}, True),
+    ("get_token_pairs", {"token_address": TOKEN}, True),
+    ("get_token_details", {"token_address": TOKEN}, True),
+    ("get_wallet_nfts", {}, False),
+    ("get_price_history", {"token_address": TOKEN}, False),
+    ("create_token", {"name": "Bench", "symbol": "BNCH", "initial_supply": 1000}, False),
+    ("deploy_nft", {"name": "Bench NFT", "symbol": "BNFT", "base_uri": "https://nft.example/"}, False),
+    ("mint_nft", {"contract_address": NFT_CONTRACT, "mint_to": "0x" + "ef" * 20}, False),
+    ("swap_assets", {"amount": 0.01, "from_asset_id": "eth", "to_asset_id": "usdc"}, False),
+    ("register_basename", {"basename": "benchmark"}, False),
+    ("bulk_register_basenames", lambda i: {
+        "basenames": ",".join(f"benchmark{i}-{j}" for j in range(10)),
+        "check_availability": False,
+        "checkpoint_path": os.path.join(tempfile.gettempdir(),
+                                        f"benchmark_basenames_{uuid.uuid4().hex}.jsonl"),
+    }, False),
+    ("plan_portfolio_rebalance", {"rule": "equal"}, False),
+    # A fresh checkpoint per call, or every call after the first would resume a finished run
+    ("bulk_mint_nft", lambda i: {
+        "contract_address": NFT_CONTRACT,
+        "recipients": BATCH_ADDRESSES,
+        "checkpoint_path": os.path.join(tempfile.gettempdir(),
+                                        f"benchmark_mint_{uuid.uuid4().hex}.jsonl"),
+    }, False),
+]
+
+ERROR_PREFIXES = ("Error", "Unexpected error")
+# Runs faster than this (cache hits) are too noisy to flag as regressions
+MIN_COMPARABLE_MS = 1.0
+
+
+def latency_stats(latencies: List[float], errors: int,
+                  wall_seconds: float) -> Dict[str, Any]:
+    """
+    Summarize one benchmark run.
+
+    Args:
+        latencies (List[float]): Seconds taken by each call
+        errors (int): Calls that returned an error message or raised
+        wall_seconds (float): Wall-clock time of the whole run
+
+    Returns:
+        dict: Call count, errors, p50/p95/p99/max latency in ms and calls/sec
+    """
+    values = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "calls": len(latencies),
+        "errors": errors,
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(values.max()),
+        "calls_per_sec": len(latencies) / wall_seconds if wall_seconds > 0 else 0.0,
+    }
+
+
+def run_case(tool: Callable[..., str],
+             kwargs: Union[dict, Callable[[int], dict]],
+             iterations: int,
+             concurrency: int,
+             before_call: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+    """
+    Call one tool repeatedly and measure every call.
+
+    Args:
+        tool (Callable): The agent tool function
+        kwargs (Union[dict, Callable]): Tool arguments, or a function of the call index returning them
+        iterations (int): Number of calls
+        concurrency (int): Calls in flight at once; 1 runs them sequentially
+        before_call (Callable): Run before each call, outside the measured time
+
+    Returns:
+        dict: latency_stats of the run
+    """
+
+    def call(index: int):
+        arguments = kwargs(index) if callable(kwargs) else kwargs
+        if before_call:
+            before_call()
+        start = time.perf_counter()
+        try:
+            result = tool(**arguments)
+            failed = str(result).lstrip().startswith(ERROR_PREFIXES)
+        except Exception:
+            failed = True
+        return time.perf_counter() - start, failed
+
+    start = time.perf_counter()
+    if concurrency <= 1:
+        outcomes = [call(i) for i in range(iterations)]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(call, range(iterations)))
+    wall_seconds = time.perf_counter() - start
+
+    return latency_stats([latency for latency, _ in outcomes],
+                         sum(1 for _, failed in outcomes if failed),
+                         wall_seconds)
+
+
+def run_benchmarks(agents_module,
+                   server: FakeMoralisServer,
+                   tools: Optional[List[str]] = None,
+                   iterations: int = 20,
+                   concurrency: int = 8) -> List[Dict[str, Any]]:
+    """
+    Run every benchmark case cold and warm, sequentially and concurrently.
+
+    "cold" clears the Moralis response cache before each call, "warm" primes
+    it with one unmeasured call first. Tools that do not read through the
+    cache run once per execution mode, with cache "-".
+
+    Returns:
+        List[dict]: One latency_stats row per (tool, cache, execution) with upstream request counts
+    """
+    cache = agents_module.moralis_client.cache
+    results = []
+    for name, kwargs, cached in BENCHMARK_CASES:
+        if tools and name not in tools:
+            continue
+        tool = getattr(agents_module, name)
+        for execution, workers in (("sequential", 1), ("concurrent", concurrency)):
+            for cache_mode in (("cold", "warm") if cached else ("-", )):
+                cache.clear()
+                before_call = cache.clear if cache_mode == "cold" else None
+                if cache_mode == "warm":
+                    tool(**(kwargs(-1) if callable(kwargs) else kwargs))
+                server.reset_counters()
+
+                row = run_case(tool, kwargs, iterations, workers, before_call)
+                row.update({
+                    "tool": name,
+                    "cache": cache_mode,
+                    "execution": execution,
+                    "upstream_requests": sum(server.requests.values()),
+                    "upstream_bytes": server.bytes_sent,
+                })
+                results.append(row)
+                print(format_row(row), flush=True)
+    return results
+
+
+def format_row(row: Dict[str, Any]) -> str:
+    return (f"{row['tool']:<26} {row['cache']:<5} {row['execution']:<10} "
+            f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} "
+            f"{row['calls_per_sec']:>9.1f} {row['errors']:>6} {row['upstream_requests']:>8}")
+
+
+HEADER = (f"{'tool':<26} {'cache':<5} {'execution':<10} "
+          f"{'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9} {'calls/s':>9} {'errors':>6} {'upstream':>8}")
+
+
+def compare_to_baseline(results: List[Dict[str, Any]],
+                        baseline: List[Dict[str, Any]],
+                        tolerance: float) -> List[str]:
+    """
+    Find runs that got slower than a saved baseline.
+
+    Args:
+        results (List[dict]): Rows of the current run
+        baseline (List[dict]): Rows of a previous run saved with --output
+        tolerance (float): Allowed relative slowdown, e.g. 0.2 for 20%
+
+    Returns:
+        List[str]: One message per regressed p95 latency or throughput
+    """
+    previous = {(row["tool"], row["cache"], row["execution"]): row
+                for row in baseline}
+    regressions = []
+    for row in results:
+        before = previous.get((row["tool"], row["cache"], row["execution"]))
+        if before is None or max(row["p95_ms"], before["p95_ms"]) < MIN_COMPARABLE_MS:
+            continue
+        label = f"{row['tool']} ({row['cache']}, {row['execution']})"
+        if row["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{label}: p95 {before['p95_ms']:.1f}ms -> {row['p95_ms']:.1f}ms")
+        if row["calls_per_sec"] < before["calls_per_sec"] / (1 + tolerance):
+            regressions.append(
+                f"{label}: {before['calls_per_sec']:.1f} -> {row['calls_per_sec']:.1f} calls/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the agent tools offline against a fake Moralis API and CDP wallet.")
+    parser.add_argument("--tools", default="", help="Comma-separated tools to run (default: all)")
+    parser.add_argument("--iterations", type=int, default=20, help="Calls per run")
+    parser.add_argument("--concurrency", type=int, default=8, help="Threads of the concurrent runs")
+    parser.add_argument("--payloads", default="", help="JSON file of recorded Moralis payloads by route name")
+    parser.add_argument("--moralis-latency", type=float, default=0.05, help="Seconds per Moralis response")
+    parser.add_argument("--moralis-jitter", type=float, default=0.02, help="Maximum extra seconds per Moralis response")
+    parser.add_argument("--moralis-error-rate", type=float, default=0.0, help="Probability of a Moralis 5xx")
+    parser.add_argument("--cdp-latency", type=float, default=0.1, help="Seconds per CDP submission")
+    parser.add_argument("--cdp-confirm-latency", type=float, default=0.3, help="Seconds until a transaction confirms")
+    parser.add_argument("--cdp-error-rate", type=float, default=0.0, help="Probability of a CDP submission error")
+    parser.add_argument("--output-mode", default="verbose", choices=("verbose", "compact"), help="TOOL_OUTPUT_MODE of the tools")
+    parser.add_argument("--output", default="", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", default="", help="Compare against results saved with --output")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown against the baseline")
+    args = parser.parse_args()
+
+    payloads = None
+    if args.payloads:
+        with open(args.payloads) as f:
+            payloads = json.load(f)
+
+    server = FakeMoralisServer(payloads,
+                               latency=args.moralis_latency,
+                               jitter=args.moralis_jitter,
+                               error_rate=args.moralis_error_rate).start()
+
+    # agents reads its configuration at import time
+    os.environ.update({
+        "MORALIS_BASE_URL": server.url,
+        "MORALIS_API_KEY": os.environ.get("MORALIS_API_KEY") or "benchmark",
+        "MORALIS_CU_PER_SECOND": os.environ.get("MORALIS_CU_PER_SECOND", "0"),
+        "MORALIS_MAX_RETRIES": os.environ.get("MORALIS_MAX_RETRIES", "1"),
+        "MARKET_STORE_DIR": tempfile.mkdtemp(prefix="benchmark_market_"),
+        "CDP_NETWORK_ID": "base-mainnet",
+        "TX_SUBMIT_MODE": "wait",
+        "TX_POLL_INTERVAL": "0.05",
+        "TOOL_OUTPUT_MODE": args.output_mode,
+    })
+    import agents
+
+    agents.wallet_provider.set_wallet(
+        FakeWallet(latency=args.cdp_latency,
+                   confirm_latency=args.cdp_confirm_latency,
+                   error_rate=args.cdp_error_rate))
+
+    print(HEADER)
+    try:
+        results = run_benchmarks(
+            agents, server,
+            tools=[tool.strip() for tool in args.tools.split(",") if tool.strip()],
+            iterations=args.iterations,
+            concurrency=args.concurrency)
+    finally:
+        server.stop()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regressions beyond {args.tolerance:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import json
+from typing import Callable, List, Optional
+
+# Rough size of one token in characters for English text and JSON payloads
+CHARS_PER_TOKEN = 4
+# Per-message overhead of the chat format (role, separators)
+MESSAGE_TOKEN_OVERHEAD = 4
+
+Summarizer = Callable[[str, List[dict]], str]
+
+
+def estimate_tokens(messages: List[dict]) -> int:
+    """
+    Estimate the prompt tokens of chat messages without a tokenizer.
+
+    Args:
+        messages (List[dict]): Chat messages
+
+    Returns:
+        int: Approximate token count
+    """
+    total = 0
+    for message in messages:
+        total += MESSAGE_TOKEN_OVERHEAD
+        total += len(message.get("content") or "") // CHARS_PER_TOKEN
+        if message.get("tool_calls"):
+            total += len(json.dumps(message["tool_calls"])) // CHARS_PER_TOKEN
+    return total
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def extractive_summarizer(summary: str, messages: List[dict],
+                          max_chars: int = 4000) -> str:
+    """
+    Fold messages into a running summary without calling an LLM.
+
+    Keeps user requests, clipped assistant replies and one line per tool call
+    with the head of its result; the raw tool payloads themselves are dropped.
+
+    Args:
+        summary (str): The summary so far
+        messages (List[dict]): Messages to fold in
+        max_chars (int): Size cap of the summary; the oldest lines go first
+
+    Returns:
+        str: The updated summary
+    """
+    results = {
+        message.get("tool_call_id"): message.get("content")
+        for message in messages if message.get("role") == "tool"
+    }
+
+    lines = summary.splitlines() if summary else []
+    for message in messages:
+        role = message.get("role")
+        if role == "user":
+            lines.append(f"- User: {_clip(message.get('content'), 200)}")
+        elif role == "assistant":
+            if message.get("content"):
+                lines.append(f"- Agent: {_clip(message['content'], 300)}")
+            for tool_call in message.get("tool_calls") or []:
+                function = tool_call["function"]
+                result = _clip(results.get(tool_call.get("id")), 120)
+                lines.append(
+                    f"- Called {function['name']}({_clip(function['arguments'], 100)}) -> {result}")
+
+    while lines and sum(len(line) + 1 for line in lines) > max_chars:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+def openai_summarizer(client, model: str = "gpt-4o-mini",
+                      max_tokens: int = 400) -> Summarizer:
+    """
+    Build a summarizer that asks an OpenAI chat model to update the running summary.
+
+    Falls back to the extractive summarizer if the request fails.
+
+    Args:
+        client (OpenAI): OpenAI client
+        model (str): Model used for summarization
+        max_tokens (int): Length cap of the summary
+
+    Returns:
+        Callable: A summarizer for ConversationMemory
+    """
+
+    def summarize(summary: str, messages: List[dict]) -> str:
+        transcript = extractive_summarizer("", messages, max_chars=12000)
+        try:
+            response = client.chat.completions.create(
+                model=model,
+                max_tokens=max_tokens,
+                messages=[{
+                    "role":
+                    "system",
+                    "content":
+                    "You maintain the running summary of a blockchain agent's session. "
+                    "Merge the new events into the summary. Keep addresses, amounts, "
+                    "transaction results, decisions and open tasks; drop everything else."
+                }, {
+                    "role":
+                    "user",
+                    "content":
+                    f"Current summary:\n{summary or '(empty)'}\n\nNew events:\n{transcript}"
+                }],
+            )
+            return response.choices[0].message.content or summary
+        except Exception:
+            return extractive_summarizer(summary, messages)
+
+    return summarize
+
+
+class ConversationMemory:
+    """
+    Token-budgeted chat history for the agent loops.
+
+    Leading system messages are pinned. The most recent turns (a turn starts
+    at a user message) are kept verbatim; once the history exceeds the token
+    budget, or there are more than max_recent_turns turns, the oldest turns
+    are folded into a running summary and their raw tool payloads dropped.
+    """
+
+    def __init__(self,
+                 token_budget: int = 8000,
+                 max_recent_turns: int = 6,
+                 min_recent_turns: int = 1,
+                 summarizer: Optional[Summarizer] = None):
+        """
+        Args:
+            token_budget (int): Approximate prompt tokens the history may use
+            max_recent_turns (int): Turns kept verbatim even when under budget
+            min_recent_turns (int): Turns kept verbatim even when over budget
+            summarizer (Callable): (summary, messages) -> summary; extractive if omitted
+        """
+        self.token_budget = token_budget
+        self.max_recent_turns = max_recent_turns
+        self.min_recent_turns = min_recent_turns
+        self.summarizer = summarizer or extractive_summarizer
+        self.pinned: List[dict] = []
+        self.summary = ""
+        self.turns: List[List[dict]] = []
+
+    def append(self, message: dict):
+        """Add one message to the history."""
+        if message.get("role") == "system" and not self.turns:
+            self.pinned.append(message)
+        elif message.get("role") == "user" or not self.turns:
+            self.turns.append([message])
+        else:
+            self.turns[-1].append(message)
+
+    def extend(self, messages: List[dict]):
+        """Add several messages, then compact the history to the budget."""
+        for message in messages:
+            self.append(message)
+        self.compact()
+
+    def compact(self):
+        """Summarize the oldest turns until the history fits the budget."""
+        folded: List[dict] = []
+        while len(self.turns) > self.min_recent_turns and (
+                len(self.turns) > self.max_recent_turns
+                or self.token_count() > self.token_budget):
+            folded.extend(self.turns.pop(0))
+        if folded:
+            self.summary = self.summarizer(self.summary, folded)
+
+    def messages(self) -> List[dict]:
+        """
+        Returns:
+            List[dict]: Pinned messages, the running summary and the recent turns
+        """
+        messages = list(self.pinned)
+        if self.summary:
+            messages.append({
+                "role":
+                "system",
+                "content":
+                f"Summary of the earlier conversation:\n{self.summary}"
+            })
+        for turn in self.turns:
+            messages.extend(turn)
+        return messages
+
+    def token_count(self) -> int:
+        """Estimated prompt tokens of the current history."""
+        return estimate_tokens(self.messages())
@@ -1,44 +1,290 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from openai import OpenAI
+from openai.types.chat import ChatCompletion
 from swarm import Swarm
-from agents import weather_agent
-import pytest
-
-client = Swarm()
-
-
-def run_and_get_tool_calls(agent, query):
-    message = {"role": "user", "content": query}
-    response = client.run(
-        agent=agent,
-        messages=[message],
-        execute_tools=False,
-    )
-    return response.messages[-1].get("tool_calls")
-
-
-@pytest.mark.parametrize(
-    "query",
-    [
-        "What's the weather in NYC?",
-        "Tell me the weather in London.",
-        "Do I need an umbrella today? I'm in chicago.",
-    ],
-)
-def test_calls_weather_when_asked(query):
-    tool_calls = run_and_get_tool_calls(weather_agent, query)
-
-    assert len(tool_calls) == 1
-    assert tool_calls[0]["function"]["name"] == "get_weather"
-
-
-@pytest.mark.parametrize(
-    "query",
-    [
-        "Who's the president of the United States?",
-        "What is the time right now?",
-        "Hi!",
-    ],
-)
-def test_does_not_call_weather_when_not_asked(query):
-    tool_calls = run_and_get_tool_calls(weather_agent, query)
-
-    assert not tool_calls
+
+from agents import based_agent
+
+# Where recorded completions are stored, one JSON file per distinct request
+CASSETTE_DIR = os.environ.get("EVAL_CASSETTE_DIR", "eval_cassettes")
+# "none" only replays (missing cassettes fail), "new" records missing ones,
+# "all" re-records everything against the live API
+RECORD_MODE = os.environ.get("EVAL_RECORD", "none")
+EVAL_WORKERS = int(os.environ.get("EVAL_WORKERS", "8"))
+# Model to evaluate instead of based_agent.model ("" keeps the agent's model)
+EVAL_MODEL = os.environ.get("EVAL_MODEL", "")
+# Tool-selection accuracy below which the suite fails
+EVAL_MIN_ACCURACY = float(os.environ.get("EVAL_MIN_ACCURACY", "0.9"))
+
+TOKEN = "0x4200000000000000000000000000000000000006"
+OTHER_TOKEN = "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913"
+NFT_CONTRACT = "0x1f98431c8ad98523631ae4a59f267346ea31f984"
+RECIPIENT = "0x742d35Cc6634C0532925a3b844Bc454e4438f44e"
+
+
+@dataclass
+class EvalCase:
+    """
+    One query and the tool the agent should pick first.
+
+    expected_tools lists the acceptable first tool calls; an empty list
+    means the agent should answer without calling any tool. expected_args
+    are checked case-insensitively against the arguments of that call.
+    """
+
+    name: str
+    query: str
+    expected_tools: Sequence[str] = ()
+    expected_args: Dict[str, Any] = field(default_factory=dict)
+
+
+EVAL_CASES = [
+    EvalCase("trending", "What tokens are trending on Base right now?",
+             ["get_trending_tokens", "analyze_trending_tokens"]),
+    EvalCase("wallet_tokens", "Which tokens do I hold in my wallet?",
+             ["get_wallet_tokens"]),
+    EvalCase("pnl", "How much profit have I made on my trades so far?",
+             ["get_wallet_pnl"]),
+    EvalCase("nfts", "What NFTs does my wallet own?", ["get_wallet_nfts"]),
+    EvalCase("token_details", f"Give me the security score and market cap of {TOKEN}.",
+             ["get_token_details"], {"token_address": TOKEN}),
+    EvalCase("token_pairs", f"Which liquidity pools trade {TOKEN}?",
+             ["get_token_pairs"], {"token_address": TOKEN}),
+    EvalCase("metadata_batch",
+             f"Look up the name, symbol and decimals of {TOKEN} and {OTHER_TOKEN}.",
+             ["get_token_metadata_batch"]),
+    EvalCase("price_history", f"How has the price of {TOKEN} moved over the last 24 hours?",
+             ["get_price_history"], {"token_address": TOKEN}),
+    EvalCase("create_token",
+             "Create a token called Based Cat with symbol BCAT and an initial supply of 1000000.",
+             ["create_token"], {"name": "Based Cat", "symbol": "BCAT"}),
+    EvalCase("deploy_nft",
+             "Deploy an NFT collection named Pixel Frogs, symbol FROG, with base URI https://frogs.example/meta/.",
+             ["deploy_nft"], {"name": "Pixel Frogs", "symbol": "FROG"}),
+    EvalCase("mint_nft", f"Mint one NFT from contract {NFT_CONTRACT} to {RECIPIENT}.",
+             ["mint_nft"], {"contract_address": NFT_CONTRACT, "mint_to": RECIPIENT}),
+    EvalCase("bulk_mint",
+             f"Airdrop NFTs from contract {NFT_CONTRACT} to every address in recipients.csv.",
+             ["bulk_mint_nft"], {"contract_address": NFT_CONTRACT}),
+    EvalCase("swap", "Swap 0.01 ETH for USDC.",
+             ["swap_assets", "get_wallet_tokens", "get_token_pairs"]),
+    EvalCase("basename", "Register the basename moonfrog for my wallet.",
+             ["register_basename"]),
+    EvalCase("faucet", "I need some testnet ETH, can you get me some from the faucet?",
+             ["request_eth_from_faucet"]),
+    EvalCase("tx_status", "Did transaction tx-3 confirm yet?",
+             ["get_transaction_status"], {"handle_id": "tx-3"}),
+    EvalCase("greeting", "Hi!", []),
+    EvalCase("general_question", "In one sentence, what is a Layer 2 blockchain?", []),
+]
+
+
+class CassetteMissingError(Exception):
+    """A request has no recorded completion and recording is disabled."""
+
+
+class _Completions:
+
+    def __init__(self, client: "CassetteClient"):
+        self._client = client
+
+    def create(self, **params) -> ChatCompletion:
+        return self._client.create(params)
+
+
+class _Chat:
+
+    def __init__(self, client: "CassetteClient"):
+        self.completions = _Completions(client)
+
+
+class CassetteClient:
+    """
+    Drop-in for the OpenAI client that records chat completions to cassette files and replays them.
+
+    A cassette is keyed by a hash of everything that shapes the completion
+    (model, messages, tool schemas), so changing the prompt or a tool's
+    docstring needs a new recording. Each recording keeps the latency of
+    the live call, so replayed runs still report realistic latency. Usage
+    and latency of the calls made through this instance are collected in
+    `calls`.
+    """
+
+    def __init__(self, cassette_dir: str = CASSETTE_DIR,
+                 record_mode: str = RECORD_MODE,
+                 live_client: Optional[OpenAI] = None):
+        """
+        Args:
+            cassette_dir (str): Directory of the cassette files
+            record_mode (str): "none", "new" or "all"
+            live_client (OpenAI): Client for recording, created on first use if omitted
+        """
+        self.cassette_dir = cassette_dir
+        self.record_mode = record_mode
+        self._live_client = live_client
+        self.calls: List[Dict[str, Any]] = []
+        self.chat = _Chat(self)
+
+    @staticmethod
+    def cassette_key(params: Dict[str, Any]) -> str:
+        relevant = {
+            key: params.get(key)
+            for key in ("model", "messages", "tools", "tool_choice", "parallel_tool_calls")
+        }
+        encoded = json.dumps(relevant, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode()).hexdigest()[:24]
+
+    def create(self, params: Dict[str, Any]) -> ChatCompletion:
+        if params.get("stream"):
+            raise ValueError("CassetteClient only supports non-streamed completions")
+        path = os.path.join(self.cassette_dir, f"{self.cassette_key(params)}.json")
+
+        if self.record_mode != "all" and os.path.exists(path):
+            with open(path) as f:
+                cassette = json.load(f)
+            replayed = True
+        elif self.record_mode in ("new", "all"):
+            cassette = self._record(params, path)
+            replayed = False
+        else:
+            raise CassetteMissingError(
+                f"No cassette {path} for this request; rerun with EVAL_RECORD=new to record it")
+
+        completion = ChatCompletion.model_validate(cassette["response"])
+        usage = completion.usage
+        self.calls.append({
+            "latency_seconds": cassette["latency_seconds"],
+            "prompt_tokens": usage.prompt_tokens if usage else 0,
+            "completion_tokens": usage.completion_tokens if usage else 0,
+            "replayed": replayed,
+        })
+        return completion
+
+    def _record(self, params: Dict[str, Any], path: str) -> Dict[str, Any]:
+        if self._live_client is None:
+            self._live_client = OpenAI()
+        start = time.perf_counter()
+        completion = self._live_client.chat.completions.create(**params)
+        cassette = {
+            "request": {"model": params.get("model"), "messages": params.get("messages")},
+            "latency_seconds": time.perf_counter() - start,
+            "response": completion.model_dump(mode="json"),
+        }
+        os.makedirs(self.cassette_dir, exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(cassette, f, indent=2)
+        os.replace(tmp_path, path)
+        return cassette
+
+
+def _args_match(expected: Dict[str, Any], actual: Dict[str, Any]) -> bool:
+    return all(
+        str(actual.get(key, "")).strip().lower() == str(value).strip().lower()
+        for key, value in expected.items())
+
+
+def run_case(case: EvalCase, agent=based_agent,
+             live_client: Optional[OpenAI] = None) -> Dict[str, Any]:
+    """
+    Ask the agent one query without executing tools and score its first tool choice.
+
+    Returns:
+        dict: Case name, chosen tools, whether the tool and arguments were correct,
+            tokens, recorded LLM latency, replay wall time and any error
+    """
+    cassettes = CassetteClient(live_client=live_client)
+    start = time.perf_counter()
+    result = {"case": case.name, "tools": [], "tool_correct": False,
+              "args_correct": False, "error": None}
+    try:
+        response = Swarm(client=cassettes).run(
+            agent=agent,
+            messages=[{"role": "user", "content": case.query}],
+            model_override=EVAL_MODEL or None,
+            execute_tools=False,
+        )
+        tool_calls = response.messages[-1].get("tool_calls") or []
+        result["tools"] = [call["function"]["name"] for call in tool_calls]
+        if not case.expected_tools:
+            result["tool_correct"] = result["args_correct"] = not tool_calls
+        elif tool_calls and result["tools"][0] in case.expected_tools:
+            result["tool_correct"] = True
+            arguments = json.loads(tool_calls[0]["function"]["arguments"] or "{}")
+            result["args_correct"] = _args_match(case.expected_args, arguments)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {str(e)}"
+
+    result.update({
+        "prompt_tokens": sum(call["prompt_tokens"] for call in cassettes.calls),
+        "completion_tokens": sum(call["completion_tokens"] for call in cassettes.calls),
+        "llm_latency_seconds": sum(call["latency_seconds"] for call in cassettes.calls),
+        "wall_seconds": time.perf_counter() - start,
+        "replayed": bool(cassettes.calls) and all(call["replayed"] for call in cassettes.calls),
+    })
+    return result
+
+
+def run_suite(cases: Sequence[EvalCase] = EVAL_CASES,
+              workers: int = EVAL_WORKERS) -> List[Dict[str, Any]]:
+    """Run every case on a thread pool; results are in case order."""
+    # Each case's CassetteClient creates a live client only if it has to record,
+    # so a replay-only run never needs OPENAI_API_KEY
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run_case, cases))
+
+
+def format_report(results: List[Dict[str, Any]]) -> str:
+    """Per-case table followed by accuracy, token and latency totals."""
+    lines = [f"{'case':<18} {'ok':<3} {'args':<4} {'tools':<34} {'prompt':>7} {'compl':>6} {'llm_s':>6}  error"]
+    for r in results:
+        lines.append(
+            f"{r['case']:<18} {'Y' if r['tool_correct'] else 'N':<3} "
+            f"{'Y' if r['args_correct'] else 'N':<4} {','.join(r['tools']) or '-':<34} "
+            f"{r['prompt_tokens']:>7} {r['completion_tokens']:>6} {r['llm_latency_seconds']:>6.2f}  "
+            f"{r['error'] or ''}")
+
+    total = len(results)
+    latencies = sorted(r["llm_latency_seconds"] for r in results)
+    lines.append("")
+    lines.append(f"Tool selection accuracy: {sum(r['tool_correct'] for r in results)}/{total} "
+                 f"({tool_accuracy(results):.0%}), arguments correct: "
+                 f"{sum(r['args_correct'] for r in results)}/{total}")
+    lines.append(f"Tokens: {sum(r['prompt_tokens'] for r in results)} prompt, "
+                 f"{sum(r['completion_tokens'] for r in results)} completion")
+    if latencies:
+        lines.append(f"LLM latency: p50 {latencies[len(latencies) // 2]:.2f}s, "
+                     f"max {latencies[-1]:.2f}s; slowest case took "
+                     f"{max(r['wall_seconds'] for r in results):.2f}s to run, "
+                     f"{sum(r['replayed'] for r in results)}/{total} cases replayed")
+    return "\n".join(lines)
+
+
+def tool_accuracy(results: List[Dict[str, Any]]) -> float:
+    return sum(r["tool_correct"] for r in results) / len(results) if results else 0.0
+
+
+def test_based_agent_tool_selection():
+    results = run_suite()
+    print(format_report(results))
+
+    errors = [f"{r['case']}: {r['error']}" for r in results if r["error"]]
+    assert not errors, "\n".join(errors)
+    assert tool_accuracy(results) >= EVAL_MIN_ACCURACY
+
+
+if __name__ == "__main__":
+    suite_start = time.perf_counter()
+    suite_results = run_suite()
+    print(format_report(suite_results))
+    print(f"Finished in {time.perf_counter() - suite_start:.2f}s")
+    sys.exit(0 if tool_accuracy(suite_results) >= EVAL_MIN_ACCURACY else 1)
@@ -0,0 +1,396 @@
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlparse
+
+from cdp import Transaction
+
+# Route name -> Moralis path pattern served by FakeMoralisServer
+MORALIS_ROUTES: List[Tuple[str, str]] = [
+    ("metadata", r"^/erc20/metadata$"),
+    ("trending", r"^/discovery/tokens/trending$"),
+    ("token", r"^/discovery/token$"),
+    ("pairs", r"^/erc20/([^/]+)/pairs$"),
+    ("wallet_tokens", r"^/wallets/([^/]+)/tokens$"),
+    ("profitability", r"^/wallets/([^/]+)/profitability$"),
+    ("nfts", r"^/([^/]+)/nft$"),
+]
+
+# Routes whose payloads are {"cursor": ..., "result": [...]} pages
+PAGINATED_ROUTES = ("wallet_tokens", "nfts")
+
+
+def _address(rng: random.Random) -> str:
+    return "0x" + "".join(rng.choice("0123456789abcdef") for _ in range(40))
+
+
+def synthetic_payloads(seed: int = 7,
+                       trending_tokens: int = 50,
+                       wallet_tokens: int = 250,
+                       pnl_entries: int = 20,
+                       nfts: int = 300,
+                       nft_collections: int = 12) -> Dict[str, Any]:
+    """
+    Build deterministic stand-ins for recorded Moralis responses.
+
+    Per-token routes (token, pairs, metadata) hold one template that the
+    server fills in with the requested address; paginated routes hold the
+    full item list, which the server slices by the "limit" and "cursor"
+    query parameters.
+
+    Args:
+        seed (int): Random seed, so runs are comparable
+        trending_tokens (int): Entries of the trending list
+        wallet_tokens (int): ERC-20 holdings of the wallet
+        pnl_entries (int): Entries of the profitability response
+        nfts (int): NFTs held by the wallet
+        nft_collections (int): Collections the NFTs are spread over
+
+    Returns:
+        dict: Route name -> payload
+    """
+    rng = random.Random(seed)
+
+    trending = [{
+        "token_address": _address(rng),
+        "token_name": f"Trending Token {i}",
+        "token_symbol": f"TT{i}",
+        "token_logo": f"https://logos.example/{i}.png",
+        "price_usd": rng.uniform(0.0001, 50),
+        "market_cap": rng.uniform(1e5, 5e9),
+        "security_score": rng.randint(50, 99),
+    } for i in range(trending_tokens)]
+
+    holdings = sorted(({
+        "token_address": _address(rng),
+        "name": f"Held Token {i}",
+        "symbol": f"HT{i}",
+        "balance_formatted": f"{rng.uniform(0, 1e6):.4f}",
+        "usd_price": rng.uniform(0.0001, 100),
+        "usd_value": rng.paretovariate(1.2),
+        "verified_contract": rng.random() < 0.7,
+    } for i in range(wallet_tokens)),
+                      key=lambda token: token["usd_value"],
+                      reverse=True)
+
+    contracts = [(_address(rng), f"Collection {i}") for i in range(nft_collections)]
+    nft_items = []
+    for i in range(nfts):
+        contract, name = contracts[i % nft_collections]
+        nft_items.append({
+            "token_address": contract,
+            "token_id": str(i),
+            "name": name,
+            "contract_type": "ERC721" if i % 3 else "ERC1155",
+            "amount": "1" if i % 3 else str(rng.randint(1, 5)),
+            "metadata": json.dumps({
+                "name": f"{name} #{i}",
+                "description": "x" * 512,
+                "attributes": [{"trait_type": f"trait{j}", "value": j}
+                               for j in range(10)],
+            }),
+        })
+
+    return {
+        "metadata": {
+            "name": "Metadata Token",
+            "symbol": "MDT",
+            "decimals": "18",
+            "total_supply_formatted": "1000000000",
+            "verified_contract": True,
+            "logo": "https://logos.example/mdt.png",
+        },
+        "trending": trending,
+        "token": {
+            "token_name": "Detail Token",
+            "token_symbol": "DTL",
+            "token_logo": "https://logos.example/dtl.png",
+            "price_usd": 1.2345,
+            "market_cap": 123456789,
+            "security_score": 88,
+            "token_age_in_days": 420,
+            "on_chain_strength_index": 71,
+            "holders_change": {"1h": 3, "1d": 140, "1w": 900},
+            "volume_change_usd": {"1h": 1200.5, "1d": 45000.25},
+            "price_percent_change_usd": {"1d": 2.5, "1w": -4.1, "1M": 18.7},
+        },
+        "pairs": {
+            "pairs": [{
+                "pair_label": f"TOKEN/QUOTE{i}",
+                "usd_price": rng.uniform(0.5, 2),
+                "usd_price_24hr_percent_change": rng.uniform(-10, 10),
+                "liquidity_usd": rng.uniform(1e3, 5e6),
+                "exchange_address": _address(rng),
+                "pair": [{"token_name": "Token", "token_symbol": "TOKEN"},
+                         {"token_name": f"Quote {i}", "token_symbol": f"QUOTE{i}"}],
+            } for i in range(5)]
+        },
+        "wallet_tokens": holdings,
+        "profitability": {
+            "result": [{
+                "token_address": _address(rng),
+                "name": f"Traded Token {i}",
+                "symbol": f"TR{i}",
+                "logo": f"https://logos.example/tr{i}.png",
+                "total_usd_invested": f"{rng.uniform(10, 1e5):.2f}",
+                "realized_profit_usd": f"{rng.uniform(-1e4, 1e4):.2f}",
+                "avg_buy_price_usd": f"{rng.uniform(0.001, 10):.6f}",
+                "total_tokens_bought": f"{rng.uniform(1, 1e6):.2f}",
+            } for i in range(pnl_entries)]
+        },
+        "nfts": nft_items,
+    }
+
+
+class FakeMoralisServer:
+    """
+    Local HTTP stand-in for the Moralis API serving recorded payloads.
+
+    Every request waits latency seconds (plus up to jitter seconds) and
+    fails with error_status with probability error_rate, so tools can be
+    benchmarked offline under realistic and degraded conditions. Point a
+    MoralisClient at `url` (or set MORALIS_BASE_URL before importing
+    agents) to use it.
+    """
+
+    def __init__(self,
+                 payloads: Optional[Dict[str, Any]] = None,
+                 latency: float = 0.05,
+                 jitter: float = 0.02,
+                 error_rate: float = 0.0,
+                 error_status: int = 503,
+                 seed: int = 7):
+        """
+        Args:
+            payloads (dict): Route name -> recorded payload; missing routes get synthetic ones
+            latency (float): Seconds added to every response
+            jitter (float): Maximum extra seconds added at random
+            error_rate (float): Probability that a request fails
+            error_status (int): HTTP status of injected failures
+            seed (int): Seed for jitter and error injection
+        """
+        self.payloads = synthetic_payloads(seed)
+        self.payloads.update(payloads or {})
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.routes = [(name, re.compile(pattern))
+                       for name, pattern in MORALIS_ROUTES]
+        self.requests: Dict[str, int] = {}
+        self.errors = 0
+        self.bytes_sent = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0),
+                                           self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def start(self) -> "FakeMoralisServer":
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="fake-moralis",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeMoralisServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = {}
+            self.errors = 0
+            self.bytes_sent = 0
+
+    def respond(self, path: str, params: Dict[str, str]) -> Tuple[int, Any]:
+        """Resolve a request to (status, JSON body) without the simulated delay."""
+        for name, pattern in self.routes:
+            match = pattern.match(path)
+            if match:
+                break
+        else:
+            return 404, {"message": f"No fake route for {path}"}
+
+        with self._lock:
+            self.requests[name] = self.requests.get(name, 0) + 1
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        if failed:
+            return self.error_status, {"message": "Injected failure"}
+
+        payload = self.payloads[name]
+        if name in PAGINATED_ROUTES and isinstance(payload, list):
+            offset = int(params.get("cursor") or 0)
+            limit = int(params.get("limit") or 100)
+            page = payload[offset:offset + limit]
+            cursor = str(offset + limit) if offset + limit < len(payload) else None
+            return 200, {"cursor": cursor, "page_size": limit, "result": page}
+        if name == "metadata" and isinstance(payload, dict):
+            addresses = [value for key, value in sorted(params.items())
+                         if key.startswith("addresses[")]
+            return 200, [dict(payload, address=address) for address in addresses]
+        if name == "token" and isinstance(payload, dict):
+            return 200, dict(payload, token_address=params.get("token_address"))
+        return 200, payload
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; don't let Nagle delay the body
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                status, body = server.respond(url.path, dict(parse_qsl(url.query)))
+                with server._lock:
+                    delay = server.latency + server._rng.uniform(0, server.jitter)
+                time.sleep(delay)
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                with server._lock:
+                    server.bytes_sent += len(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+class FakeTransaction:
+    """Minimal cdp.Transaction stand-in whose status flips once confirm_at passes."""
+
+    def __init__(self, confirm_at: float, fail: bool = False):
+        self.confirm_at = confirm_at
+        self.fail = fail
+        self.transaction_hash = "0x" + "%064x" % random.getrandbits(256)
+        self.transaction_link = f"https://basescan.example/tx/{self.transaction_hash}"
+
+    @property
+    def status(self):
+        if time.time() < self.confirm_at:
+            return Transaction.Status.BROADCAST
+        return Transaction.Status.FAILED if self.fail else Transaction.Status.COMPLETE
+
+    @property
+    def terminal_state(self) -> bool:
+        return time.time() >= self.confirm_at
+
+
+class FakeOperation:
+    """Stand-in for a CDP SmartContract, ContractInvocation or Trade."""
+
+    def __init__(self, confirm_latency: float, fail: bool = False,
+                 contract_address: Optional[str] = None):
+        self.transaction = FakeTransaction(time.time() + confirm_latency, fail)
+        self.contract_address = contract_address or _address(random.Random())
+
+    @property
+    def status(self) -> str:
+        return str(self.transaction.status)
+
+    def reload(self) -> "FakeOperation":
+        return self
+
+    def wait(self, interval_seconds: float = 0.2,
+             timeout_seconds: float = 60) -> "FakeOperation":
+        time.sleep(max(0.0, self.transaction.confirm_at - time.time()))
+        if self.transaction.fail:
+            raise Exception("Transaction failed onchain")
+        return self
+
+    def __str__(self) -> str:
+        return f"FakeOperation {{ transaction_link: '{self.transaction.transaction_link}' }}"
+
+
+class FakeAddress:
+
+    def __init__(self, address_id: str):
+        self.address_id = address_id
+
+
+class FakeWallet:
+    """
+    Offline stand-in for a cdp.Wallet with simulated submit and confirmation delays.
+
+    Covers the wallet methods the agent tools use. Pass it to
+    WalletProvider.set_wallet to run onchain tools without CDP.
+    """
+
+    def __init__(self,
+                 network_id: str = "base-mainnet",
+                 address_id: str = "0x" + "ab" * 20,
+                 latency: float = 0.1,
+                 confirm_latency: float = 0.5,
+                 error_rate: float = 0.0,
+                 failure_rate: float = 0.0,
+                 seed: int = 7):
+        """
+        Args:
+            network_id (str): Network reported by the wallet
+            address_id (str): Default address of the wallet
+            latency (float): Seconds each submission takes
+            confirm_latency (float): Seconds from submission to confirmation
+            error_rate (float): Probability that a submission raises
+            failure_rate (float): Probability that a submitted transaction fails onchain
+            seed (int): Seed for error injection
+        """
+        self.network_id = network_id
+        self.id = "fake-wallet"
+        self.default_address = FakeAddress(address_id)
+        self.latency = latency
+        self.confirm_latency = confirm_latency
+        self.error_rate = error_rate
+        self.failure_rate = failure_rate
+        self.calls: Dict[str, int] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _submit(self, method: str, **kwargs) -> FakeOperation:
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            raise_error = self._rng.random() < self.error_rate
+            fail = self._rng.random() < self.failure_rate
+        time.sleep(self.latency)
+        if raise_error:
+            raise Exception(f"Injected CDP error in {method}")
+        return FakeOperation(self.confirm_latency, fail, **kwargs)
+
+    def deploy_token(self, name: str, symbol: str, total_supply) -> FakeOperation:
+        return self._submit("deploy_token")
+
+    def deploy_nft(self, name: str, symbol: str, base_uri: str) -> FakeOperation:
+        return self._submit("deploy_nft")
+
+    def invoke_contract(self, contract_address: str, method: str,
+                        args: Optional[dict] = None, abi=None, amount=None,
+                        asset_id=None) -> FakeOperation:
+        return self._submit("invoke_contract", contract_address=contract_address)
+
+    def trade(self, amount, from_asset_id: str, to_asset_id: str) -> FakeOperation:
+        return self._submit("trade")
+
+    def faucet(self, asset_id: Optional[str] = None) -> FakeOperation:
+        return self._submit("faucet")
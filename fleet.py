@@ -0,0 +1,434 @@
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import secrets
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from multiprocessing.managers import AcquirerProxy, BaseManager
+from typing import Any, Dict, List, Optional, Tuple
+
+from moralis_cache import TTLCache
+from moralis_limiter import ComputeUnitLimiter
+
+# Directory holding one subdirectory (wallet seed, market data, metrics) per worker
+FLEET_DIR = os.environ.get("FLEET_DIR", "fleet")
+# Agent turns running at once across the whole fleet (0 for no limit)
+FLEET_MAX_ACTIVE_TURNS = int(os.environ.get("FLEET_MAX_ACTIVE_TURNS", "0"))
+# Seconds between starting consecutive workers, so wallets and first turns don't all hit CDP at once
+FLEET_START_STAGGER = float(os.environ.get("FLEET_START_STAGGER", "1"))
+# Delay before restarting a crashed worker, doubled for every crash in a row up to FLEET_MAX_BACKOFF
+FLEET_RESTART_BACKOFF = float(os.environ.get("FLEET_RESTART_BACKOFF", "2"))
+FLEET_MAX_BACKOFF = float(os.environ.get("FLEET_MAX_BACKOFF", "300"))
+# A worker that stays up this long is considered healthy again and its backoff resets
+FLEET_HEALTHY_AFTER = float(os.environ.get("FLEET_HEALTHY_AFTER", "60"))
+# Print a fleet status line every this many seconds (0 disables)
+FLEET_STATUS_INTERVAL = float(os.environ.get("FLEET_STATUS_INTERVAL", "60"))
+
+
+@dataclass
+class WorkerSpec:
+    """
+    One agent worker of the fleet.
+
+    strategy replaces the autonomous prompt of every turn, instructions
+    replaces based_agent's system prompt; empty strings keep the defaults.
+    env is applied on top of the supervisor's environment before the
+    worker imports the agent, e.g. {"CDP_NETWORK_ID": "base-mainnet"}.
+    """
+
+    name: str
+    strategy: str = ""
+    instructions: str = ""
+    interval: float = 10
+    env: Dict[str, str] = field(default_factory=dict)
+
+
+def load_worker_specs(path: str) -> List[WorkerSpec]:
+    """
+    Read worker specs from a JSON list of objects with WorkerSpec fields.
+
+    Raises:
+        ValueError: If two workers share a name, and so would share a wallet
+    """
+    with open(path) as f:
+        specs = [WorkerSpec(**entry) for entry in json.load(f)]
+    names = [spec.name for spec in specs]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Worker names must be unique: {', '.join(duplicates)}")
+    return specs
+
+
+# Objects served to the workers by the supervisor's manager server. They live
+# in the supervisor process, so every worker sees the same cache and budget.
+_shared: Dict[str, Any] = {}
+
+
+def _shared_object(name: str):
+    return lambda: _shared[name]
+
+
+class FleetManager(BaseManager):
+    """Serves the Moralis response cache, compute-unit budget and turn slots to the workers."""
+
+
+FleetManager.register("cache", callable=_shared_object("cache"),
+                      exposed=("get", "set", "invalidate", "clear", "stats"))
+FleetManager.register("limiter", callable=_shared_object("limiter"),
+                      exposed=("reserve", "release", "stats"))
+FleetManager.register("turn_slots", callable=_shared_object("turn_slots"),
+                      proxytype=AcquirerProxy)
+
+
+class SharedComputeUnitLimiter(ComputeUnitLimiter):
+    """
+    ComputeUnitLimiter whose bucket lives in the supervisor process.
+
+    Costs are computed locally and only the reservation crosses the process
+    boundary; throttled callers sleep in their own process, so a waiting
+    worker never blocks the manager server.
+    """
+
+    def __init__(self, remote):
+        """
+        Args:
+            remote: Proxy of the supervisor's ComputeUnitLimiter
+        """
+        super().__init__(0)
+        self._remote = remote
+
+    def reserve(self, cost: float) -> float:
+        return self._remote.reserve(cost)
+
+    def release(self):
+        self._remote.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._remote.stats()
+
+
+class _LogWriter:
+    """File-like stdout replacement sending complete lines to the supervisor."""
+
+    def __init__(self, log_queue, worker: str):
+        self._queue = log_queue
+        self._worker = worker
+        self._buffer = ""
+        self._lock = threading.Lock()
+
+    def write(self, text: str) -> int:
+        with self._lock:
+            self._buffer += text
+            *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            self._queue.put((self._worker, time.time(), line))
+        return len(text)
+
+    def flush(self):
+        with self._lock:
+            line, self._buffer = self._buffer, ""
+        if line:
+            self._queue.put((self._worker, time.time(), line))
+
+    def isatty(self) -> bool:
+        return False
+
+
+def worker_main(spec: WorkerSpec, fleet_dir: str,
+                manager_address: Tuple[str, int], authkey: bytes,
+                log_queue, share_turn_slots: bool):
+    """
+    Entry point of a worker process: run based_agent autonomously with its own wallet.
+
+    The wallet seed, market data and metrics of the worker are kept in
+    fleet_dir/<name>, so workers never read or write each other's wallet
+    state, and a restarted worker picks up the same wallet again.
+    """
+    sys.stdout = sys.stderr = _LogWriter(log_queue, spec.name)
+
+    worker_dir = os.path.abspath(os.path.join(fleet_dir, spec.name))
+    os.makedirs(worker_dir, exist_ok=True)
+    for name in ("CDP_WALLET_ID", "CDP_WALLET_DATA_FILE", "AGENT_CASSETTE",
+                 "AGENT_METRICS_PORT"):
+        os.environ.pop(name, None)
+    # agents and run read their configuration at import time
+    os.environ.update({
+        "CDP_WALLET_SEED_FILE": os.path.join(worker_dir, "wallet_seed.json"),
+        "MARKET_STORE_DIR": os.path.join(worker_dir, "market_data"),
+        "AGENT_METRICS_FILE": os.path.join(worker_dir, "metrics.json"),
+    })
+    os.environ.update(spec.env)
+
+    manager = FleetManager(address=manager_address, authkey=authkey)
+    manager.connect()
+
+    import run
+    from agents import based_agent, moralis_client
+
+    moralis_client.cache = manager.cache()
+    moralis_client.limiter = SharedComputeUnitLimiter(manager.limiter())
+    agent = based_agent
+    if spec.instructions:
+        agent = based_agent.model_copy(update={"instructions": spec.instructions})
+
+    run.start_metrics_exporters()
+    try:
+        run.run_autonomous_loop(
+            agent,
+            interval=spec.interval,
+            thought=spec.strategy or run.AUTONOMOUS_THOUGHT,
+            turn_slot=manager.turn_slots() if share_turn_slots else None)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sys.stdout.flush()
+
+
+@dataclass
+class _Worker:
+    spec: WorkerSpec
+    process: Optional[multiprocessing.Process] = None
+    started_at: float = 0.0
+    restarts: int = 0
+    crashes_in_a_row: int = 0
+    restart_at: Optional[float] = None
+    finished: bool = False
+
+
+class FleetSupervisor:
+    """
+    Runs one agent process per WorkerSpec and keeps them running.
+
+    The supervisor hosts the shared Moralis cache and compute-unit limiter
+    in a manager server, so the fleet spends one budget and fetches each
+    market data response once, collects every worker's output into one
+    prefixed log, and restarts crashed workers with exponential backoff.
+    Workers that exit cleanly are not restarted.
+    """
+
+    def __init__(self,
+                 specs: List[WorkerSpec],
+                 fleet_dir: str = FLEET_DIR,
+                 max_active_turns: int = FLEET_MAX_ACTIVE_TURNS,
+                 log_file: Optional[str] = None,
+                 cache_size: int = 4096,
+                 cu_per_second: Optional[float] = None,
+                 cu_burst: Optional[float] = None):
+        """
+        Args:
+            specs (List[WorkerSpec]): Workers to run, with unique names
+            fleet_dir (str): Directory of the per-worker state
+            max_active_turns (int): Agent turns running at once across workers, 0 for no limit
+            log_file (str): Also append the aggregated log to this file
+            cache_size (int): Entries of the shared Moralis response cache
+            cu_per_second (float): Shared compute-unit budget, MORALIS_CU_PER_SECOND if omitted
+            cu_burst (float): Bucket capacity of the shared budget, MORALIS_CU_BURST if omitted
+        """
+        self.workers = {spec.name: _Worker(spec) for spec in specs}
+        self.fleet_dir = fleet_dir
+        self.max_active_turns = max_active_turns
+        self.log_file = log_file
+        if cu_per_second is None:
+            cu_per_second = float(os.environ.get("MORALIS_CU_PER_SECOND", "1000"))
+        if cu_burst is None and os.environ.get("MORALIS_CU_BURST"):
+            cu_burst = float(os.environ["MORALIS_CU_BURST"])
+        self.cache = TTLCache(maxsize=cache_size)
+        self.limiter = ComputeUnitLimiter(cu_per_second, burst=cu_burst)
+        self._authkey = secrets.token_bytes(32)
+        # Spawned workers start from a clean interpreter, so nothing of the
+        # supervisor (threads, sockets, CDP configuration) leaks into them
+        self._context = multiprocessing.get_context("spawn")
+        self._log_queue = self._context.Queue()
+        self._server = None
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> "FleetSupervisor":
+        """Start the manager server and log collector, then the workers one by one."""
+        _shared.update({
+            "cache": self.cache,
+            "limiter": self.limiter,
+            "turn_slots": threading.BoundedSemaphore(max(self.max_active_turns, 1)),
+        })
+        self._server = FleetManager(address=("127.0.0.1", 0),
+                                    authkey=self._authkey).get_server()
+        self._start_thread(self._server.serve_forever, "fleet-manager")
+        self._start_thread(self._collect_logs, "fleet-logs")
+
+        for i, worker in enumerate(self.workers.values()):
+            if self._stopping.is_set():
+                break
+            if i and FLEET_START_STAGGER > 0:
+                time.sleep(FLEET_START_STAGGER)
+            self._spawn(worker)
+        return self
+
+    def _start_thread(self, target, name: str):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _spawn(self, worker: _Worker):
+        worker.process = self._context.Process(
+            target=worker_main,
+            name=f"fleet-{worker.spec.name}",
+            args=(worker.spec, self.fleet_dir, self._server.address,
+                  self._authkey, self._log_queue, self.max_active_turns > 0),
+            daemon=True)
+        worker.process.start()
+        worker.started_at = time.time()
+        worker.restart_at = None
+        self._log("fleet", f"started {worker.spec.name} (pid {worker.process.pid})")
+
+    def supervise(self):
+        """Restart crashed workers until every worker finished or stop() is called."""
+        last_status = time.time()
+        while not self._stopping.is_set():
+            now = time.time()
+            for worker in self.workers.values():
+                self._check(worker, now)
+            if all(worker.finished for worker in self.workers.values()):
+                break
+            if FLEET_STATUS_INTERVAL > 0 and now - last_status >= FLEET_STATUS_INTERVAL:
+                self._log("fleet", self.status_line())
+                last_status = now
+            self._stopping.wait(0.5)
+
+    def _check(self, worker: _Worker, now: float):
+        if worker.finished or worker.process is None:
+            return
+        if worker.restart_at is not None:
+            if now >= worker.restart_at:
+                worker.restarts += 1
+                self._spawn(worker)
+            return
+        if worker.process.is_alive():
+            if now - worker.started_at >= FLEET_HEALTHY_AFTER:
+                worker.crashes_in_a_row = 0
+            return
+
+        exitcode = worker.process.exitcode
+        if exitcode == 0:
+            worker.finished = True
+            self._log("fleet", f"{worker.spec.name} finished")
+            return
+        if now - worker.started_at >= FLEET_HEALTHY_AFTER:
+            worker.crashes_in_a_row = 0
+        delay = min(FLEET_RESTART_BACKOFF * 2 ** worker.crashes_in_a_row, FLEET_MAX_BACKOFF)
+        worker.crashes_in_a_row += 1
+        worker.restart_at = now + delay
+        self._log("fleet", f"{worker.spec.name} exited with code {exitcode}, "
+                           f"restarting in {delay:.0f}s")
+
+    def stop(self, timeout: float = 10):
+        """Stop every worker, terminating those that don't exit within timeout, and flush the log."""
+        self._stopping.set()
+        for worker in self.workers.values():
+            if worker.process is not None and worker.process.is_alive():
+                worker.process.terminate()
+        deadline = time.time() + timeout
+        for worker in self.workers.values():
+            if worker.process is not None:
+                worker.process.join(max(0.0, deadline - time.time()))
+                if worker.process.is_alive():
+                    worker.process.kill()
+        # Let the collector drain what the workers wrote before exiting
+        self._log_queue.put(None)
+        for thread in self._threads:
+            if thread.name == "fleet-logs":
+                thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            dict: Per-worker liveness and restarts, shared cache and limiter counters
+        """
+        return {
+            "workers": {
+                name: {
+                    "alive": worker.process is not None and worker.process.is_alive(),
+                    "pid": worker.process.pid if worker.process else None,
+                    "restarts": worker.restarts,
+                    "finished": worker.finished,
+                } for name, worker in self.workers.items()
+            },
+            "cache": self.cache.stats(),
+            "limiter": self.limiter.stats(),
+        }
+
+    def status_line(self) -> str:
+        stats = self.stats()
+        alive = sum(1 for worker in stats["workers"].values() if worker["alive"])
+        restarts = sum(worker["restarts"] for worker in stats["workers"].values())
+        return (f"{alive}/{len(self.workers)} workers up, {restarts} restarts, "
+                f"cache hit ratio {stats['cache']['hit_ratio']:.0%}, "
+                f"{stats['limiter']['cu_spent']:.0f} CU spent, "
+                f"{stats['limiter']['throttled']} requests throttled")
+
+    def _log(self, source: str, line: str):
+        self._log_queue.put((source, time.time(), line))
+
+    def _collect_logs(self):
+        log = open(self.log_file, "a") if self.log_file else None
+        width = max([len(name) for name in self.workers] + [5])
+        try:
+            while True:
+                try:
+                    entry = self._log_queue.get(timeout=1)
+                except queue.Empty:
+                    continue
+                if entry is None:
+                    break
+                source, timestamp, line = entry
+                print(f"\033[90m[{source:<{width}}]\033[0m {line}", flush=True)
+                if log:
+                    stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
+                    log.write(f"{stamp} [{source}] {line}\n")
+                    log.flush()
+        finally:
+            if log:
+                log.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run a fleet of autonomous Based Agents, one process and wallet per worker.")
+    parser.add_argument("--config", default="", help="JSON list of worker specs (name, strategy, instructions, interval, env)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Number of default workers when no --config is given")
+    parser.add_argument("--interval", type=float, default=10, help="Seconds between turns of the default workers")
+    parser.add_argument("--fleet-dir", default=FLEET_DIR, help="Directory of the per-worker wallets and data")
+    parser.add_argument("--max-active-turns", type=int, default=FLEET_MAX_ACTIVE_TURNS, help="Agent turns running at once across the fleet (0 for no limit)")
+    parser.add_argument("--log-file", default="", help="Also append the aggregated log to this file")
+    args = parser.parse_args()
+
+    if args.config:
+        specs = load_worker_specs(args.config)
+    else:
+        specs = [WorkerSpec(name=f"worker-{i + 1}", interval=args.interval)
+                 for i in range(args.workers)]
+
+    os.makedirs(args.fleet_dir, exist_ok=True)
+    with open(os.path.join(args.fleet_dir, "workers.json"), "w") as f:
+        json.dump([asdict(spec) for spec in specs], f, indent=2)
+
+    supervisor = FleetSupervisor(specs,
+                                 fleet_dir=args.fleet_dir,
+                                 max_active_turns=args.max_active_turns,
+                                 log_file=args.log_file or None)
+    print(f"Starting fleet of {len(specs)} workers in {args.fleet_dir}...")
+    try:
+        supervisor.start()
+        supervisor.supervise()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        supervisor.stop()
+        print(supervisor.status_line())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import codecs
+import json
+from typing import Any, Dict, Iterable, Iterator
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+class StreamingArrayReader:
+    """
+    Incrementally parse a JSON object whose bulk is one array of items.
+
+    Moralis list responses look like {"cursor": ..., "result": [{...}, ...]}.
+    The reader decodes the byte stream chunk by chunk and yields the items of
+    the array one at a time, so only the current item is ever held in memory,
+    not the whole response. Every other top-level value (cursor, page, ...)
+    is collected in `meta`.
+    """
+
+    def __init__(self, chunks: Iterable[bytes], array_key: str = "result"):
+        """
+        Args:
+            chunks (Iterable[bytes]): Raw response body chunks
+            array_key (str): Top-level key of the array to stream
+        """
+        self.array_key = array_key
+        self.meta: Dict[str, Any] = {}
+        self.bytes_read = 0
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Append the next chunk to the buffer; False once the stream is exhausted."""
+        if self._eof:
+            return False
+        # Drop the consumed prefix so the buffer only holds unparsed text
+        self._buffer = self._buffer[self._pos:]
+        self._pos = 0
+        for chunk in self._chunks:
+            if chunk:
+                self.bytes_read += len(chunk)
+                self._buffer += self._utf8.decode(chunk)
+                return True
+        self._buffer += self._utf8.decode(b"", final=True)
+        self._eof = True
+        return False
+
+    def _skip(self, chars: str = _WHITESPACE):
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in chars:
+                self._pos += 1
+            if self._pos < len(self._buffer) or not self._fill():
+                return
+
+    def _peek(self) -> str:
+        self._skip()
+        if self._pos >= len(self._buffer):
+            raise ValueError("Unexpected end of JSON stream")
+        return self._buffer[self._pos]
+
+    def _expect(self, char: str):
+        if self._peek() != char:
+            raise ValueError(
+                f"Expected {char!r} at offset {self._pos} of JSON stream, got {self._buffer[self._pos]!r}")
+        self._pos += 1
+
+    def _value(self) -> Any:
+        """Decode one complete JSON value, reading more chunks as needed."""
+        self._skip()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buffer, self._pos)
+                # A number at the very end of the buffer may continue in the next chunk
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+    def items(self) -> Iterator[Any]:
+        """
+        Yields:
+            Any: The items of the streamed array, in order
+        """
+        self._expect("{")
+        if self._peek() == "}":
+            return
+        while True:
+            key = self._value()
+            self._expect(":")
+            if key == self.array_key and self._peek() == "[":
+                self._pos += 1
+                if self._peek() == "]":
+                    self._pos += 1
+                else:
+                    while True:
+                        yield self._value()
+                        separator = self._peek()
+                        self._pos += 1
+                        if separator == "]":
+                            break
+                        if separator != ",":
+                            raise ValueError(f"Unexpected {separator!r} in JSON array")
+            else:
+                self.meta[key] = self._value()
+
+            separator = self._peek()
+            self._pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"Unexpected {separator!r} in JSON object")
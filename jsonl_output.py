@@ -0,0 +1,72 @@
+import json
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+
+
+def message_records(messages: List[dict]) -> Iterator[Dict[str, Any]]:
+    """
+    Turn the messages of a Swarm response into output records.
+
+    Yields one "message" record per assistant text, one "tool_call" record
+    per requested tool call and one "tool_result" record per tool message.
+    """
+    for message in messages:
+        if message["role"] == "assistant":
+            if message.get("content"):
+                yield {"type": "message",
+                       "sender": message.get("sender"),
+                       "content": message["content"]}
+            for tool_call in message.get("tool_calls") or []:
+                function = tool_call["function"]
+                yield {"type": "tool_call",
+                       "sender": message.get("sender"),
+                       "id": tool_call.get("id"),
+                       "name": function["name"],
+                       "arguments": function["arguments"]}
+        elif message["role"] == "tool":
+            yield {"type": "tool_result",
+                   "id": message.get("tool_call_id"),
+                   "name": message.get("tool_name"),
+                   "content": message.get("content")}
+
+
+class JsonLinesWriter:
+    """
+    Buffers structured output records and writes them as JSON lines.
+
+    Records are held until flush(), which writes them with one write and
+    one flush of the stream, so a turn's output reaches a supervisor as a
+    block instead of interleaving with other writers chunk by chunk.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None, **fields):
+        """
+        Args:
+            stream (TextIO): Destination, sys.stdout at flush time if omitted
+            fields: Added to every record, e.g. mode="auto"
+        """
+        self.stream = stream
+        self.fields = fields
+        self._lines: List[str] = []
+        self._lock = threading.Lock()
+
+    def emit(self, record_type: str, **fields):
+        record = {"ts": round(time.time(), 3), "type": record_type, **self.fields, **fields}
+        line = json.dumps(record, default=str, ensure_ascii=False)
+        with self._lock:
+            self._lines.append(line)
+
+    def emit_messages(self, messages: List[dict]):
+        for record in message_records(messages):
+            self.emit(record.pop("type"), **record)
+
+    def flush(self):
+        with self._lock:
+            lines, self._lines = self._lines, []
+        if not lines:
+            return
+        stream = self.stream or sys.stdout
+        stream.write("\n".join(lines) + "\n")
+        stream.flush()
@@ -0,0 +1,305 @@
+import atexit
+import fcntl
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Fixed-width columns of the store; one raw little-endian file per column
+COLUMNS = {
+    "timestamp": np.dtype("<f8"),
+    "token": np.dtype("<u4"),
+    "price_usd": np.dtype("<f8"),
+    "market_cap": np.dtype("<f8"),
+    "liquidity_usd": np.dtype("<f8"),
+    "security_score": np.dtype("<f4"),
+    "source": np.dtype("u1"),
+}
+
+# Values of the "source" column
+SOURCE_TRENDING = 1
+SOURCE_DETAILS = 2
+SOURCE_PAIRS = 3
+
+_PAIRS_PATH = re.compile(r"^/erc20/([^/]+)/pairs$")
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+class MarketSnapshotStore:
+    """
+    Append-only, memory-mapped columnar store of token market snapshots.
+
+    Each column is a raw fixed-width array file in `directory`, and token
+    addresses are interned into a uint32 id column with the mapping kept in
+    tokens.json. Rows are appended in timestamp order, so a time range is a
+    contiguous slice and scan() returns zero-copy NumPy views over the
+    memory-mapped files. Appends take an exclusive file lock, so several
+    processes can share one store.
+
+    Rows handed to submit() are appended by a background writer thread, so
+    the Moralis response hook never waits on the file lock or the disk;
+    flush() waits until they are written.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory (str): Directory holding the column files, created on first append
+        """
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._token_ids: Dict[str, int] = {}
+        self._token_addresses: List[str] = []
+        self._maps: Dict[str, np.memmap] = {}
+        self._mapped_rows = -1
+        self._pending: "queue.Queue[List[Dict[str, Any]]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _load_tokens(self):
+        path = self._path("tokens.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                self._token_addresses = json.load(f)
+            self._token_ids = {
+                address: i
+                for i, address in enumerate(self._token_addresses)
+            }
+
+    def __len__(self) -> int:
+        """Number of complete rows, ignoring a partially written trailing row."""
+        rows = None
+        for name, dtype in COLUMNS.items():
+            try:
+                size = os.path.getsize(self._path(f"{name}.bin"))
+            except FileNotFoundError:
+                return 0
+            column_rows = size // dtype.itemsize
+            rows = column_rows if rows is None else min(rows, column_rows)
+        return rows or 0
+
+    def token_id(self, token_address: str) -> Optional[int]:
+        """The interned id of a token address, or None if it was never recorded."""
+        with self._lock:
+            if token_address.lower() not in self._token_ids:
+                self._load_tokens()
+            return self._token_ids.get(token_address.lower())
+
+    def append(self, rows: List[Dict[str, Any]]):
+        """
+        Append snapshot rows stamped with the current time.
+
+        Args:
+            rows (List[dict]): Dicts with "token" (address) and any of price_usd,
+                market_cap, liquidity_usd, security_score and source; missing values are NaN
+        """
+        if not rows:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, open(self._path("append.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # Another process may have interned tokens or appended rows meanwhile
+            self._load_tokens()
+            count = len(self)
+            self._truncate(count)
+
+            new_tokens = False
+            token_ids = []
+            for row in rows:
+                address = row["token"].lower()
+                if address not in self._token_ids:
+                    self._token_ids[address] = len(self._token_addresses)
+                    self._token_addresses.append(address)
+                    new_tokens = True
+                token_ids.append(self._token_ids[address])
+            if new_tokens:
+                tmp_path = self._path("tokens.json.tmp")
+                with open(tmp_path, "w") as f:
+                    json.dump(self._token_addresses, f)
+                os.replace(tmp_path, self._path("tokens.json"))
+
+            # Stamp inside the lock so timestamps never decrease across appends
+            now = max(time.time(), self._last_timestamp(count))
+            columns = {
+                "timestamp": np.full(len(rows), now),
+                "token": np.array(token_ids),
+                "source": np.array([row.get("source", 0) for row in rows]),
+            }
+            for name in ("price_usd", "market_cap", "liquidity_usd",
+                         "security_score"):
+                columns[name] = np.array(
+                    [_number(row.get(name)) for row in rows])
+
+            for name, dtype in COLUMNS.items():
+                with open(self._path(f"{name}.bin"), "ab") as f:
+                    f.write(columns[name].astype(dtype).tobytes())
+
+    def submit(self, rows: List[Dict[str, Any]]):
+        """Queue rows for the background writer and return immediately; see append()."""
+        if not rows:
+            return
+        self._pending.put(rows)
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                if self._writer is None:
+                    # Queued rows would otherwise be lost with the daemon thread
+                    atexit.register(self.flush)
+                self._writer = threading.Thread(target=self._run_writer,
+                                                name="market-store-writer",
+                                                daemon=True)
+                self._writer.start()
+
+    def flush(self):
+        """Block until every submitted row is written."""
+        self._pending.join()
+
+    def _run_writer(self):
+        while True:
+            batches = [self._pending.get()]
+            # Everything queued meanwhile goes into the same append
+            while True:
+                try:
+                    batches.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.append([row for batch in batches for row in batch])
+            except Exception as e:
+                print(f"Market store append of {sum(map(len, batches))} rows failed: {e}",
+                      file=sys.stderr)
+            finally:
+                for _ in batches:
+                    self._pending.task_done()
+
+    def _truncate(self, rows: int):
+        """Cut every column file to `rows` rows, dropping a torn write from a crash."""
+        for name, dtype in COLUMNS.items():
+            path = self._path(f"{name}.bin")
+            if os.path.exists(path) and os.path.getsize(path) != rows * dtype.itemsize:
+                os.truncate(path, rows * dtype.itemsize)
+
+    def _last_timestamp(self, rows: int) -> float:
+        if rows == 0:
+            return 0.0
+        with open(self._path("timestamp.bin"), "rb") as f:
+            f.seek((rows - 1) * COLUMNS["timestamp"].itemsize)
+            return float(np.frombuffer(f.read(8), dtype=COLUMNS["timestamp"])[0])
+
+    def _columns(self) -> Dict[str, np.ndarray]:
+        """Memory-mapped views of all complete rows, remapped when the store grows."""
+        rows = len(self)
+        if rows != self._mapped_rows:
+            if rows == 0:
+                self._maps = {
+                    name: np.empty(0, dtype=dtype)
+                    for name, dtype in COLUMNS.items()
+                }
+            else:
+                self._maps = {
+                    name: np.memmap(self._path(f"{name}.bin"),
+                                    dtype=dtype,
+                                    mode="r",
+                                    shape=(rows, ))
+                    for name, dtype in COLUMNS.items()
+                }
+            self._mapped_rows = rows
+        return self._maps
+
+    def scan(self,
+             start: Optional[float] = None,
+             end: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """
+        Rows with start <= timestamp < end as zero-copy views of the mapped columns.
+
+        Args:
+            start (float): Unix time of the first row to include
+            end (float): Unix time to stop before
+
+        Returns:
+            Dict[str, np.ndarray]: Column name -> read-only view
+        """
+        with self._lock:
+            columns = self._columns()
+        timestamps = columns["timestamp"]
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, "left"))
+        hi = len(timestamps) if end is None else int(
+            np.searchsorted(timestamps, end, "left"))
+        return {name: column[lo:hi] for name, column in columns.items()}
+
+    def history(self,
+                token_address: str,
+                start: Optional[float] = None,
+                end: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """
+        One token's rows in a time range.
+
+        The time range is a zero-copy slice; selecting the token's rows
+        inside it gathers them into new arrays.
+
+        Returns:
+            Dict[str, np.ndarray]: Column name -> array, empty if the token is unknown
+        """
+        window = self.scan(start, end)
+        token = self.token_id(token_address)
+        if token is None:
+            return {name: column[:0] for name, column in window.items()}
+        mask = window["token"] == token
+        return {name: column[mask] for name, column in window.items()}
+
+    def ingest_moralis_response(self, path: str, params: Optional[Dict[str, Any]],
+                                data: Any):
+        """
+        MoralisClient response hook: record market data from trending, token and pairs responses.
+
+        Only parses the response; the rows are written by the background writer.
+        """
+        params = params or {}
+        rows = []
+        if path == "/discovery/tokens/trending" and isinstance(data, list):
+            for token in data:
+                if token.get("token_address"):
+                    rows.append({
+                        "token": token["token_address"],
+                        "price_usd": token.get("price_usd"),
+                        "market_cap": token.get("market_cap"),
+                        "security_score": token.get("security_score"),
+                        "source": SOURCE_TRENDING,
+                    })
+        elif path == "/discovery/token" and isinstance(data, dict):
+            address = data.get("token_address") or params.get("token_address")
+            if address:
+                rows.append({
+                    "token": address,
+                    "price_usd": data.get("price_usd"),
+                    "market_cap": data.get("market_cap"),
+                    "security_score": data.get("security_score"),
+                    "source": SOURCE_DETAILS,
+                })
+        elif _PAIRS_PATH.match(path) and isinstance(data, dict):
+            pairs = data.get("pairs") or []
+            if pairs:
+                liquidity = np.array(
+                    [_number(pair.get("liquidity_usd")) for pair in pairs])
+                deepest = pairs[int(np.argmax(np.nan_to_num(liquidity, nan=-1.0)))]
+                rows.append({
+                    "token": _PAIRS_PATH.match(path).group(1),
+                    "price_usd": deepest.get("usd_price"),
+                    "liquidity_usd": float(np.nansum(liquidity)),
+                    "source": SOURCE_PAIRS,
+                })
+        self.submit(rows)
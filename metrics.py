@@ -0,0 +1,372 @@
+import bisect
+import contextvars
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+# Upper bounds of the histogram buckets for durations (seconds) and sizes (bytes, chars, tokens)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_ADDRESS = re.compile(r"0x[0-9a-fA-F]+")
+
+LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: Dict[str, Any]) -> LabelKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def endpoint_label(path: str) -> str:
+    """Collapse addresses in a Moralis path so all tokens share one label, e.g. /erc20/{address}/pairs."""
+    return _ADDRESS.sub("{address}", path)
+
+
+class Histogram:
+    """Fixed-bucket histogram with count, sum, min and max."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating inside the bucket that contains it."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[i - 1] if i > 0 else min(self.min, self.buckets[0])
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                lower, upper = max(lower, self.min), min(upper, self.max)
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "min": self.min if self.count else 0.0,
+            "max": self.max if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], self.counts)),
+        }
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of labelled counters and histograms.
+
+    Read it with snapshot(), serve it with start_http_server() or write it
+    to disk every few seconds with start_periodic_dump().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[LabelKey, float] = {}
+        self._histograms: Dict[LabelKey, Histogram] = {}
+        self.started_at = time.time()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add value to a counter."""
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float,
+                buckets: Sequence[float] = LATENCY_BUCKETS, **labels):
+        """Record one value in a histogram, creating it with buckets on first use."""
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started_at = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns:
+            dict: {"counters": [...], "histograms": [...]}, one entry per name and label set
+        """
+        with self._lock:
+            return {
+                "uptime_seconds": time.time() - self.started_at,
+                "counters": [{
+                    "name": name,
+                    "labels": dict(labels),
+                    "value": value,
+                } for (name, labels), value in sorted(self._counters.items())],
+                "histograms": [{
+                    "name": name,
+                    "labels": dict(labels),
+                    **histogram.snapshot(),
+                } for (name, labels), histogram in sorted(self._histograms.items())],
+            }
+
+    def to_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+
+        def labels_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                lines.append(f"{name}{labels_text(labels)} {value}")
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(
+                        [str(b) for b in histogram.buckets] + ["+Inf"], histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{labels_text(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_sum{labels_text(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{labels_text(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str):
+        """Write snapshot() as JSON, replacing the file atomically."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def start_periodic_dump(self, path: str, interval: float = 30.0) -> threading.Thread:
+        """Dump to path every interval seconds from a daemon thread."""
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.dump(path)
+                except OSError as e:
+                    print(f"Error writing metrics to {path}: {str(e)}", file=sys.stderr)
+
+        thread = threading.Thread(target=loop, name="metrics-dump", daemon=True)
+        thread.start()
+        return thread
+
+    def start_http_server(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Serve the metrics on http://host:port/metrics from a daemon thread.
+
+        JSON by default; Prometheus text with ?format=prometheus.
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if not self.path.startswith("/metrics"):
+                    self.send_error(404)
+                    return
+                if "format=prometheus" in self.path:
+                    body = registry.to_prometheus().encode()
+                    content_type = "text/plain; version=0.0.4"
+                else:
+                    body = json.dumps(registry.snapshot(), indent=2).encode()
+                    content_type = "application/json"
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http",
+                         daemon=True).start()
+        return server
+
+
+# Process-wide registry used by the tool executor, the Moralis clients and run.py
+metrics = MetricsRegistry()
+
+
+@dataclass
+class TurnUsage:
+    """Resources one agent turn consumed, across all its LLM and tool calls."""
+
+    started_at: float = field(default_factory=time.perf_counter)
+    first_token_at: Optional[float] = None
+    llm_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    tool_calls: int = 0
+    tool_output_chars: int = 0
+    moralis_requests: int = 0
+    moralis_bytes: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, **amounts: int):
+        """Add to several counters at once; tools of one turn may run in parallel."""
+        with self._lock:
+            for name, amount in amounts.items():
+                setattr(self, name, getattr(self, name) + amount)
+
+    @property
+    def ttft(self) -> Optional[float]:
+        """Seconds from the start of the turn to the first streamed token."""
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+
+@dataclass
+class ToolCallUsage:
+    """Resources one tool call consumed, filled in while it runs."""
+
+    tool: str
+    moralis_requests: int = 0
+    moralis_bytes: int = 0
+
+
+_current_turn: contextvars.ContextVar[Optional[TurnUsage]] = \
+    contextvars.ContextVar("current_turn", default=None)
+_current_tool_call: contextvars.ContextVar[Optional[ToolCallUsage]] = \
+    contextvars.ContextVar("current_tool_call", default=None)
+
+
+def current_turn() -> Optional[TurnUsage]:
+    return _current_turn.get()
+
+
+@contextmanager
+def track_turn(mode: str) -> Iterator[TurnUsage]:
+    """
+    Measure one agent turn: wall time, time to first token, tokens, tool calls and Moralis traffic.
+
+    LLM completions and tool calls made in the same context while the block
+    runs are added to the yielded TurnUsage. Tools run on other threads must
+    be started with contextvars.copy_context().run to be counted.
+    """
+    turn = TurnUsage()
+    token = _current_turn.set(turn)
+    try:
+        yield turn
+    finally:
+        _current_turn.reset(token)
+        metrics.observe("agent_turn_seconds", time.perf_counter() - turn.started_at, mode=mode)
+        metrics.inc("agent_turns_total", mode=mode)
+        if turn.ttft is not None:
+            metrics.observe("agent_turn_ttft_seconds", turn.ttft, mode=mode)
+        metrics.observe("agent_turn_llm_calls", turn.llm_calls, SIZE_BUCKETS, mode=mode)
+        metrics.observe("agent_turn_tool_calls", turn.tool_calls, SIZE_BUCKETS, mode=mode)
+        metrics.observe("agent_turn_prompt_tokens", turn.prompt_tokens, SIZE_BUCKETS, mode=mode)
+        metrics.observe("agent_turn_completion_tokens", turn.completion_tokens, SIZE_BUCKETS, mode=mode)
+        metrics.observe("agent_turn_moralis_bytes", turn.moralis_bytes, SIZE_BUCKETS, mode=mode)
+
+
+@contextmanager
+def track_tool_call(tool: str) -> Iterator[ToolCallUsage]:
+    """
+    Measure one tool call: wall time, errors, and the Moralis traffic it caused.
+
+    Moralis responses received in the same thread (or in coroutines started
+    from it) while the block runs are attributed to this call.
+    """
+    usage = ToolCallUsage(tool)
+    token = _current_tool_call.set(usage)
+    start = time.perf_counter()
+    try:
+        yield usage
+    except BaseException:
+        metrics.inc("tool_errors_total", tool=tool)
+        raise
+    finally:
+        _current_tool_call.reset(token)
+        metrics.observe("tool_call_seconds", time.perf_counter() - start, tool=tool)
+        metrics.inc("tool_calls_total", tool=tool)
+        metrics.observe("tool_moralis_bytes", usage.moralis_bytes, SIZE_BUCKETS, tool=tool)
+        metrics.inc("tool_moralis_requests_total", usage.moralis_requests, tool=tool)
+        turn = _current_turn.get()
+        if turn is not None:
+            turn.add(tool_calls=1)
+
+
+def record_tool_output(tool: str, output: str):
+    """Record the size of a tool result handed back to the LLM, and whether it is an error message."""
+    metrics.observe("tool_output_chars", len(output), SIZE_BUCKETS, tool=tool)
+    if output.lstrip().startswith(("Error", "Unexpected error")):
+        metrics.inc("tool_errors_total", tool=tool)
+    turn = _current_turn.get()
+    if turn is not None:
+        turn.add(tool_output_chars=len(output))
+
+
+def record_llm_call(model: str,
+                    seconds: float,
+                    prompt_tokens: int,
+                    completion_tokens: int,
+                    estimated: bool,
+                    ttft: Optional[float] = None):
+    """
+    Record one chat completion.
+
+    Args:
+        model (str): Model name
+        seconds (float): Time until the completion finished
+        prompt_tokens (int): Prompt tokens
+        completion_tokens (int): Completion tokens
+        estimated (bool): Whether the token counts are estimates rather than reported usage
+        ttft (float): Seconds until the first streamed chunk
+    """
+    source = "estimated" if estimated else "reported"
+    metrics.observe("llm_completion_seconds", seconds, model=model)
+    if ttft is not None:
+        metrics.observe("llm_ttft_seconds", ttft, model=model)
+    metrics.inc("llm_calls_total", model=model)
+    metrics.inc("llm_prompt_tokens_total", prompt_tokens, model=model, source=source)
+    metrics.inc("llm_completion_tokens_total", completion_tokens, model=model, source=source)
+    metrics.observe("llm_prompt_tokens", prompt_tokens, SIZE_BUCKETS, model=model)
+    turn = _current_turn.get()
+    if turn is not None:
+        turn.add(llm_calls=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+
+def record_moralis_response(path: str, size: int):
+    """Count a response body received from Moralis, attributing it to the running tool call and turn."""
+    endpoint = endpoint_label(path)
+    metrics.inc("moralis_requests_total", endpoint=endpoint)
+    metrics.inc("moralis_response_bytes_total", size, endpoint=endpoint)
+    usage = _current_tool_call.get()
+    if usage is not None:
+        usage.moralis_requests += 1
+        usage.moralis_bytes += size
+    turn = _current_turn.get()
+    if turn is not None:
+        turn.add(moralis_requests=1, moralis_bytes=size)
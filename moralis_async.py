@@ -0,0 +1,169 @@
+import asyncio
+import random
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from metrics import record_moralis_response
+from moralis_cache import EndpointTTLs, TTLCache, make_cache_key
+from moralis_client import MoralisClient, ResponseHook, run_response_hooks
+from moralis_limiter import AsyncRequestCoalescer, ComputeUnitLimiter
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class AsyncMoralisClient:
+    """
+    asyncio-based Moralis client for fanning out many requests at once.
+
+    Shares the response cache and freshness rules of the synchronous
+    MoralisClient, caps the number of in-flight requests with a semaphore,
+    bounds every request with its own timeout, and shares one upstream call
+    among identical concurrent requests. When built with from_client it
+    also draws from the sync client's compute-unit budget. Use it as an async
+    context manager so the underlying connection pool is closed.
+    """
+
+    def __init__(self,
+                 api_key: Optional[str],
+                 base_url: str,
+                 concurrency: int = 8,
+                 request_timeout: float = 10.0,
+                 connect_timeout: float = 3.05,
+                 max_retries: int = 2,
+                 backoff_factor: float = 0.5,
+                 cache: Optional[TTLCache] = None,
+                 ttls: Optional[EndpointTTLs] = None,
+                 response_hooks: Optional[List[ResponseHook]] = None,
+                 limiter: Optional[ComputeUnitLimiter] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        Args:
+            api_key (str): Moralis API key sent as the X-API-Key header
+            base_url (str): Base URL of the Moralis API
+            concurrency (int): Maximum number of requests in flight
+            request_timeout (float): Upper bound in seconds for one request, retries included
+            connect_timeout (float): Seconds to wait for a connection
+            max_retries (int): Retries on connection errors, 429 and 5xx
+            backoff_factor (float): Backoff multiplier between retries
+            cache (TTLCache): Response cache to read from and fill
+            ttls (EndpointTTLs): Per-endpoint cache freshness rules
+            response_hooks (list): Called as hook(path, params, data) with every fetched response
+            limiter (ComputeUnitLimiter): Compute-unit budget, unlimited if omitted
+            transport (httpx.AsyncBaseTransport): Transport to send requests through instead of the network
+        """
+        self.base_url = base_url.rstrip("/")
+        self.request_timeout = request_timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.cache = cache if cache is not None else TTLCache()
+        self.ttls = ttls or EndpointTTLs()
+        self.response_hooks = response_hooks or []
+        self.limiter = limiter or ComputeUnitLimiter(0)
+        self.coalescer = AsyncRequestCoalescer()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._client = httpx.AsyncClient(
+            headers={
+                "accept": "application/json",
+                "X-API-Key": api_key or "",
+            },
+            timeout=httpx.Timeout(request_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=concurrency,
+                                max_keepalive_connections=concurrency),
+            transport=transport,
+        )
+
+    @classmethod
+    def from_client(cls, client: MoralisClient,
+                    **kwargs) -> "AsyncMoralisClient":
+        """
+        Build an async client that shares the key, base URL, cache, hooks and limiter of a sync client.
+        """
+        kwargs.setdefault("cache", client.cache)
+        kwargs.setdefault("ttls", client.ttls)
+        kwargs.setdefault("response_hooks", client.response_hooks)
+        kwargs.setdefault("limiter", client.limiter)
+        if client.async_transport_factory is not None:
+            kwargs.setdefault("transport", client.async_transport_factory())
+        return cls(client.api_key, client.base_url, **kwargs)
+
+    async def __aenter__(self) -> "AsyncMoralisClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close all pooled connections."""
+        await self._client.aclose()
+
+    async def get(self,
+                  path: str,
+                  params: Optional[Dict[str, Any]] = None,
+                  fresh: bool = False) -> Any:
+        """
+        Fetch a Moralis endpoint and decode the JSON body, using the shared cache.
+
+        Args:
+            path (str): Endpoint path relative to the base URL
+            params (dict): Query string parameters
+            fresh (bool): Skip the cache lookup and refetch; the result is still cached
+
+        Returns:
+            Any: The decoded JSON response
+
+        Raises:
+            httpx.HTTPError: On connection errors or error statuses
+            asyncio.TimeoutError: If the request exceeds request_timeout
+        """
+        ttl = self.ttls.ttl_for(path)
+        key = make_cache_key(path, params)
+        if ttl > 0 and not fresh:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        async def fetch() -> Any:
+            await self.limiter.acquire_async(path, params)
+            async with self._semaphore:
+                data = await asyncio.wait_for(
+                    self._get_with_retries(path, params), self.request_timeout)
+            self.cache.set(key, data, ttl)
+            run_response_hooks(self.response_hooks, path, params, data)
+            return data
+
+        return await self.coalescer.do(key, fetch)
+
+    async def _get_with_retries(self, path: str,
+                                params: Optional[Dict[str, Any]]) -> Any:
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self._client.get(f"{self.base_url}{path}",
+                                                  params=params)
+                if (response.status_code not in RETRY_STATUSES
+                        or attempt == self.max_retries):
+                    response.raise_for_status()
+                    record_moralis_response(path, len(response.content))
+                    return response.json()
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    raise
+            delay = self.backoff_factor * (2**attempt)
+            await asyncio.sleep(delay + random.uniform(0, delay / 2))
+
+    async def gather(self,
+                     requests: Sequence[Tuple[str, Optional[Dict[str, Any]]]],
+                     fresh: bool = False) -> List[Any]:
+        """
+        Fetch many endpoints concurrently.
+
+        Args:
+            requests (list): (path, params) pairs
+            fresh (bool): Skip the cache lookup for every request
+
+        Returns:
+            list: Decoded responses in request order; a failed request yields its exception
+        """
+        return await asyncio.gather(
+            *(self.get(path, params, fresh=fresh) for path, params in requests),
+            return_exceptions=True)
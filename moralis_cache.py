@@ -0,0 +1,127 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+# Freshness per Moralis endpoint, matched against the request path in order.
+# Token metadata (name, symbol, decimals) barely changes, while prices and
+# trending lists go stale within seconds.
+DEFAULT_ENDPOINT_TTLS: List[Tuple[str, float]] = [
+    (r"^/erc20/metadata$", 6 * 60 * 60),
+    (r"^/discovery/tokens/trending$", 30),
+    (r"^/discovery/token$", 30),
+    (r"^/erc20/[^/]+/pairs$", 30),
+    (r"^/wallets/[^/]+/tokens$", 15),
+    (r"^/wallets/[^/]+/profitability$", 60),
+]
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after a per-entry TTL.
+
+    Tracks hit, miss and eviction counters so callers can see how much
+    upstream traffic the cache is saving.
+    """
+
+    def __init__(self, maxsize: int = 1024,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            maxsize (int): Maximum number of entries kept before evicting the least recently used
+            clock (Callable): Time source in seconds for expiry
+        """
+        self.maxsize = maxsize
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the cached value for key, or default if absent or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float):
+        """
+        Store value under key for ttl seconds, evicting the oldest entries if full.
+        """
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self.clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        """Drop a single entry if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop every entry. Counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            dict: Current size, capacity, hits, misses, evictions and hit ratio
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class EndpointTTLs:
+    """Resolve the cache TTL for a Moralis request path."""
+
+    def __init__(self,
+                 rules: Optional[List[Tuple[str, float]]] = None,
+                 default_ttl: float = 0):
+        """
+        Args:
+            rules (list): (path regex, ttl seconds) pairs, first match wins
+            default_ttl (float): TTL for paths that match no rule; 0 disables caching
+        """
+        self.rules = [(re.compile(pattern), ttl)
+                      for pattern, ttl in (rules or DEFAULT_ENDPOINT_TTLS)]
+        self.default_ttl = default_ttl
+
+    def ttl_for(self, path: str) -> float:
+        for pattern, ttl in self.rules:
+            if pattern.match(path):
+                return ttl
+        return self.default_ttl
+
+
+def make_cache_key(path: str, params: Optional[Dict[str, Any]]) -> Tuple:
+    """Build a hashable cache key from a request path and its query parameters."""
+    return (path, tuple(sorted((params or {}).items())))
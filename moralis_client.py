@@ -0,0 +1,327 @@
+import os
+import sys
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from json_stream import StreamingArrayReader
+from metrics import record_moralis_response
+from moralis_cache import EndpointTTLs, TTLCache, make_cache_key
+from moralis_limiter import ComputeUnitLimiter, RequestCoalescer
+
+MORALIS_BASE_URL = os.environ.get("MORALIS_BASE_URL",
+                                  "https://deep-index.moralis.io/api/v2.2")
+
+# Maximum number of addresses accepted by one /erc20/metadata request
+ERC20_METADATA_MAX_ADDRESSES = 10
+
+# Called as hook(path, params, data) with every freshly fetched JSON response
+ResponseHook = Callable[[str, Optional[Dict[str, Any]], Any], None]
+
+
+def run_response_hooks(hooks: List[ResponseHook], path: str,
+                       params: Optional[Dict[str, Any]], data: Any):
+    """Call every response hook; a failing hook never fails the request."""
+    for hook in hooks:
+        try:
+            hook(path, params, data)
+        except Exception as e:
+            print(f"Moralis response hook {getattr(hook, '__name__', hook)} failed: {e}",
+                  file=sys.stderr)
+
+
+class MoralisClient:
+    """
+    Shared HTTP client for the Moralis Web3 Data API.
+
+    Keeps one keep-alive connection pool to the Moralis host so consecutive
+    tool calls reuse the same TCP+TLS connection, sends the auth headers with
+    every request, and retries 429/5xx responses with exponential backoff.
+    Decoded JSON responses are cached with a per-endpoint TTL, concurrent
+    identical requests share one upstream call, and every request is paced
+    by a compute-unit budget.
+    """
+
+    def __init__(self,
+                 api_key: Optional[str],
+                 base_url: str = MORALIS_BASE_URL,
+                 pool_size: int = 10,
+                 connect_timeout: float = 3.05,
+                 read_timeout: float = 15.0,
+                 max_retries: int = 3,
+                 backoff_factor: float = 0.5,
+                 cache: Optional[TTLCache] = None,
+                 ttls: Optional[EndpointTTLs] = None,
+                 limiter: Optional[ComputeUnitLimiter] = None):
+        """
+        Args:
+            api_key (str): Moralis API key sent as the X-API-Key header
+            base_url (str): Base URL of the Moralis API
+            pool_size (int): Maximum number of pooled keep-alive connections
+            connect_timeout (float): Seconds to wait for a connection
+            read_timeout (float): Seconds to wait for response data
+            max_retries (int): Retries on connection errors, 429 and 5xx
+            backoff_factor (float): Backoff multiplier between retries
+            cache (TTLCache): Response cache, a fresh 1024-entry cache if omitted
+            ttls (EndpointTTLs): Per-endpoint cache freshness rules
+            limiter (ComputeUnitLimiter): Compute-unit budget, unlimited if omitted
+        """
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.cache = cache if cache is not None else TTLCache()
+        self.ttls = ttls or EndpointTTLs()
+        self.limiter = limiter or ComputeUnitLimiter(0)
+        self.coalescer = RequestCoalescer()
+        self.response_hooks: List[ResponseHook] = []
+        # Builds the httpx transport of async clients made with AsyncMoralisClient.from_client
+        self.async_transport_factory: Optional[Callable[[], Any]] = None
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET", ),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1,
+                              pool_maxsize=pool_size,
+                              max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "accept": "application/json",
+            "X-API-Key": api_key or "",
+        })
+
+    def get_response(self, path: str,
+                     params: Optional[Dict[str, Any]] = None,
+                     **kwargs) -> requests.Response:
+        """
+        Send a GET request to a Moralis endpoint over the pooled session,
+        waiting first if the compute-unit budget is exhausted.
+
+        Args:
+            path (str): Endpoint path relative to the base URL (e.g. "/erc20/metadata")
+            params (dict): Query string parameters
+
+        Returns:
+            requests.Response: The response, already checked with raise_for_status()
+
+        Raises:
+            requests.exceptions.RequestException: On connection errors or error statuses
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        self.limiter.acquire(path, params)
+        response = self.session.get(f"{self.base_url}{path}",
+                                    params=params,
+                                    **kwargs)
+        response.raise_for_status()
+        if not kwargs.get("stream"):
+            record_moralis_response(path, len(response.content))
+        return response
+
+    def get(self,
+            path: str,
+            params: Optional[Dict[str, Any]] = None,
+            fresh: bool = False) -> Any:
+        """
+        Send a GET request to a Moralis endpoint and decode the JSON body.
+        Served from the response cache while the endpoint's TTL allows it;
+        callers asking for the same request while it is in flight share it.
+
+        Args:
+            path (str): Endpoint path relative to the base URL
+            params (dict): Query string parameters
+            fresh (bool): Skip the cache lookup and refetch; the result is still cached
+
+        Returns:
+            Any: The decoded JSON response
+
+        Raises:
+            requests.exceptions.RequestException: On connection errors or error statuses
+            ValueError: If the response body is not valid JSON
+        """
+        ttl = self.ttls.ttl_for(path)
+        key = make_cache_key(path, params)
+        if ttl > 0 and not fresh:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        def fetch() -> Any:
+            data = self.get_response(path, params).json()
+            self.cache.set(key, data, ttl)
+            run_response_hooks(self.response_hooks, path, params, data)
+            return data
+
+        return self.coalescer.do(key, fetch)
+
+    def add_response_hook(self, hook: ResponseHook):
+        """Register hook(path, params, data) to see every freshly fetched JSON response."""
+        self.response_hooks.append(hook)
+
+    def paginate(self,
+                 path: str,
+                 params: Optional[Dict[str, Any]] = None,
+                 fresh: bool = False,
+                 max_pages: Optional[int] = None) -> Iterator[dict]:
+        """
+        Lazily iterate over the "result" items of a cursor-paginated endpoint.
+
+        The next page is only requested once the caller has consumed the
+        current one, so breaking out of the loop stops further requests.
+
+        Args:
+            path (str): Endpoint path relative to the base URL
+            params (dict): Query string parameters of the first page
+            fresh (bool): Skip the cache lookup for every page
+            max_pages (int): Stop after this many pages
+
+        Yields:
+            dict: One result item at a time
+
+        Raises:
+            requests.exceptions.RequestException: On connection errors or error statuses
+        """
+        params = dict(params or {})
+        pages = 0
+        while True:
+            page = self.get(path, params, fresh=fresh)
+            pages += 1
+            yield from page.get("result") or []
+
+            cursor = page.get("cursor")
+            if not cursor or (max_pages is not None and pages >= max_pages):
+                return
+            params["cursor"] = cursor
+
+    def stream_paginate(self,
+                        path: str,
+                        params: Optional[Dict[str, Any]] = None,
+                        max_pages: Optional[int] = None,
+                        chunk_size: int = 64 * 1024) -> Iterator[dict]:
+        """
+        Like paginate, but parse each page incrementally from the socket.
+
+        Items are decoded one at a time while the body streams in, so peak
+        memory is bounded by the largest single item rather than the page.
+        Streamed pages bypass the response cache.
+
+        Args:
+            path (str): Endpoint path relative to the base URL
+            params (dict): Query string parameters of the first page
+            max_pages (int): Stop after this many pages
+            chunk_size (int): Bytes read from the socket at a time
+
+        Yields:
+            dict: One result item at a time
+
+        Raises:
+            requests.exceptions.RequestException: On connection errors or error statuses
+            ValueError: If a page is not valid JSON
+        """
+        params = dict(params or {})
+        pages = 0
+        while True:
+            with self.get_response(path, params, stream=True) as response:
+                reader = StreamingArrayReader(
+                    response.iter_content(chunk_size=chunk_size))
+                try:
+                    yield from reader.items()
+                finally:
+                    record_moralis_response(path, reader.bytes_read)
+            pages += 1
+
+            cursor = reader.meta.get("cursor")
+            if not cursor or (max_pages is not None and pages >= max_pages):
+                return
+            params["cursor"] = cursor
+
+    def get_erc20_metadata(self,
+                           addresses: List[str],
+                           chain: str,
+                           fresh: bool = False) -> List[Optional[dict]]:
+        """
+        Fetch ERC-20 metadata for many token addresses in as few requests as possible.
+
+        Addresses already in the cache are not requested again. The rest are
+        de-duplicated and sent in chunks of ERC20_METADATA_MAX_ADDRESSES, and
+        every returned token is cached on its own so later single-address
+        lookups hit the cache too.
+
+        Args:
+            addresses (list): Token contract addresses
+            chain (str): Moralis chain name (e.g. "base")
+            fresh (bool): Ignore cached metadata and refetch every address
+
+        Returns:
+            list: Metadata dicts in input order, None for addresses Moralis has no data for
+
+        Raises:
+            requests.exceptions.RequestException: On connection errors or error statuses
+        """
+        path = "/erc20/metadata"
+        ttl = self.ttls.ttl_for(path)
+        found: Dict[str, dict] = {}
+        missing: List[str] = []
+        seen = set()
+
+        for address in addresses:
+            key = address.lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            cached = None if fresh else self.cache.get((path, chain, key))
+            if cached is not None:
+                found[key] = cached
+            else:
+                missing.append(key)
+
+        for start in range(0, len(missing), ERC20_METADATA_MAX_ADDRESSES):
+            chunk = missing[start:start + ERC20_METADATA_MAX_ADDRESSES]
+            params = {"chain": chain}
+            for i, address in enumerate(chunk):
+                params[f"addresses[{i}]"] = address
+            for token in self.get_response(path, params).json() or []:
+                key = (token.get("address") or "").lower()
+                if key:
+                    found[key] = token
+                    self.cache.set((path, chain, key), token, ttl)
+
+        return [found.get(address.lower()) for address in addresses]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            dict: Cache, compute-unit limiter and request coalescing counters
+        """
+        return {
+            "cache": self.cache.stats(),
+            "limiter": self.limiter.stats(),
+            "coalescer": self.coalescer.stats(),
+        }
+
+    def close(self):
+        """Close all pooled connections."""
+        self.session.close()
+
+
+# Process-wide client shared by every Moralis tool in agents.py
+moralis_client = MoralisClient(
+    api_key=os.environ.get("MORALIS_API_KEY"),
+    pool_size=int(os.environ.get("MORALIS_POOL_SIZE", "10")),
+    connect_timeout=float(os.environ.get("MORALIS_CONNECT_TIMEOUT", "3.05")),
+    read_timeout=float(os.environ.get("MORALIS_READ_TIMEOUT", "15")),
+    max_retries=int(os.environ.get("MORALIS_MAX_RETRIES", "3")),
+    cache=TTLCache(maxsize=int(os.environ.get("MORALIS_CACHE_SIZE", "1024"))),
+    limiter=ComputeUnitLimiter(
+        cu_per_second=float(os.environ.get("MORALIS_CU_PER_SECOND", "1000")),
+        burst=float(os.environ["MORALIS_CU_BURST"])
+        if os.environ.get("MORALIS_CU_BURST") else None),
+)
@@ -0,0 +1,244 @@
+import asyncio
+import re
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+# Compute units billed per request, matched against the request path in
+# order. Batch endpoints are billed per item; see ComputeUnitLimiter.cost_for.
+# Values follow the Moralis pricing table and can be overridden per client.
+DEFAULT_ENDPOINT_COSTS: List[Tuple[str, float]] = [
+    (r"^/erc20/metadata$", 10),
+    (r"^/discovery/tokens/trending$", 50),
+    (r"^/discovery/token$", 50),
+    (r"^/erc20/[^/]+/pairs$", 50),
+    (r"^/wallets/[^/]+/tokens$", 100),
+    (r"^/wallets/[^/]+/profitability$", 50),
+    (r"^/[^/]+/nft$", 50),
+]
+
+# Endpoints billed once per address in an "addresses[i]" batch
+PER_ADDRESS_ENDPOINTS = re.compile(r"^/erc20/metadata$")
+
+
+class ComputeUnitLimiter:
+    """
+    Thread-safe token bucket measured in Moralis compute units (CU).
+
+    The bucket refills at cu_per_second up to burst. A request reserves its
+    CU cost up front and, if that overdraws the bucket, sleeps until the
+    refill covers it; reservations queue in arrival order, so throughput
+    never exceeds the budget however many threads or coroutines share the
+    limiter. Waiting callers and total throttle time are tracked for stats().
+    """
+
+    def __init__(self,
+                 cu_per_second: float,
+                 burst: Optional[float] = None,
+                 rules: Optional[List[Tuple[str, float]]] = None,
+                 default_cost: float = 50):
+        """
+        Args:
+            cu_per_second (float): Sustained compute unit budget; 0 disables limiting
+            burst (float): Bucket capacity, one second of budget if omitted
+            rules (list): (path regex, CU cost) pairs, first match wins
+            default_cost (float): Cost of paths that match no rule
+        """
+        self.cu_per_second = cu_per_second
+        self.burst = burst if burst is not None else cu_per_second
+        self.rules = [(re.compile(pattern), cost)
+                      for pattern, cost in (rules or DEFAULT_ENDPOINT_COSTS)]
+        self.default_cost = default_cost
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.requests = 0
+        self.throttled = 0
+        self.throttle_seconds = 0.0
+        self.cu_spent = 0.0
+
+    def cost_for(self, path: str, params: Optional[Dict[str, Any]] = None) -> float:
+        """CU cost of one request, counting every address of a batch request."""
+        cost = self.default_cost
+        for pattern, rule_cost in self.rules:
+            if pattern.match(path):
+                cost = rule_cost
+                break
+        if PER_ADDRESS_ENDPOINTS.match(path) and params:
+            addresses = sum(1 for key in params if key.startswith("addresses["))
+            cost *= max(addresses, 1)
+        return cost
+
+    def reserve(self, cost: float) -> float:
+        """Take cost from the bucket and return how long the caller must wait for it."""
+        with self._lock:
+            self.requests += 1
+            self.cu_spent += cost
+            if self.cu_per_second <= 0:
+                return 0.0
+            now = time.monotonic()
+            self._tokens = min(self.burst,
+                               self._tokens + (now - self._updated) * self.cu_per_second)
+            self._updated = now
+            # A single request larger than the bucket still goes through once it refills
+            self._tokens -= min(cost, self.burst)
+            if self._tokens >= 0:
+                return 0.0
+            delay = -self._tokens / self.cu_per_second
+            self.throttled += 1
+            self.throttle_seconds += delay
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+            return delay
+
+    def release(self):
+        """End the wait of a caller whose reservation was throttled."""
+        with self._lock:
+            self.queue_depth -= 1
+
+    def acquire(self, path: str, params: Optional[Dict[str, Any]] = None) -> float:
+        """
+        Block until the budget allows a request to path.
+
+        Returns:
+            float: Seconds spent throttled
+        """
+        delay = self.reserve(self.cost_for(path, params))
+        if delay > 0:
+            try:
+                time.sleep(delay)
+            finally:
+                self.release()
+        return delay
+
+    async def acquire_async(self, path: str,
+                            params: Optional[Dict[str, Any]] = None) -> float:
+        """Like acquire, but sleeps without blocking the event loop."""
+        delay = self.reserve(self.cost_for(path, params))
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self.release()
+        return delay
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            dict: Budget, CU spent, request and throttle counters and queue depth
+        """
+        with self._lock:
+            return {
+                "cu_per_second": self.cu_per_second,
+                "cu_spent": self.cu_spent,
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "throttle_seconds": self.throttle_seconds,
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+            }
+
+
+class _Call:
+    """One in-flight upstream call that other threads can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class RequestCoalescer:
+    """
+    Collapse concurrent identical requests into one upstream call.
+
+    The first thread to ask for a key runs the call; threads asking for the
+    same key while it is in flight wait for it and share its result or
+    exception. Nothing is remembered once the call finishes, that is the
+    cache's job.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn() for key, or wait for the identical call already in flight.
+
+        Returns:
+            Any: fn's result
+
+        Raises:
+            Exception: Whatever fn raised, in every waiting thread
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            dict: Upstream calls made, calls served by an in-flight call, and calls in flight
+        """
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }
+
+
+class AsyncRequestCoalescer:
+    """RequestCoalescer for coroutines running on one event loop."""
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, "asyncio.Future"] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn() for key, or the identical call already in flight."""
+        task = self._tasks.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shield so one caller's cancellation does not cancel the shared call
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._tasks),
+        }
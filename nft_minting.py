@@ -0,0 +1,202 @@
+import csv
+import json
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from tx_tracker import CONFIRMED, FAILED, PENDING, TransactionTracker
+
+SUBMITTED = "submitted"
+
+
+@dataclass
+class BulkMintReport:
+    """Outcome of a bulk mint run."""
+
+    total: int
+    confirmed: int = 0
+    failed: int = 0
+    skipped: int = 0
+    unconfirmed: int = 0
+    tokens_minted: int = 0
+    elapsed_seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def mints_per_minute(self) -> float:
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.confirmed * 60.0 / self.elapsed_seconds
+
+    def summary(self) -> str:
+        lines = [
+            f"Bulk mint finished: {self.confirmed}/{self.total} mints confirmed "
+            f"({self.tokens_minted} tokens), {self.failed} failed, "
+            f"{self.skipped} already done from checkpoint.",
+            f"Throughput: {self.mints_per_minute:.1f} mints/minute over {self.elapsed_seconds:.1f}s.",
+        ]
+        if self.unconfirmed:
+            lines.append(
+                f"{self.unconfirmed} mints were submitted without a recorded outcome; "
+                "they are not resubmitted on resume to avoid double minting.")
+        lines.extend(self.errors[:10])
+        if len(self.errors) > 10:
+            lines.append(f"... and {len(self.errors) - 10} more errors")
+        return "\n".join(lines)
+
+
+def read_recipients_csv(csv_path: str,
+                        default_quantity: int = 1) -> List[Tuple[str, int]]:
+    """
+    Read mint recipients from a CSV file.
+
+    The first column is the recipient address and an optional second column
+    the quantity. A header row is skipped if its first cell is not an address.
+
+    Args:
+        csv_path (str): Path to the CSV file
+        default_quantity (int): Quantity for rows without a quantity column
+
+    Returns:
+        List[Tuple[str, int]]: (address, quantity) pairs in file order
+    """
+    recipients = []
+    with open(csv_path, newline="") as f:
+        for row in csv.reader(f):
+            if not row or not row[0].strip():
+                continue
+            address = row[0].strip()
+            if not address.lower().startswith("0x"):
+                continue
+            quantity = int(row[1]) if len(row) > 1 and row[1].strip() else default_quantity
+            recipients.append((address, quantity))
+    return recipients
+
+
+class MintCheckpoint:
+    """
+    Append-only JSON-lines log of mint progress, keyed by recipient position.
+
+    Every submission and every outcome is appended and flushed, so after a
+    crash the last record per key tells which mints are done.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.state: Dict[str, dict] = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.state[record["key"]] = record
+        self._file = open(path, "a") if path else None
+
+    def status(self, key: str) -> Optional[str]:
+        record = self.state.get(key)
+        return record["status"] if record else None
+
+    def record(self, key: str, status: str, **fields):
+        record = {"key": key, "status": status, "time": time.time(), **fields}
+        self.state[key] = record
+        if self._file:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+
+
+def bulk_mint(wallet,
+              contract_address: str,
+              recipients: Iterable[Tuple[str, int]],
+              checkpoint_path: Optional[str] = None,
+              max_in_flight: int = 25,
+              tracker: Optional[TransactionTracker] = None,
+              confirm_timeout: float = 600.0,
+              retry_unconfirmed: bool = False) -> BulkMintReport:
+    """
+    Mint NFTs to many recipients with pipelined contract invocations.
+
+    Invocations are submitted without waiting for each one to confirm; up to
+    max_in_flight of them are outstanding at once and a TransactionTracker
+    confirms them together in batched polling rounds. Progress is written to
+    the checkpoint file so a rerun after a crash skips finished mints.
+
+    Args:
+        wallet (Wallet): CDP wallet that owns the mint permission
+        contract_address (str): Address of the NFT contract
+        recipients (Iterable[Tuple[str, int]]): (address, quantity) pairs
+        checkpoint_path (str): JSON-lines checkpoint file; no checkpointing if omitted
+        max_in_flight (int): Maximum submitted but unconfirmed mints
+        tracker (TransactionTracker): Tracker used to confirm mints; a private one if omitted
+        confirm_timeout (float): Seconds to wait for each mint to confirm
+        retry_unconfirmed (bool): Resubmit mints recorded as submitted without an outcome
+
+    Returns:
+        BulkMintReport: Counts, errors and throughput of the run
+    """
+    recipients = list(recipients)
+    tracker = tracker or TransactionTracker(poll_interval=1.0,
+                                            timeout=confirm_timeout)
+    checkpoint = MintCheckpoint(checkpoint_path)
+    report = BulkMintReport(total=len(recipients))
+    in_flight = deque()
+    start = time.time()
+
+    def settle(oldest_only: bool):
+        while in_flight and (not oldest_only or len(in_flight) >= max_in_flight):
+            key, address, quantity, handle_id = in_flight.popleft()
+            tracked = tracker.wait(handle_id, confirm_timeout)
+            if tracked.status == CONFIRMED:
+                report.confirmed += 1
+                report.tokens_minted += quantity
+                checkpoint.record(key, CONFIRMED, to=address,
+                                  transaction_link=tracked.transaction_link)
+            elif tracked.status == PENDING or tracked.timed_out:
+                # Still unknown; keep it recorded as submitted so a rerun won't mint twice
+                report.unconfirmed += 1
+                report.errors.append(f"Mint to {address} did not confirm within {confirm_timeout:.0f}s")
+            else:
+                report.failed += 1
+                error = tracked.error or "No confirmation"
+                report.errors.append(f"Mint to {address} failed: {error}")
+                checkpoint.record(key, FAILED, to=address, error=error)
+
+    try:
+        for index, (address, quantity) in enumerate(recipients):
+            key = f"{index}:{address.lower()}"
+            status = checkpoint.status(key)
+            if status == CONFIRMED:
+                report.skipped += 1
+                continue
+            if status == SUBMITTED and not retry_unconfirmed:
+                report.unconfirmed += 1
+                continue
+
+            settle(oldest_only=True)
+            try:
+                invocation = wallet.invoke_contract(
+                    contract_address=contract_address,
+                    method="mint",
+                    args={"to": address, "quantity": str(quantity)})
+            except Exception as e:
+                report.failed += 1
+                report.errors.append(f"Mint to {address} failed: {str(e)}")
+                checkpoint.record(key, FAILED, to=address, error=str(e))
+                continue
+
+            checkpoint.record(key, SUBMITTED, to=address, quantity=quantity)
+            handle_id = tracker.submit("mint_nft", invocation,
+                                       f"NFT mint to {address}")
+            in_flight.append((key, address, quantity, handle_id))
+
+        settle(oldest_only=False)
+    finally:
+        checkpoint.close()
+
+    report.elapsed_seconds = time.time() - start
+    return report
@@ -0,0 +1,234 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Fraction of the traded value lost per swap to fees and slippage, in basis points
+DEFAULT_FEE_BPS = 30
+DEFAULT_SLIPPAGE_BPS = 50
+
+
+@dataclass
+class PlannedSwap:
+    """One swap of a rebalance plan, sized in units of the asset sold."""
+
+    from_asset: str
+    to_asset: str
+    from_symbol: str
+    to_symbol: str
+    amount: float
+    usd_value: float
+
+
+@dataclass
+class RebalancePlan:
+    """The swaps that move a portfolio to its target weights, largest first."""
+
+    swaps: List[PlannedSwap]
+    total_usd: float
+    max_drift_before: float
+    max_drift_after: float
+    estimated_cost_usd: float
+    skipped: List[str] = field(default_factory=list)
+
+    @property
+    def turnover_usd(self) -> float:
+        return sum(swap.usd_value for swap in self.swaps)
+
+    def summary(self) -> str:
+        lines = [
+            f"Rebalance plan: {len(self.swaps)} swaps, ${self.turnover_usd:,.2f} of "
+            f"${self.total_usd:,.2f} traded, estimated fees and slippage ${self.estimated_cost_usd:,.2f}.",
+            f"Largest weight drift {self.max_drift_before:.2%} before, {self.max_drift_after:.2%} after.",
+        ]
+        lines.extend(
+            f"{i}. swap {swap.amount:.6g} {swap.from_symbol} ({swap.from_asset}) for "
+            f"{swap.to_symbol} ({swap.to_asset}), ~${swap.usd_value:,.2f}"
+            for i, swap in enumerate(self.swaps, 1))
+        lines.extend(self.skipped[:10])
+        if len(self.skipped) > 10:
+            lines.append(f"... and {len(self.skipped) - 10} more assets left as they are")
+        return "\n".join(lines)
+
+
+def rule_weights(rule: str, usd_values: np.ndarray) -> np.ndarray:
+    """
+    Target weights from a risk rule.
+
+    "equal" weights every asset the same; "cap:<pct>" keeps the current
+    weights but caps each asset at pct percent of the portfolio, handing the
+    excess to the uncapped assets in proportion to their value.
+
+    Raises:
+        ValueError: On an unknown rule or a cap too low to be satisfiable
+    """
+    n = len(usd_values)
+    if rule == "equal":
+        return np.full(n, 1.0 / n)
+    if rule.startswith("cap:"):
+        cap = float(rule[4:]) / 100
+        if cap * n < 1:
+            raise ValueError(f"A {cap:.0%} cap cannot hold a portfolio of {n} assets")
+        weights = usd_values / usd_values.sum()
+        # Water-filling: each round pins the assets over the cap and spreads
+        # their excess over the rest; at most n rounds
+        capped = np.zeros(n, dtype=bool)
+        for _ in range(n):
+            over = (weights > cap + 1e-12) & ~capped
+            if not over.any():
+                break
+            capped |= over
+            free = ~capped
+            remaining = 1.0 - cap * capped.sum()
+            free_total = weights[free].sum()
+            weights = np.where(capped, cap,
+                               weights * remaining / free_total if free_total > 0 else 0.0)
+        return weights
+    raise ValueError(f"Unknown rebalance rule {rule!r}; use 'equal' or 'cap:<pct>'")
+
+
+def plan_rebalance(assets: Sequence[str],
+                   symbols: Sequence[str],
+                   balances: Sequence[float],
+                   prices: Sequence[float],
+                   targets: np.ndarray,
+                   min_trade_usd: float = 10.0,
+                   drift_threshold: float = 0.01,
+                   fee_bps: float = DEFAULT_FEE_BPS,
+                   slippage_bps: float = DEFAULT_SLIPPAGE_BPS) -> RebalancePlan:
+    """
+    Compute the swaps that bring a portfolio to its target weights.
+
+    Everything is computed on arrays: values, weights and drift per asset,
+    then the thresholds. An asset is traded only if its weight drifted by at
+    least drift_threshold, by at least the fee and slippage of the trade,
+    and by at least min_trade_usd. The surviving sells and buys are scaled
+    to fund each other and matched in one pass over their cumulative sums,
+    so each swap goes directly from a sold asset to a bought one: no
+    intermediate hop through a quote asset, and at most sells + buys - 1
+    swaps.
+
+    Args:
+        assets (Sequence[str]): Asset ids passed to the swap, e.g. "eth" or a contract address
+        symbols (Sequence[str]): Display symbols
+        balances (Sequence[float]): Units held of each asset
+        prices (Sequence[float]): USD price per unit; may be 0 for assets only bought
+        targets (np.ndarray): Target weights, normalized to sum to 1
+        min_trade_usd (float): Smallest trade worth making
+        drift_threshold (float): Smallest absolute weight drift worth correcting
+        fee_bps (float): Swap fee in basis points of the traded value
+        slippage_bps (float): Expected slippage in basis points of the traded value
+
+    Returns:
+        RebalancePlan: The swaps, largest first
+
+    Raises:
+        ValueError: If the inputs disagree in length or the targets are unusable
+    """
+    balances = np.asarray(balances, dtype=np.float64)
+    prices = np.asarray(prices, dtype=np.float64)
+    targets = np.asarray(targets, dtype=np.float64)
+    n = len(assets)
+    if not (len(symbols) == len(balances) == len(prices) == len(targets) == n):
+        raise ValueError("assets, symbols, balances, prices and targets must have the same length")
+    if n == 0 or (targets < 0).any() or targets.sum() <= 0:
+        raise ValueError("Target weights must be non-negative and not all zero")
+    targets = targets / targets.sum()
+
+    values = balances * prices
+    total = values.sum()
+    if total <= 0:
+        return RebalancePlan([], 0.0, 0.0, 0.0, 0.0, ["Nothing to rebalance: the portfolio has no priced value."])
+    weights = values / total
+    drift = weights - targets
+    delta_usd = -drift * total
+    cost_rate = (fee_bps + slippage_bps) / 10_000
+
+    sells_unpriced = (delta_usd < 0) & (prices <= 0)
+    trade = ((np.abs(drift) >= drift_threshold)
+             & (np.abs(drift) >= cost_rate)
+             & (np.abs(delta_usd) >= min_trade_usd)
+             & ~sells_unpriced)
+
+    skipped = [
+        f"{symbols[i]}: drift {drift[i]:+.2%} (${delta_usd[i]:+,.2f}) below the trade thresholds"
+        for i in np.flatnonzero(~trade & (np.abs(delta_usd) >= 0.01))
+    ]
+
+    sell_idx = np.flatnonzero(trade & (delta_usd < 0))
+    buy_idx = np.flatnonzero(trade & (delta_usd > 0))
+    sell_usd = -delta_usd[sell_idx]
+    buy_usd = delta_usd[buy_idx]
+    # Sells fund buys after costs; trim the larger side so the plan is self-funding
+    funded = min(sell_usd.sum() * (1 - cost_rate), buy_usd.sum())
+    if funded <= 0 or not len(sell_idx) or not len(buy_idx):
+        return RebalancePlan([], float(total), float(np.abs(drift).max()),
+                             float(np.abs(drift).max()), 0.0, skipped)
+    sell_usd *= funded / (1 - cost_rate) / sell_usd.sum()
+    buy_usd *= funded / buy_usd.sum()
+
+    # Match sells to buys along their cumulative sums (in pre-cost USD):
+    # every breakpoint of either side starts a new swap segment
+    sell_cum = np.cumsum(sell_usd)
+    buy_cum = np.cumsum(buy_usd / (1 - cost_rate))
+    edges = np.unique(np.concatenate([[0.0], sell_cum, buy_cum]))
+    edges = edges[edges <= sell_cum[-1] + 1e-9]
+    segment_usd = np.diff(edges)
+    mids = edges[:-1] + segment_usd / 2
+    keep = segment_usd > 1e-9
+    segment_usd, mids = segment_usd[keep], mids[keep]
+    from_pos = np.minimum(np.searchsorted(sell_cum, mids), len(sell_idx) - 1)
+    to_pos = np.minimum(np.searchsorted(buy_cum, mids), len(buy_idx) - 1)
+    from_asset = sell_idx[from_pos]
+    to_asset = buy_idx[to_pos]
+
+    order = np.argsort(-segment_usd, kind="stable")
+    swaps = [
+        PlannedSwap(assets[from_asset[k]], assets[to_asset[k]],
+                    symbols[from_asset[k]], symbols[to_asset[k]],
+                    float(segment_usd[k] / prices[from_asset[k]]),
+                    float(segment_usd[k]))
+        for k in order
+    ]
+
+    new_values = values.copy()
+    np.subtract.at(new_values, from_asset, segment_usd)
+    np.add.at(new_values, to_asset, segment_usd * (1 - cost_rate))
+    drift_after = new_values / new_values.sum() - targets
+    return RebalancePlan(swaps, float(total), float(np.abs(drift).max()),
+                         float(np.abs(drift_after).max()),
+                         float(segment_usd.sum() * cost_rate), skipped)
+
+
+def parse_target_weights(text: str) -> Dict[str, float]:
+    """
+    Parse "USDC:50, WETH:30, 0xabc...:20" into {key: weight}, keys lowercased.
+
+    Weights may be percentages or fractions; they are normalized later.
+
+    Raises:
+        ValueError: On an entry without a numeric weight
+    """
+    weights: Dict[str, float] = {}
+    for entry in text.split(","):
+        if not entry.strip():
+            continue
+        key, sep, weight = entry.rpartition(":")
+        if not sep or not key.strip():
+            raise ValueError(f"Expected <asset>:<weight>, got {entry.strip()!r}")
+        weights[key.strip().lower()] = float(weight)
+    return weights
+
+
+def target_vector(keys: Sequence[Sequence[str]],
+                  weights: Dict[str, float]) -> np.ndarray:
+    """
+    Look up the target weight of each asset by any of its keys (symbol, address, asset id).
+
+    Returns:
+        np.ndarray: One weight per asset, 0 for assets not listed
+    """
+    return np.array([
+        next((weights[key.lower()] for key in asset_keys if key and key.lower() in weights), 0.0)
+        for asset_keys in keys
+    ], dtype=np.float64)
@@ -1,117 +1,493 @@
+import atexit
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
 import time
 import json
-from swarm import Swarm
-from swarm.repl import run_demo_loop
-from agents import based_agent
+from agents import (based_agent, TOOL_ACCESS, moralis_client, wallet_provider,
+                    top_wallet_holdings, tx_tracker)
 from openai import OpenAI
+from jsonl_output import JsonLinesWriter
+from conversation_memory import ConversationMemory, openai_summarizer
+from tool_executor import ParallelToolSwarm
+from metrics import metrics, record_llm_call, track_turn
+from triggers import (PriceMoveTrigger, TransactionTrigger, TrendingDeltaTrigger,
+                      TriggerScheduler, format_trigger_prompt)
+from session_cassette import (RECORD, REPLAY, RecordingOpenAI, ReplayOpenAI,
+                              SessionCassette, install_session_cassette)
+
+# Approximate prompt tokens each loop keeps in its conversation history
+MEMORY_TOKEN_BUDGET = int(os.environ.get("AGENT_MEMORY_TOKENS", "8000"))
+# Model used to fold old turns into the running summary ("" for extractive summaries)
+MEMORY_SUMMARY_MODEL = os.environ.get("AGENT_MEMORY_SUMMARY_MODEL", "")
+# Maximum number of read-only tools of one turn running at once
+TOOL_WORKERS = int(os.environ.get("AGENT_TOOL_WORKERS", "8"))
+# Serve metrics on http://127.0.0.1:<port>/metrics (0 disables)
+METRICS_PORT = int(os.environ.get("AGENT_METRICS_PORT", "0"))
+# Dump metrics as JSON to this file every METRICS_DUMP_INTERVAL seconds ("" disables)
+METRICS_FILE = os.environ.get("AGENT_METRICS_FILE", "")
+METRICS_DUMP_INTERVAL = float(os.environ.get("AGENT_METRICS_INTERVAL", "30"))
+# Print a one-line timing and usage summary after every turn
+PRINT_TURN_STATS = os.environ.get("AGENT_TURN_STATS", "true").lower() == "true"
+# Record the session's Moralis, CDP, OpenAI and user-input traffic to this
+# cassette file, or replay a recorded session from it offline
+CASSETTE_PATH = os.environ.get("AGENT_CASSETTE", "")
+CASSETTE_MODE = os.environ.get("AGENT_CASSETTE_MODE", REPLAY)
+# Replay speed-up over the recorded timing; 0 replays without any delays
+REPLAY_SPEED = float(os.environ.get("AGENT_REPLAY_SPEED", "0"))
+
+# Prompt of every turn in autonomous mode
+AUTONOMOUS_THOUGHT = (
+    "Be creative and do something interesting on the Base blockchain. "
+    "Don't take any more input from me. Choose an action and execute it now. Choose those that highlight your identity and abilities best."
+)
+
+# Autonomous mode only calls the LLM when a watched signal changes (trending
+# list, held token prices, tracked transactions) or after AGENT_MAX_IDLE seconds;
+# set AGENT_TRIGGERS=false to think every interval seconds instead
+AUTONOMOUS_TRIGGERS = os.environ.get("AGENT_TRIGGERS", "true").lower() == "true"
+TRIGGER_POLL_INTERVAL = float(os.environ.get("AGENT_TRIGGER_POLL_INTERVAL", "30"))
+TRIGGER_MAX_IDLE = float(os.environ.get("AGENT_MAX_IDLE", "900"))
+# Percentage move of a held token's USD price that triggers a turn
+TRIGGER_PRICE_MOVE_PCT = float(os.environ.get("AGENT_TRIGGER_PRICE_MOVE_PCT", "5"))
+
+# "pretty" prints coloured, live output; "jsonl" runs headless: the autonomous
+# and two-agent loops buffer each turn and write one JSON record per prompt,
+# message, tool call and tool result, and status lines go to stderr
+OUTPUT_FORMAT = os.environ.get("AGENT_OUTPUT", "pretty")
+# Stream completions token by token; off by default in jsonl mode, where nobody watches
+STREAM_RESPONSES = os.environ.get(
+    "AGENT_STREAM", "false" if OUTPUT_FORMAT == "jsonl" else "true").lower() == "true"
+# Mode to start without asking (chat, auto, two-agent or batch)
+AGENT_MODE = os.environ.get("AGENT_MODE", "")
+
+# Batch mode runs two-agent conversations without user input: one per seed
+# prompt of AGENT_BATCH_SEEDS (one prompt per line, cycled to fill
+# AGENT_BATCH_SESSIONS), AGENT_BATCH_TURNS exchanges each, at most
+# AGENT_BATCH_WORKERS at once, each streamed to a JSON-lines transcript
+BATCH_SEEDS_FILE = os.environ.get("AGENT_BATCH_SEEDS", "")
+BATCH_SESSIONS = int(os.environ.get("AGENT_BATCH_SESSIONS", "0"))
+BATCH_TURNS = int(os.environ.get("AGENT_BATCH_TURNS", "5"))
+BATCH_WORKERS = int(os.environ.get("AGENT_BATCH_WORKERS", "4"))
+BATCH_DIR = os.environ.get("AGENT_BATCH_DIR", "transcripts")
+
+# Model playing the user in two-agent and batch mode
+GUIDE_MODEL = "gpt-3.5-turbo"
+GUIDE_INSTRUCTIONS = "You are a user guiding a blockchain agent through various tasks on the Base blockchain. Engage in a conversation, suggesting actions and responding to the agent's outputs. Be creative and explore different blockchain capabilities. Options include creating tokens, transferring assets, minting NFTs, and getting balances. You're not simulating a conversation, but you will be in one yourself. Make sure you follow the rules of improv and always ask for some sort of function to occur. Be unique and interesting."
+GUIDE_OPENING = "Start a conversation with the Based Agent and guide it through some blockchain tasks."
+# The guide sees at most this many characters of each Based Agent reply
+GUIDE_REPLY_CHARS = int(os.environ.get("AGENT_GUIDE_REPLY_CHARS", "2000"))
+
+session_cassette = None
+
+
+def setup_session_cassette():
+    """Start recording or replaying the session if AGENT_CASSETTE is set."""
+    global session_cassette
+    if not CASSETTE_PATH:
+        return
+    session_cassette = SessionCassette(CASSETTE_PATH, CASSETTE_MODE, REPLAY_SPEED)
+    install_session_cassette(session_cassette, moralis_client, wallet_provider)
+    atexit.register(session_cassette.close)
+    action = "Recording session to" if CASSETTE_MODE == RECORD else "Replaying session from"
+    status(f"{action} {CASSETTE_PATH}")
+
+
+def create_openai_client():
+    """OpenAI client, routed through the session cassette when one is active."""
+    if session_cassette is None:
+        return OpenAI()
+    if session_cassette.mode == REPLAY:
+        return ReplayOpenAI(session_cassette)
+    return RecordingOpenAI(OpenAI(), session_cassette)
+
+
+def read_user_input(prompt: str) -> str:
+    """input(), recorded to or replayed from the session cassette when one is active."""
+    if session_cassette is None:
+        return input(prompt)
+    if session_cassette.mode == REPLAY:
+        event = session_cassette.take_input()
+        if event is None:
+            raise SystemExit(f"Replay of {CASSETTE_PATH} finished")
+        print(f"{prompt}{event['text']}")
+        return event["text"]
+    text = input(prompt)
+    session_cassette.write("input", text=text)
+    return text
+
+
+def pause(seconds: float):
+    """Sleep between autonomous turns; replays compress the wait like every recorded delay."""
+    if session_cassette is not None and session_cassette.mode == REPLAY:
+        session_cassette.delay(seconds)
+    else:
+        time.sleep(seconds)
+
+
+def create_client(mutation_lock=None):
+    """Create the Swarm client that runs read-only tool calls of a turn in parallel."""
+    return ParallelToolSwarm(client=create_openai_client(),
+                             tool_access=TOOL_ACCESS,
+                             max_workers=TOOL_WORKERS,
+                             mutation_lock=mutation_lock)
+
+
+def create_trigger_scheduler():
+    """Watch the trending list, held token prices and tracked transactions of the agent's wallet."""
+
+    def chain():
+        is_mainnet = wallet_provider.network_id in ["base", "base-mainnet"]
+        return "base" if is_mainnet else "base sepolia"
+
+    return TriggerScheduler(
+        [
+            TrendingDeltaTrigger(lambda: moralis_client.get(
+                "/discovery/tokens/trending", {"chain": chain()})),
+            PriceMoveTrigger(lambda: top_wallet_holdings(
+                wallet_provider.address_id, chain()),
+                             threshold_pct=TRIGGER_PRICE_MOVE_PCT),
+            TransactionTrigger(tx_tracker),
+        ],
+        poll_interval=TRIGGER_POLL_INTERVAL,
+        max_idle=TRIGGER_MAX_IDLE,
+        sleep=pause)
+
+
+def start_metrics_exporters():
+    """Start the metrics HTTP endpoint and periodic JSON dump, if configured."""
+    if METRICS_PORT:
+        metrics.start_http_server(METRICS_PORT)
+        status(f"Serving metrics on http://127.0.0.1:{METRICS_PORT}/metrics")
+    if METRICS_FILE:
+        metrics.start_periodic_dump(METRICS_FILE, METRICS_DUMP_INTERVAL)
+        status(f"Writing metrics to {METRICS_FILE} every {METRICS_DUMP_INTERVAL:.0f}s")
+
+
+def create_output(mode):
+    """JSON-lines writer of a loop in headless mode, None when printing live."""
+    if OUTPUT_FORMAT != "jsonl":
+        return None
+    return JsonLinesWriter(mode=mode)
+
+
+def status(text, headless=OUTPUT_FORMAT == "jsonl"):
+    """Print a progress line, to stderr when stdout carries JSON records."""
+    print(text, file=sys.stderr if headless else sys.stdout)
+
+
+def run_turn(client, agent, messages, output=None):
+    """
+    Run one agent turn, printing it live or, in headless mode, recording it to output.
+
+    Returns:
+        Response: The Swarm response of the turn
+    """
+    response = client.run(agent=agent, messages=messages, stream=STREAM_RESPONSES)
+    if STREAM_RESPONSES:
+        if output is None:
+            return process_and_print_streaming_response(response)
+        response = collect_streaming_response(response)
+    if output is None:
+        pretty_print_messages(response.messages)
+    else:
+        output.emit_messages(response.messages)
+    return response
+
+
+def print_turn_stats(turn, output=None):
+    """Print where the time and tokens of a turn went."""
+    if not PRINT_TURN_STATS:
+        return
+    elapsed = time.perf_counter() - turn.started_at
+    if output is not None:
+        output.emit("turn_stats",
+                    seconds=round(elapsed, 3),
+                    ttft=round(turn.ttft, 3) if turn.ttft is not None else None,
+                    llm_calls=turn.llm_calls,
+                    prompt_tokens=turn.prompt_tokens,
+                    completion_tokens=turn.completion_tokens,
+                    tool_calls=turn.tool_calls,
+                    tool_output_chars=turn.tool_output_chars,
+                    moralis_bytes=turn.moralis_bytes)
+        return
+    ttft = f"{turn.ttft:.2f}s" if turn.ttft is not None else "-"
+    print(f"\033[90m[turn {elapsed:.2f}s, first token {ttft}, "
+          f"{turn.llm_calls} LLM calls, ~{turn.prompt_tokens} prompt/~{turn.completion_tokens} completion tokens, "
+          f"{turn.tool_calls} tool calls, {turn.tool_output_chars} tool output chars, "
+          f"{turn.moralis_bytes / 1024:.1f} KiB from Moralis]\033[0m")
+
+
+def create_memory(openai_client=None):
+    """Create the token-budgeted conversation memory used by every loop."""
+    summarizer = None
+    if MEMORY_SUMMARY_MODEL:
+        summarizer = openai_summarizer(openai_client or create_openai_client(),
+                                       model=MEMORY_SUMMARY_MODEL)
+    return ConversationMemory(token_budget=MEMORY_TOKEN_BUDGET,
+                              summarizer=summarizer)
+
+
+# this is the main loop that runs the agent in chat mode
+def run_chat_loop(agent):
+    client = create_client()
+    memory = create_memory(client.client)
+
+    print("Starting Based Agent chat... (Ctrl+C to exit)")
 
+    while True:
+        user_input = read_user_input("\033[90mUser\033[0m: ")
+        memory.append({"role": "user", "content": user_input})
 
-# this is the main loop that runs the agent in autonomous mode
-# you can modify this to change the behavior of the agent
-# the interval is the number of seconds between each thought
-def run_autonomous_loop(agent, interval=10):
-    client = Swarm()
-    messages = []
+        with track_turn("chat") as turn:
+            response_obj = run_turn(client, agent, memory.messages())
+        print_turn_stats(turn)
 
-    print("Starting autonomous Based Agent loop...")
+        memory.extend(response_obj.messages)
+        agent = response_obj.agent
 
+
+# this is the main loop that runs the agent in autonomous mode
+# you can modify this to change the behavior of the agent
+# the interval is the number of seconds between each thought when
+# AGENT_TRIGGERS is off; otherwise the scheduler decides when to think
+# thought is the prompt of every turn; turn_slot, if given, is a lock or
+# semaphore held for the duration of each turn (e.g. shared by a fleet)
+def run_autonomous_loop(agent, interval=10, thought=AUTONOMOUS_THOUGHT,
+                        turn_slot=None, scheduler=None):
+    client = create_client()
+    memory = create_memory(client.client)
+    output = create_output("auto")
+    if scheduler is None and AUTONOMOUS_TRIGGERS:
+        scheduler = create_trigger_scheduler()
+
+    status("Starting autonomous Based Agent loop...", output is not None)
+
+    prompt = thought
     while True:
-        # Generate a thought
-        thought = (
-            "Be creative and do something interesting on the Base blockchain. "
-            "Don't take any more input from me. Choose an action and execute it now. Choose those that highlight your identity and abilities best."
-        )
-        messages.append({"role": "user", "content": thought})
+        memory.append({"role": "user", "content": prompt})
 
-        print(f"\n\033[90mAgent's Thought:\033[0m {thought}")
+        if output is None:
+            print(f"\n\033[90mAgent's Thought:\033[0m {prompt}")
+        else:
+            output.emit("prompt", content=prompt)
 
         # Run the agent to generate a response and take action
-        response = client.run(agent=agent, messages=messages, stream=True)
-
-        # Process and print the streaming response
-        response_obj = process_and_print_streaming_response(response)
-
-        # Update messages with the new response
-        messages.extend(response_obj.messages)
+        with turn_slot or nullcontext(), track_turn("auto") as turn:
+            response_obj = run_turn(client, agent, memory.messages(), output)
+        print_turn_stats(turn, output)
+        if output is not None:
+            output.flush()
+
+        # Update memory with the new response; old turns get summarized
+        memory.extend(response_obj.messages)
+
+        if scheduler is None:
+            # Wait for the specified interval
+            pause(interval)
+            continue
 
-        # Wait for the specified interval
-        time.sleep(interval)
+        # Poll the cheap signals until one changes, then tell the agent what changed
+        status("\033[90mWaiting for a trigger...\033[0m" if output is None
+               else "Waiting for a trigger...", output is not None)
+        events = scheduler.wait()
+        if output is not None:
+            for event in events:
+                output.emit("trigger", source=event.source, summary=event.summary)
+        prompt = format_trigger_prompt(thought, events)
+
+
+def create_guide_memory(openai_client, opening=GUIDE_OPENING):
+    """Conversation memory of the OpenAI guide, primed with its instructions and opening request."""
+    memory = create_memory(openai_client)
+    memory.extend([{
+        "role": "system",
+        "content": GUIDE_INSTRUCTIONS
+    }, {
+        "role": "user",
+        "content": opening
+    }])
+    return memory
+
+
+def guide_message(openai_client, openai_memory):
+    """Ask the OpenAI guide for its next message to the Based Agent."""
+    start = time.perf_counter()
+    openai_response = openai_client.chat.completions.create(
+        model=GUIDE_MODEL, messages=openai_memory.messages())
+    usage = openai_response.usage
+    record_llm_call(GUIDE_MODEL, time.perf_counter() - start,
+                    usage.prompt_tokens if usage else 0,
+                    usage.completion_tokens if usage else 0,
+                    estimated=False)
+    return openai_response.choices[0].message.content
+
+
+def tell_guide(openai_memory, response_obj):
+    """Add the Based Agent's reply, cut to GUIDE_REPLY_CHARS, to the guide's conversation."""
+    based_agent_response = response_obj.messages[-1][
+        "content"] if response_obj.messages else None
+    based_agent_response = based_agent_response or "No response from Based Agent."
+    if len(based_agent_response) > GUIDE_REPLY_CHARS:
+        based_agent_response = based_agent_response[:GUIDE_REPLY_CHARS] + " [...]"
+    openai_memory.append({
+        "role": "user",
+        "content": f"Based Agent response: {based_agent_response}"
+    })
 
 
 # this is the main loop that runs the agent in two-agent mode
 # you can modify this to change the behavior of the agent
 def run_openai_conversation_loop(agent):
     """Facilitates a conversation between an OpenAI-powered agent and the Based Agent."""
-    client = Swarm()
-    openai_client = OpenAI()
-    messages = []
-
-    print("Starting OpenAI-Based Agent conversation loop...")
-
-    # Initial prompt to start the conversation
-    openai_messages = [{
-        "role":
-        "system",
-        "content":
-        "You are a user guiding a blockchain agent through various tasks on the Base blockchain. Engage in a conversation, suggesting actions and responding to the agent's outputs. Be creative and explore different blockchain capabilities. Options include creating tokens, transferring assets, minting NFTs, and getting balances. You're not simulating a conversation, but you will be in one yourself. Make sure you follow the rules of improv and always ask for some sort of function to occur. Be unique and interesting."
-    }, {
-        "role":
-        "user",
-        "content":
-        "Start a conversation with the Based Agent and guide it through some blockchain tasks."
-    }]
+    client = create_client()
+    openai_client = create_openai_client()
+    memory = create_memory(openai_client)
+    openai_memory = create_guide_memory(openai_client)
+    output = create_output("two-agent")
+
+    status("Starting OpenAI-Based Agent conversation loop...", output is not None)
 
     while True:
         # Generate OpenAI response
-        openai_response = openai_client.chat.completions.create(
-            model="gpt-3.5-turbo", messages=openai_messages)
-
-        openai_message = openai_response.choices[0].message.content
-        print(f"\n\033[92mOpenAI Guide:\033[0m {openai_message}")
+        openai_message = guide_message(openai_client, openai_memory)
+        if output is None:
+            print(f"\n\033[92mOpenAI Guide:\033[0m {openai_message}")
+        else:
+            output.emit("guide", content=openai_message)
 
         # Send OpenAI's message to Based Agent
-        messages.append({"role": "user", "content": openai_message})
-        response = client.run(agent=agent, messages=messages, stream=True)
-        response_obj = process_and_print_streaming_response(response)
+        memory.append({"role": "user", "content": openai_message})
+        with track_turn("two-agent") as turn:
+            response_obj = run_turn(client, agent, memory.messages(), output)
+        print_turn_stats(turn, output)
+        if output is not None:
+            output.flush()
 
         # Update messages with Based Agent's response
-        messages.extend(response_obj.messages)
+        memory.extend(response_obj.messages)
 
         # Add Based Agent's response to OpenAI conversation
-        based_agent_response = response_obj.messages[-1][
-            "content"] if response_obj.messages else "No response from Based Agent."
-        openai_messages.append({
-            "role":
-            "user",
-            "content":
-            f"Based Agent response: {based_agent_response}"
-        })
+        tell_guide(openai_memory, response_obj)
 
         # Check if user wants to continue
-        user_input = input(
+        user_input = read_user_input(
             "\nPress Enter to continue the conversation, or type 'exit' to end: "
         )
         if user_input.lower() == 'exit':
             break
 
 
+def read_seed_prompts(path):
+    """Read one guide opening prompt per non-empty line."""
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def run_batch_session(client, openai_client, agent, session_id, seed, turns,
+                      path):
+    """
+    Run one guide/agent conversation of a batch, streaming it to a JSON-lines transcript.
+
+    Both sides keep token-budgeted memories, so long sessions stay bounded.
+    Every exchange is flushed to the transcript as soon as it finishes.
+
+    Returns:
+        int: Number of exchanges completed
+    """
+    memory = create_memory(openai_client)
+    openai_memory = create_guide_memory(openai_client, seed)
+    with open(path, "w") as f:
+        output = JsonLinesWriter(stream=f, mode="batch", session=session_id)
+        output.emit("seed", content=seed)
+        completed = 0
+        try:
+            for exchange in range(turns):
+                openai_message = guide_message(openai_client, openai_memory)
+                output.emit("guide", exchange=exchange, content=openai_message)
+
+                memory.append({"role": "user", "content": openai_message})
+                with track_turn("batch") as turn:
+                    response_obj = run_turn(client, agent, memory.messages(), output)
+                print_turn_stats(turn, output)
+                output.flush()
+
+                memory.extend(response_obj.messages)
+                agent = response_obj.agent or agent
+                tell_guide(openai_memory, response_obj)
+                completed += 1
+        except Exception as e:
+            output.emit("error", exchange=completed, error=str(e))
+            raise
+        finally:
+            output.flush()
+    return completed
+
+
+def run_conversation_batch(agent,
+                           seeds=None,
+                           sessions=BATCH_SESSIONS,
+                           turns=BATCH_TURNS,
+                           workers=BATCH_WORKERS,
+                           out_dir=BATCH_DIR):
+    """
+    Run many two-agent conversations concurrently without user input.
+
+    Sessions share one Swarm client; mutating tool calls of different
+    sessions are serialized, since they all act on the same wallet.
+    Transcripts are written to out_dir/session-<n>.jsonl.
+    """
+    if seeds is None:
+        seeds = read_seed_prompts(BATCH_SEEDS_FILE) if BATCH_SEEDS_FILE else [GUIDE_OPENING]
+    sessions = sessions or len(seeds)
+    os.makedirs(out_dir, exist_ok=True)
+
+    client = create_client(mutation_lock=threading.Lock())
+    openai_client = create_openai_client()
+
+    status(f"Running {sessions} conversations of {turns} exchanges, "
+           f"{workers} at a time, transcripts in {out_dir}...")
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers,
+                            thread_name_prefix="batch") as pool:
+        futures = {
+            pool.submit(run_batch_session, client, openai_client, agent,
+                        f"session-{i + 1:04d}", seeds[i % len(seeds)], turns,
+                        os.path.join(out_dir, f"session-{i + 1:04d}.jsonl")): i + 1
+            for i in range(sessions)
+        }
+        for future in as_completed(futures):
+            try:
+                completed = future.result()
+                status(f"session-{futures[future]:04d}: {completed} exchanges")
+            except Exception as e:
+                failed += 1
+                status(f"session-{futures[future]:04d} failed: {str(e)}")
+    status(f"Batch finished: {sessions - failed} of {sessions} conversations completed")
+
+
 def choose_mode():
     while True:
         print("\nAvailable modes:")
         print("1. chat    - Interactive chat mode")
         print("2. auto    - Autonomous action mode")
         print("3. two-agent - AI-to-agent conversation mode")
+        print("4. batch   - Concurrent AI-to-agent conversations written to transcripts")
 
-        choice = input(
+        choice = read_user_input(
             "\nChoose a mode (enter number or name): ").lower().strip()
 
         mode_map = {
             '1': 'chat',
             '2': 'auto',
             '3': 'two-agent',
+            '4': 'batch',
             'chat': 'chat',
             'auto': 'auto',
-            'two-agent': 'two-agent'
+            'two-agent': 'two-agent',
+            'batch': 'batch'
         }
 
         if choice in mode_map:
@@ -119,6 +495,13 @@ def choose_mode():
         print("Invalid choice. Please try again.")
 
 
+def collect_streaming_response(response):
+    """Drain a streamed run without printing it and return the final Response."""
+    for chunk in response:
+        if "response" in chunk:
+            return chunk["response"]
+
+
 # Boring stuff to make the logs pretty
 def process_and_print_streaming_response(response):
     content = ""
@@ -175,18 +558,23 @@ def pretty_print_messages(messages) -> None:
 
 
 def main():
-    mode = choose_mode()
+    setup_session_cassette()
+    mode = AGENT_MODE or choose_mode()
 
     mode_functions = {
-        'chat': lambda: run_demo_loop(based_agent),
+        'chat': lambda: run_chat_loop(based_agent),
         'auto': lambda: run_autonomous_loop(based_agent),
-        'two-agent': lambda: run_openai_conversation_loop(based_agent)
+        'two-agent': lambda: run_openai_conversation_loop(based_agent),
+        'batch': lambda: run_conversation_batch(based_agent)
     }
+    if mode not in mode_functions:
+        raise SystemExit(f"Unknown AGENT_MODE {mode!r}; use chat, auto, two-agent or batch")
 
-    print(f"\nStarting {mode} mode...")
+    start_metrics_exporters()
+    status(f"\nStarting {mode} mode...")
     mode_functions[mode]()
 
 
 if __name__ == "__main__":
-    print("Starting Based Agent...")
+    status("Starting Based Agent...")
     main()
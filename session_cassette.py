@@ -0,0 +1,556 @@
+import asyncio
+import gzip
+import io
+import itertools
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+import requests
+from cdp import Transaction
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+RECORD = "record"
+REPLAY = "replay"
+
+HttpKey = Tuple[str, str, Tuple[Tuple[str, str], ...]]
+
+
+def http_key(method: str, url: str) -> HttpKey:
+    """Match key of an HTTP exchange: method, path and sorted decoded query."""
+    parts = urlsplit(url)
+    return method.upper(), parts.path, tuple(sorted(parse_qsl(parts.query)))
+
+
+class SessionCassette:
+    """
+    Gzipped JSON-lines recording of the network traffic of an agent session.
+
+    In record mode, Moralis HTTP exchanges, CDP wallet operations, OpenAI
+    chat completions and user input are appended as they happen, each with
+    its duration. In replay mode the recording is loaded and every request is
+    answered from it: HTTP exchanges by method, path and query; wallet
+    operations, completions and input in recorded order. Replays wait for the
+    recorded durations divided by `speed`; speed 0 answers instantly.
+    """
+
+    def __init__(self, path: str, mode: str = REPLAY, speed: float = 0.0):
+        """
+        Args:
+            path (str): Cassette file (.jsonl.gz)
+            mode (str): RECORD or REPLAY
+            speed (float): Replay speed-up over the recorded timing; 0 disables delays
+        """
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self.started_at = time.time()
+        self.replayed = 0
+        self.missing = 0
+        self._session_time = 0.0
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._file = None
+        self._http: Dict[HttpKey, Deque[dict]] = defaultdict(deque)
+        self._last_http: Dict[HttpKey, dict] = {}
+        self._cdp: Dict[str, Deque[dict]] = defaultdict(deque)
+        self._llm: Deque[dict] = deque()
+        self._inputs: Deque[dict] = deque()
+        self.wallet_info: Optional[dict] = None
+
+        if mode == RECORD:
+            self._file = gzip.open(path, "wt", encoding="utf-8")
+        else:
+            self._load()
+
+    def _load(self):
+        results = {}
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            events = [json.loads(line) for line in f if line.strip()]
+        for event in events:
+            if event["kind"] == "cdp_result":
+                results[event["operation"]] = event
+        for event in events:
+            kind = event["kind"]
+            if kind == "http":
+                self._http[http_key(event["method"], event["url"])].append(event)
+            elif kind == "cdp":
+                event["result"] = results.get(event["id"])
+                self._cdp[event["method"]].append(event)
+            elif kind == "llm":
+                self._llm.append(event)
+            elif kind == "input":
+                self._inputs.append(event)
+            elif kind == "wallet":
+                self.wallet_info = event
+
+    def write(self, kind: str, **fields) -> int:
+        """Append one event and return its id."""
+        with self._lock:
+            event_id = next(self._ids)
+            event = {"kind": kind, "id": event_id,
+                     "t": round(time.time() - self.started_at, 4), **fields}
+            self._file.write(json.dumps(event, separators=(",", ":")) + "\n")
+            # Flush every event so a crashed session still leaves a usable recording
+            self._file.flush()
+        return event_id
+
+    def take_http(self, method: str, url: str) -> Optional[dict]:
+        """Next recorded exchange for a request; the last one repeats once they run out."""
+        key = http_key(method, url)
+        with self._lock:
+            queue = self._http.get(key)
+            if queue:
+                self._last_http[key] = queue.popleft()
+            event = self._last_http.get(key)
+            self._count(event)
+        return event
+
+    def take_cdp(self, method: str) -> Optional[dict]:
+        with self._lock:
+            queue = self._cdp.get(method)
+            event = queue.popleft() if queue else None
+            self._count(event)
+        return event
+
+    def take_llm(self) -> Optional[dict]:
+        with self._lock:
+            event = self._llm.popleft() if self._llm else None
+            self._count(event)
+        return event
+
+    def take_input(self) -> Optional[dict]:
+        """Next recorded line of user input, or None once the session is over."""
+        with self._lock:
+            return self._inputs.popleft() if self._inputs else None
+
+    def _count(self, event: Optional[dict]):
+        if event is None:
+            self.missing += 1
+        else:
+            self.replayed += 1
+            self._session_time = max(self._session_time, event["t"])
+
+    def session_clock(self) -> float:
+        """
+        Recorded session time of the latest replayed event.
+
+        Used as the response cache clock during replay, so cached entries
+        expire where they expired live and the same requests reach the
+        transport in the same order, however fast the replay runs.
+        """
+        return self._session_time
+
+    def delay(self, seconds: float):
+        """Sleep for a recorded duration, scaled by the replay speed."""
+        if self.speed > 0 and seconds > 0:
+            time.sleep(seconds / self.speed)
+
+    def scaled(self, seconds: float) -> float:
+        return seconds / self.speed if self.speed > 0 else 0.0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# Moralis over requests
+
+
+class RecordingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that appends every exchange to a cassette."""
+
+    def __init__(self, cassette: SessionCassette, **kwargs):
+        self.cassette = cassette
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        start = time.perf_counter()
+        response = super().send(request, **kwargs)
+        # Reading the body here means streamed responses are buffered while recording
+        body = response.content
+        self.cassette.write("http",
+                            method=request.method,
+                            url=request.url,
+                            status=response.status_code,
+                            body=body.decode("utf-8", errors="replace"),
+                            duration=round(time.perf_counter() - start, 4))
+        return response
+
+
+class ReplayHTTPAdapter(BaseAdapter):
+    """Transport adapter that answers requests from a cassette instead of the network."""
+
+    def __init__(self, cassette: SessionCassette):
+        super().__init__()
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        event = self.cassette.take_http(request.method, request.url)
+        if event is None:
+            raise requests.exceptions.ConnectionError(
+                f"No recorded response for {request.method} {request.url}", request=request)
+        self.cassette.delay(event["duration"])
+
+        body = event["body"].encode("utf-8")
+        response = requests.Response()
+        response.status_code = event["status"]
+        response.headers["Content-Type"] = "application/json"
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.raw = io.BytesIO(body)
+        response._content = body
+        response._content_consumed = True
+        return response
+
+    def close(self):
+        pass
+
+
+# Moralis over httpx (AsyncMoralisClient)
+
+
+class RecordingAsyncTransport(httpx.AsyncBaseTransport):
+
+    def __init__(self, cassette: SessionCassette,
+                 inner: Optional[httpx.AsyncBaseTransport] = None):
+        self.cassette = cassette
+        self.inner = inner or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        body = await response.aread()
+        self.cassette.write("http",
+                            method=request.method,
+                            url=str(request.url),
+                            status=response.status_code,
+                            body=body.decode("utf-8", errors="replace"),
+                            duration=round(time.perf_counter() - start, 4))
+        return httpx.Response(response.status_code, headers=response.headers,
+                              content=body, request=request)
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+class ReplayAsyncTransport(httpx.AsyncBaseTransport):
+
+    def __init__(self, cassette: SessionCassette):
+        self.cassette = cassette
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        event = self.cassette.take_http(request.method, str(request.url))
+        if event is None:
+            raise httpx.ConnectError(
+                f"No recorded response for {request.method} {request.url}", request=request)
+        delay = self.cassette.scaled(event["duration"])
+        if delay:
+            await asyncio.sleep(delay)
+        return httpx.Response(event["status"],
+                              headers={"Content-Type": "application/json"},
+                              content=event["body"].encode("utf-8"),
+                              request=request)
+
+
+# CDP wallet
+
+# Wallet methods that submit an operation
+CDP_METHODS = ("deploy_token", "deploy_nft", "invoke_contract", "trade", "faucet")
+
+
+def _jsonable(value: Any) -> Any:
+    return json.loads(json.dumps(value, default=str))
+
+
+def _operation_fields(operation: Any) -> Dict[str, Any]:
+    transaction = getattr(operation, "transaction", None)
+    status = getattr(transaction, "status", None)
+    return {
+        "status": getattr(status, "value", status),
+        "transaction_link": getattr(transaction, "transaction_link", None)
+        or getattr(operation, "transaction_link", None),
+        "transaction_hash": getattr(transaction, "transaction_hash", None)
+        or getattr(operation, "transaction_hash", None),
+        "contract_address": getattr(operation, "contract_address", None),
+    }
+
+
+class RecordedOperation:
+    """Wraps a live CDP operation and records its outcome once it reaches a terminal state."""
+
+    def __init__(self, operation: Any, cassette: SessionCassette, event_id: int):
+        self._operation = operation
+        self._cassette = cassette
+        self._event_id = event_id
+        self._submitted_at = time.perf_counter()
+        self._recorded = False
+
+    def __getattr__(self, name):
+        return getattr(self._operation, name)
+
+    def __str__(self) -> str:
+        return str(self._operation)
+
+    def _record_result(self, error: Optional[str] = None):
+        if self._recorded:
+            return
+        fields = _operation_fields(self._operation)
+        terminal = fields["status"] in (Transaction.Status.COMPLETE.value,
+                                        Transaction.Status.FAILED.value)
+        if error is None and not terminal:
+            return
+        self._recorded = True
+        self._cassette.write("cdp_result",
+                             operation=self._event_id,
+                             confirm_seconds=round(time.perf_counter() - self._submitted_at, 4),
+                             error=error,
+                             **fields)
+
+    def wait(self, *args, **kwargs):
+        try:
+            self._operation.wait(*args, **kwargs)
+        except Exception as e:
+            self._record_result(error=str(e))
+            raise
+        self._record_result()
+        return self
+
+    def reload(self):
+        self._operation.reload()
+        self._record_result()
+        return self
+
+
+class RecordingWallet:
+    """Wraps a live cdp.Wallet and records every operation it submits."""
+
+    def __init__(self, wallet: Any, cassette: SessionCassette):
+        self._wallet = wallet
+        self._cassette = cassette
+        cassette.write("wallet",
+                       network_id=wallet.network_id,
+                       wallet_id=getattr(wallet, "id", None),
+                       address_id=wallet.default_address.address_id)
+
+    def __getattr__(self, name):
+        attribute = getattr(self._wallet, name)
+        if name not in CDP_METHODS:
+            return attribute
+
+        def submit(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                operation = attribute(*args, **kwargs)
+            except Exception as e:
+                self._cassette.write("cdp", method=name, args=_jsonable([args, kwargs]),
+                                     submit_seconds=round(time.perf_counter() - start, 4),
+                                     error=str(e))
+                raise
+            event_id = self._cassette.write(
+                "cdp", method=name, args=_jsonable([args, kwargs]),
+                submit_seconds=round(time.perf_counter() - start, 4),
+                text=str(operation), **_operation_fields(operation))
+            return RecordedOperation(operation, self._cassette, event_id)
+
+        return submit
+
+
+class _ReplayedTransaction:
+
+    def __init__(self, operation: "ReplayedOperation"):
+        self._operation = operation
+        self.transaction_link = operation.result.get("transaction_link")
+        self.transaction_hash = operation.result.get("transaction_hash")
+
+    @property
+    def status(self):
+        if time.time() < self._operation.confirm_at:
+            return Transaction.Status.BROADCAST
+        status = self._operation.result.get("status")
+        return Transaction.Status(status) if status else Transaction.Status.UNSPECIFIED
+
+    @property
+    def terminal_state(self) -> bool:
+        return self.status in (Transaction.Status.COMPLETE, Transaction.Status.FAILED)
+
+
+class ReplayedOperation:
+    """Recorded CDP operation that confirms after its recorded (scaled) confirmation time."""
+
+    def __init__(self, event: dict, cassette: SessionCassette):
+        self.event = event
+        # Operations recorded without a terminal state stay pending, like they did live
+        self.result = event.get("result") or {}
+        confirm_seconds = self.result.get("confirm_seconds", float("inf"))
+        self.confirm_at = time.time() + cassette.scaled(confirm_seconds)
+        self.contract_address = self.result.get("contract_address") or event.get("contract_address")
+        self.transaction = _ReplayedTransaction(self)
+        self.transaction_link = self.transaction.transaction_link
+        self.transaction_hash = self.transaction.transaction_hash
+
+    def __str__(self) -> str:
+        return self.event.get("text") or ""
+
+    @property
+    def status(self):
+        return self.transaction.status
+
+    def reload(self) -> "ReplayedOperation":
+        return self
+
+    def wait(self, interval_seconds: float = 0.2,
+             timeout_seconds: float = 20) -> "ReplayedOperation":
+        time.sleep(max(0.0, min(self.confirm_at - time.time(), timeout_seconds)))
+        if self.result.get("error"):
+            raise Exception(self.result["error"])
+        if not self.transaction.terminal_state:
+            raise TimeoutError("Recorded operation never reached a terminal state")
+        return self
+
+
+class _ReplayedAddress:
+
+    def __init__(self, address_id: str):
+        self.address_id = address_id
+
+
+class ReplayWallet:
+    """Stand-in for the recorded cdp.Wallet that answers from a cassette."""
+
+    def __init__(self, cassette: SessionCassette):
+        info = cassette.wallet_info or {}
+        self._cassette = cassette
+        self.id = info.get("wallet_id")
+        self.network_id = info.get("network_id", "base-sepolia")
+        self.default_address = _ReplayedAddress(info.get("address_id", "0x" + "0" * 40))
+
+    def __getattr__(self, name):
+        if name not in CDP_METHODS:
+            raise AttributeError(name)
+
+        def submit(*args, **kwargs):
+            event = self._cassette.take_cdp(name)
+            if event is None:
+                raise Exception(f"No recorded {name} operation left in {self._cassette.path}")
+            self._cassette.delay(event.get("submit_seconds", 0))
+            if event.get("error"):
+                raise Exception(event["error"])
+            return ReplayedOperation(event, self._cassette)
+
+        return submit
+
+
+# OpenAI chat completions
+
+
+class _CompletionsProxy:
+
+    def __init__(self, create):
+        self.create = create
+
+
+class _ChatProxy:
+
+    def __init__(self, create):
+        self.completions = _CompletionsProxy(create)
+
+
+class RecordingOpenAI:
+    """Wraps an OpenAI client and records every chat completion, streamed or not."""
+
+    def __init__(self, client: Any, cassette: SessionCassette):
+        self._client = client
+        self._cassette = cassette
+        self.chat = _ChatProxy(self._create)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def _create(self, **params):
+        start = time.perf_counter()
+        response = self._client.chat.completions.create(**params)
+        if not params.get("stream"):
+            self._cassette.write("llm", model=params.get("model"), stream=False,
+                                 duration=round(time.perf_counter() - start, 4),
+                                 response=response.model_dump(mode="json"))
+            return response
+        return self._record_stream(response, params.get("model"), start)
+
+    def _record_stream(self, stream, model: str, start: float) -> Iterator[Any]:
+        chunks: List[Tuple[float, dict]] = []
+        try:
+            for chunk in stream:
+                chunks.append((round(time.perf_counter() - start, 4),
+                               chunk.model_dump(mode="json")))
+                yield chunk
+        finally:
+            self._cassette.write("llm", model=model, stream=True,
+                                 duration=round(time.perf_counter() - start, 4),
+                                 chunks=chunks)
+
+
+class ReplayOpenAI:
+    """Stand-in for the OpenAI client that returns recorded completions in order."""
+
+    def __init__(self, cassette: SessionCassette):
+        self._cassette = cassette
+        self.chat = _ChatProxy(self._create)
+
+    def _create(self, **params):
+        event = self._cassette.take_llm()
+        if event is None:
+            raise Exception(f"No recorded chat completion left in {self._cassette.path}")
+        if event["stream"] != bool(params.get("stream")):
+            raise Exception("Recorded chat completion does not match the streaming mode of the request")
+        if not event["stream"]:
+            self._cassette.delay(event["duration"])
+            return ChatCompletion.model_validate(event["response"])
+        return self._replay_stream(event["chunks"])
+
+    def _replay_stream(self, chunks: List[Tuple[float, dict]]) -> Iterator[ChatCompletionChunk]:
+        previous = 0.0
+        for offset, chunk in chunks:
+            self._cassette.delay(offset - previous)
+            previous = offset
+            yield ChatCompletionChunk.model_validate(chunk)
+
+
+def install_session_cassette(cassette: SessionCassette, moralis_client,
+                             wallet_provider):
+    """
+    Route a MoralisClient and a WalletProvider through a cassette.
+
+    Recording wraps the live wallet (loading it now) and the client's
+    transport; replaying replaces both with cassette-backed stand-ins and
+    turns off compute-unit pacing, since no quota is spent. Pass OpenAI
+    clients through RecordingOpenAI / ReplayOpenAI separately.
+    """
+    from moralis_limiter import ComputeUnitLimiter
+
+    if cassette.mode == RECORD:
+        live_adapter = moralis_client.session.get_adapter(moralis_client.base_url)
+        adapter = RecordingHTTPAdapter(cassette,
+                                       pool_connections=1,
+                                       pool_maxsize=live_adapter._pool_maxsize,
+                                       max_retries=live_adapter.max_retries)
+        moralis_client.async_transport_factory = lambda: RecordingAsyncTransport(cassette)
+        wallet_provider.set_wallet(RecordingWallet(wallet_provider.wallet, cassette))
+    else:
+        adapter = ReplayHTTPAdapter(cassette)
+        moralis_client.async_transport_factory = lambda: ReplayAsyncTransport(cassette)
+        moralis_client.limiter = ComputeUnitLimiter(0)
+        moralis_client.cache.clear()
+        moralis_client.cache.clock = cassette.session_clock
+        wallet_provider.set_wallet(ReplayWallet(cassette))
+    moralis_client.session.mount("https://", adapter)
+    moralis_client.session.mount("http://", adapter)
@@ -0,0 +1,223 @@
+import ast
+import math
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from tool_output import to_float
+
+# Screenable columns and how to read each from a token's merged trending,
+# /discovery/token and /erc20/{address}/pairs responses
+COLUMN_GETTERS: Dict[str, Callable[[dict], Any]] = {
+    "price_usd": lambda t: t.get("price_usd"),
+    "market_cap": lambda t: t.get("market_cap"),
+    "security_score": lambda t: t.get("security_score"),
+    "token_age_in_days": lambda t: t.get("token_age_in_days"),
+    "on_chain_strength_index": lambda t: t.get("on_chain_strength_index"),
+    "holders_change": lambda t: (t.get("holders_change") or {}).get("1d"),
+    "holders_change_1w": lambda t: (t.get("holders_change") or {}).get("1w"),
+    "volume_change_usd": lambda t: (t.get("volume_change_usd") or {}).get("1d"),
+    "price_change_1d": lambda t: (t.get("price_percent_change_usd") or {}).get("1d"),
+    "price_change_1w": lambda t: (t.get("price_percent_change_usd") or {}).get("1w"),
+    "price_change_1M": lambda t: (t.get("price_percent_change_usd") or {}).get("1M"),
+    "liquidity_usd": lambda t: t.get("liquidity_usd"),
+    "total_liquidity_usd": lambda t: t.get("total_liquidity_usd"),
+    "pair_count": lambda t: t.get("pair_count"),
+}
+
+# Functions allowed in filter and score expressions, with their number of arguments
+FUNCTIONS: Dict[str, Tuple[Callable, int]] = {
+    "abs": (np.abs, 1),
+    "log": (np.log, 1),
+    "log1p": (np.log1p, 1),
+    "sqrt": (np.sqrt, 1),
+    "min": (np.minimum, 2),
+    "max": (np.maximum, 2),
+    "clip": (np.clip, 3),
+    "isnan": (np.isnan, 1),
+    "nan_to_num": (np.nan_to_num, 1),
+}
+
+_BINARY_OPS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.divide,
+    ast.Pow: np.power,
+    ast.Mod: np.mod,
+}
+_COMPARE_OPS = {
+    ast.Lt: np.less,
+    ast.LtE: np.less_equal,
+    ast.Gt: np.greater,
+    ast.GtE: np.greater_equal,
+    ast.Eq: np.equal,
+    ast.NotEq: np.not_equal,
+}
+
+
+def compile_expression(source: str) -> Callable[[Dict[str, np.ndarray]], np.ndarray]:
+    """
+    Compile a filter or score expression into a function of the column arrays.
+
+    Expressions use column names, numbers, + - * / ** %, comparisons,
+    and/or/not and the functions in FUNCTIONS, e.g.
+    "security_score >= 80 and liquidity_usd > 50000" or
+    "log1p(max(volume_change_usd, 0)) + holders_change / 100". Nothing else
+    is evaluated, so expressions written by the model are safe to run.
+
+    Raises:
+        ValueError: On syntax errors, unknown columns or unsupported constructs
+    """
+    try:
+        tree = ast.parse(source, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression {source!r}: {e.msg}") from None
+
+    def build(node: ast.AST) -> Callable[[Dict[str, np.ndarray]], Any]:
+        if isinstance(node, ast.Expression):
+            return build(node.body)
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) \
+                and not isinstance(node.value, bool):
+            value = float(node.value)
+            return lambda columns: value
+        if isinstance(node, ast.Name):
+            if node.id not in COLUMN_GETTERS:
+                raise ValueError(f"Unknown column {node.id!r}; available: {', '.join(COLUMN_GETTERS)}")
+            name = node.id
+            return lambda columns: columns[name]
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+            op, left, right = _BINARY_OPS[type(node.op)], build(node.left), build(node.right)
+            return lambda columns: op(left(columns), right(columns))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            operand = build(node.operand)
+            return lambda columns: np.negative(operand(columns))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            operand = build(node.operand)
+            return lambda columns: np.logical_not(operand(columns))
+        if isinstance(node, ast.BoolOp):
+            op = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            parts = [build(value) for value in node.values]
+
+            def bool_op(columns):
+                result = parts[0](columns)
+                for part in parts[1:]:
+                    result = op(result, part(columns))
+                return result
+            return bool_op
+        if isinstance(node, ast.Compare) and all(type(o) in _COMPARE_OPS for o in node.ops):
+            operands = [build(node.left)] + [build(c) for c in node.comparators]
+            ops = [_COMPARE_OPS[type(o)] for o in node.ops]
+
+            def compare(columns):
+                values = [operand(columns) for operand in operands]
+                result = ops[0](values[0], values[1])
+                for i in range(1, len(ops)):
+                    result = np.logical_and(result, ops[i](values[i], values[i + 1]))
+                return result
+            return compare
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) \
+                and node.func.id in FUNCTIONS and not node.keywords:
+            function, arity = FUNCTIONS[node.func.id]
+            if len(node.args) != arity:
+                raise ValueError(f"{node.func.id}() takes {arity} argument{'s' if arity > 1 else ''}, "
+                                 f"got {len(node.args)}")
+            args = [build(arg) for arg in node.args]
+            return lambda columns: function(*(arg(columns) for arg in args))
+        raise ValueError(f"Unsupported expression {ast.unparse(node)!r}")
+
+    return build(tree)
+
+
+@dataclass
+class TokenTable:
+    """Screening columns of many tokens, one float64 array per column, NaN where missing."""
+
+    addresses: List[str]
+    symbols: List[str]
+    columns: Dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.addresses)
+
+    @classmethod
+    def from_records(cls, records: Sequence[dict]) -> "TokenTable":
+        """
+        Build the table from merged token records.
+
+        Each record is a trending entry updated with its /discovery/token
+        response, plus liquidity_usd (deepest pair), total_liquidity_usd and
+        pair_count from its pairs response; see merge_token_responses.
+        """
+        columns = {}
+        for name, getter in COLUMN_GETTERS.items():
+            values = [to_float(getter(record)) for record in records]
+            columns[name] = np.array([math.nan if value is None else value for value in values],
+                                     dtype=np.float64)
+        return cls([record.get("token_address", "") for record in records],
+                   [record.get("token_symbol") or "?" for record in records],
+                   columns)
+
+    def screen(self,
+               filter_expr: str = "",
+               score_expr: str = "",
+               top_k: int = 10) -> List[Dict[str, Any]]:
+        """
+        Keep the tokens matching filter_expr and rank them by score_expr.
+
+        Comparisons against missing values are false, so a filter drops
+        tokens lacking the data it tests. Missing scores rank last.
+
+        Returns:
+            List[dict]: Up to top_k rows with address, symbol, score and every column
+        """
+        n = len(self)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            mask = np.ones(n, dtype=bool)
+            if filter_expr:
+                mask &= np.broadcast_to(
+                    np.asarray(compile_expression(filter_expr)(self.columns), dtype=bool), n)
+            scores = np.zeros(n)
+            if score_expr:
+                scores = np.broadcast_to(
+                    np.asarray(compile_expression(score_expr)(self.columns), dtype=np.float64), n)
+        ranked = np.where(mask & ~np.isnan(scores), scores, -np.inf)
+        candidates = np.flatnonzero(mask)
+        k = min(top_k, len(candidates))
+        if k == 0:
+            return []
+        if score_expr:
+            # Partial selection: find the k-th best score, keep everything
+            # better and the earliest tokens tied with it, then order only
+            # those; ties keep trending order throughout
+            keys = -ranked[candidates]
+            kth = np.partition(keys, k - 1)[k - 1]
+            better = candidates[keys < kth]
+            tied = candidates[keys == kth][:k - len(better)]
+            top = np.sort(np.concatenate([better, tied]))
+            top = top[np.argsort(-ranked[top], kind="stable")]
+        else:
+            top = candidates[:k]
+        return [{
+            "address": self.addresses[i],
+            "symbol": self.symbols[i],
+            "score": None if np.isnan(scores[i]) else float(scores[i]),
+            **{name: None if np.isnan(values[i]) else float(values[i])
+               for name, values in self.columns.items()},
+        } for i in top]
+
+
+def merge_token_responses(trending: dict, details: Optional[dict],
+                          pairs: Optional[dict]) -> dict:
+    """Merge a trending entry with its details and pairs responses into one screening record."""
+    record = dict(trending)
+    if details:
+        record.update(details)
+    if pairs is not None:
+        liquidity = [to_float(pair.get("liquidity_usd")) for pair in pairs.get("pairs", [])]
+        liquidity = [value for value in liquidity if value is not None]
+        record["liquidity_usd"] = max(liquidity, default=None)
+        record["total_liquidity_usd"] = sum(liquidity) if liquidity else None
+        record["pair_count"] = len(pairs.get("pairs", []))
+    return record
@@ -0,0 +1,188 @@
+import contextvars
+import threading
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Dict, List, Optional
+
+from swarm import Swarm
+from swarm.types import AgentFunction, ChatCompletionMessageToolCall, Response, Result
+from swarm.util import debug_print, function_to_json
+
+from conversation_memory import CHARS_PER_TOKEN, estimate_tokens
+from metrics import current_turn, record_llm_call, record_tool_output, track_tool_call
+
+# Tool access classes. Read-only tools only query data and may run
+# concurrently; mutating tools change wallet or chain state.
+READ_ONLY = "read_only"
+MUTATING = "mutating"
+
+CTX_VARS_NAME = "context_variables"
+
+
+class ParallelToolSwarm(Swarm):
+    """
+    Swarm client that runs the independent read-only tool calls of a turn concurrently.
+
+    Tool calls are split at every mutating call: each run of consecutive
+    read-only calls executes in a thread pool, and every mutating call runs
+    alone once the calls before it have finished, so state changes stay
+    serialized and in the order the model asked for. Tool messages are
+    returned in the original call order. Tools missing from tool_access are
+    treated as mutating. Clients running several conversations against the
+    same wallet can pass a mutation_lock so mutating calls of different
+    conversations never overlap either.
+
+    Every tool call and chat completion is recorded in metrics.metrics.
+    Streamed completions carry no usage data, so their token counts are
+    estimated from message sizes.
+    """
+
+    def __init__(self,
+                 client=None,
+                 tool_access: Optional[Dict[str, str]] = None,
+                 max_workers: int = 8,
+                 mutation_lock: Optional[threading.Lock] = None):
+        """
+        Args:
+            client (OpenAI): OpenAI client, created by Swarm if omitted
+            tool_access (dict): Tool name -> READ_ONLY or MUTATING
+            max_workers (int): Maximum number of tools running at once
+            mutation_lock (Lock): Held while a mutating tool runs, if given
+        """
+        super().__init__(client)
+        self.tool_access = tool_access or {}
+        self.mutation_lock = mutation_lock
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix="tool")
+
+    def is_read_only(self, name: str) -> bool:
+        return self.tool_access.get(name) == READ_ONLY
+
+    def get_chat_completion(self, agent, history, context_variables,
+                            model_override, stream, debug):
+        model = model_override or agent.model
+        start = time.perf_counter()
+        completion = super().get_chat_completion(agent, history,
+                                                 context_variables,
+                                                 model_override, stream, debug)
+        if stream:
+            return self._measure_stream(completion, model, start,
+                                        self._estimate_prompt_tokens(agent, history))
+
+        usage = completion.usage
+        record_llm_call(model, time.perf_counter() - start,
+                        usage.prompt_tokens if usage else 0,
+                        usage.completion_tokens if usage else 0,
+                        estimated=False)
+        return completion
+
+    @staticmethod
+    def _estimate_prompt_tokens(agent, history: List[dict]) -> int:
+        instructions = agent.instructions if isinstance(agent.instructions, str) else ""
+        tools = json.dumps([function_to_json(f) for f in agent.functions])
+        return estimate_tokens(history) + (len(instructions) + len(tools)) // CHARS_PER_TOKEN
+
+    @staticmethod
+    def _measure_stream(completion, model: str, start: float,
+                        prompt_tokens: int):
+        """Pass a streamed completion through, recording time to first chunk, duration and size."""
+        ttft = None
+        chars = 0
+        try:
+            for chunk in completion:
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                    turn = current_turn()
+                    if turn is not None and turn.first_token_at is None:
+                        turn.first_token_at = time.perf_counter()
+                for choice in chunk.choices:
+                    chars += len(choice.delta.content or "")
+                    for tool_call in choice.delta.tool_calls or []:
+                        if tool_call.function:
+                            chars += len(tool_call.function.name or "")
+                            chars += len(tool_call.function.arguments or "")
+                yield chunk
+        finally:
+            record_llm_call(model, time.perf_counter() - start, prompt_tokens,
+                            chars // CHARS_PER_TOKEN, estimated=True, ttft=ttft)
+
+    def handle_tool_calls(
+        self,
+        tool_calls: List[ChatCompletionMessageToolCall],
+        functions: List[AgentFunction],
+        context_variables: dict,
+        debug: bool,
+    ) -> Response:
+        function_map = {f.__name__: f for f in functions}
+        results: List[Optional[Result]] = [None] * len(tool_calls)
+
+        def run(index: int):
+            tool_call = tool_calls[index]
+            name = tool_call.function.name
+            args = json.loads(tool_call.function.arguments)
+            debug_print(debug,
+                        f"Processing tool call: {name} with arguments {args}")
+
+            func = function_map[name]
+            # pass context_variables to agent functions
+            if CTX_VARS_NAME in func.__code__.co_varnames:
+                args[CTX_VARS_NAME] = context_variables
+            with track_tool_call(name):
+                results[index] = self.handle_function_result(func(**args), debug)
+            record_tool_output(name, results[index].value)
+
+        batch: List[int] = []
+
+        def flush():
+            if len(batch) == 1:
+                run(batch[0])
+            elif batch:
+                # Each call runs in a copy of this context so metrics reach the current turn
+                for future in [
+                        self.executor.submit(contextvars.copy_context().run, run, i)
+                        for i in batch
+                ]:
+                    future.result()
+            batch.clear()
+
+        for index, tool_call in enumerate(tool_calls):
+            name = tool_call.function.name
+            if name not in function_map:
+                continue
+            if self.is_read_only(name):
+                batch.append(index)
+            else:
+                flush()
+                with self.mutation_lock or nullcontext():
+                    run(index)
+        flush()
+
+        partial_response = Response(messages=[],
+                                    agent=None,
+                                    context_variables={})
+        for tool_call, result in zip(tool_calls, results):
+            name = tool_call.function.name
+            # handle missing tool case, skip to next tool
+            if result is None:
+                debug_print(debug, f"Tool {name} not found in function map.")
+                partial_response.messages.append({
+                    "role": "tool",
+                    "tool_call_id": tool_call.id,
+                    "tool_name": name,
+                    "content": f"Error: Tool {name} not found.",
+                })
+                continue
+            partial_response.messages.append({
+                "role": "tool",
+                "tool_call_id": tool_call.id,
+                "tool_name": name,
+                "content": result.value,
+            })
+            partial_response.context_variables.update(
+                result.context_variables)
+            if result.agent:
+                partial_response.agent = result.agent
+
+        return partial_response
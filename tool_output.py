@@ -0,0 +1,98 @@
+import math
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+# (label, getter) pairs describing the columns of a compact table
+Columns = Sequence[Tuple[str, Callable[[dict], Any]]]
+
+
+def to_float(value: Any) -> Optional[float]:
+    """Parse a Moralis numeric field (often a string) into a float, or None."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def compact_value(value: Any) -> str:
+    """
+    Render a value in as few characters as possible.
+
+    Large numbers get K/M/B suffixes, small ones 4 significant digits,
+    booleans become 1/0 and missing values "-".
+    """
+    if value is None or value == "":
+        return "-"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+
+    # Hex strings (addresses, hashes) are identifiers, not numbers
+    is_hex = isinstance(value, str) and value.startswith("0x")
+    number = None if is_hex else to_float(value)
+    if number is None:
+        return str(value).replace("|", "/").replace("\n", " ")
+
+    magnitude = abs(number)
+    for threshold, suffix in ((1e12, "T"), (1e9, "B"), (1e6, "M"), (1e3, "K")):
+        if magnitude >= threshold:
+            return f"{number / threshold:.4g}{suffix}"
+    if number == int(number):
+        return str(int(number))
+    return f"{number:.4g}"
+
+
+def compact_record(fields: Sequence[Tuple[str, Any]]) -> str:
+    """Render one record as a single `key=value` line."""
+    return " ".join(f"{key}={compact_value(value)}" for key, value in fields)
+
+
+def compact_table(title: str,
+                  rows: List[dict],
+                  columns: Columns,
+                  rank_by: Optional[Callable[[dict], Any]] = None,
+                  top_k: Optional[int] = None,
+                  max_chars: Optional[int] = None) -> str:
+    """
+    Render rows as a pipe-separated table that fits a character budget.
+
+    Rows are ranked by rank_by (descending, missing values last), cut to
+    top_k, and then cut further until the table fits in max_chars. A footer
+    says how many rows were left out.
+
+    Args:
+        title (str): First line of the output
+        rows (List[dict]): Records to render
+        columns (Columns): (label, getter) pairs
+        rank_by (Callable): Metric to sort rows by, highest first
+        top_k (int): Maximum number of rows
+        max_chars (int): Maximum output length in characters
+
+    Returns:
+        str: The table
+    """
+    total = len(rows)
+    if rank_by is not None:
+
+        def rank(row: dict) -> float:
+            metric = to_float(rank_by(row))
+            return -math.inf if metric is None else metric
+
+        rows = sorted(rows, key=rank, reverse=True)
+    if top_k is not None:
+        rows = rows[:top_k]
+
+    header = "|".join(label for label, _ in columns)
+    # Reserve room for the title and the "omitted" footer
+    used = len(title) + len(header) + 40
+    lines = []
+    for row in rows:
+        line = "|".join(compact_value(getter(row)) for _, getter in columns)
+        if max_chars is not None and used + len(line) + 1 > max_chars:
+            break
+        lines.append(line)
+        used += len(line) + 1
+
+    output = [f"{title} ({len(lines)} of {total})", header] + lines
+    if len(lines) < total:
+        output.append(f"+{total - len(lines)} more omitted")
+    return "\n".join(output)
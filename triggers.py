@@ -0,0 +1,227 @@
+import abc
+import queue
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from metrics import metrics
+from tx_tracker import CONFIRMED, TrackedTransaction, TransactionTracker
+
+
+@dataclass
+class TriggerEvent:
+    """A change in one of the polled signals, worth an agent turn."""
+
+    source: str
+    summary: str
+    detail: Dict[str, Any] = field(default_factory=dict)
+
+
+class Trigger(abc.ABC):
+    """
+    A cheap signal polled locally between agent turns.
+
+    poll() returns the events seen since the previous poll. The first poll
+    of a stateful trigger only records a baseline and returns nothing.
+    """
+
+    name = "trigger"
+
+    @abc.abstractmethod
+    def poll(self) -> List[TriggerEvent]:
+        """Return the events seen since the previous poll."""
+
+
+class TrendingDeltaTrigger(Trigger):
+    """Fires when tokens enter or leave the trending list."""
+
+    name = "trending"
+
+    def __init__(self, fetch: Callable[[], List[dict]], min_changes: int = 1):
+        """
+        Args:
+            fetch (Callable): Returns the current Moralis trending token list
+            min_changes (int): Entries plus exits needed to fire
+        """
+        self.fetch = fetch
+        self.min_changes = min_changes
+        self._previous: Optional[Dict[str, dict]] = None
+
+    def poll(self) -> List[TriggerEvent]:
+        current = {
+            token["token_address"].lower(): token
+            for token in self.fetch() or [] if token.get("token_address")
+        }
+        previous, self._previous = self._previous, current
+        if previous is None:
+            return []
+
+        entered = [current[address] for address in current if address not in previous]
+        left = [previous[address] for address in previous if address not in current]
+        if len(entered) + len(left) < self.min_changes:
+            return []
+
+        parts = []
+        if entered:
+            parts.append("new: " + ", ".join(
+                f"{token.get('token_symbol', '?')} {token['token_address']} "
+                f"(price ${token.get('price_usd', 'N/A')}, market cap {token.get('market_cap', 'N/A')})"
+                for token in entered))
+        if left:
+            parts.append("dropped out: " + ", ".join(
+                f"{token.get('token_symbol', '?')} {token['token_address']}"
+                for token in left))
+        return [TriggerEvent(self.name,
+                             "Trending tokens changed; " + "; ".join(parts),
+                             {"entered": [t["token_address"] for t in entered],
+                              "left": [t["token_address"] for t in left]})]
+
+
+class PriceMoveTrigger(Trigger):
+    """
+    Fires when the USD price of a held token moves beyond a threshold.
+
+    Moves are measured against the price at the last event for that token,
+    so a steady drift fires once per threshold step rather than every poll.
+    """
+
+    name = "price"
+
+    def __init__(self, fetch: Callable[[], List[dict]], threshold_pct: float = 5.0):
+        """
+        Args:
+            fetch (Callable): Returns the wallet's holdings as Moralis wallet token entries
+            threshold_pct (float): Absolute percentage move needed to fire
+        """
+        self.fetch = fetch
+        self.threshold_pct = threshold_pct
+        self._baseline: Dict[str, float] = {}
+
+    def poll(self) -> List[TriggerEvent]:
+        events = []
+        for token in self.fetch() or []:
+            address = (token.get("token_address") or "").lower()
+            price = float(token.get("usd_price") or 0)
+            if not address or price <= 0:
+                continue
+            baseline = self._baseline.get(address)
+            if baseline is None:
+                self._baseline[address] = price
+                continue
+            change_pct = (price / baseline - 1) * 100
+            if abs(change_pct) < self.threshold_pct:
+                continue
+            self._baseline[address] = price
+            events.append(TriggerEvent(
+                self.name,
+                f"{token.get('symbol', '?')} ({token.get('token_address')}), held "
+                f"{token.get('balance_formatted', '?')}, moved {change_pct:+.1f}% "
+                f"from ${baseline:.6g} to ${price:.6g}",
+                {"token_address": token.get("token_address"),
+                 "from": baseline, "to": price, "change_pct": change_pct}))
+        return events
+
+
+class TransactionTrigger(Trigger):
+    """Fires when a transaction tracked in the background confirms or fails."""
+
+    name = "transaction"
+
+    def __init__(self, tracker: TransactionTracker):
+        self._finished: "queue.Queue[TrackedTransaction]" = queue.Queue()
+        tracker.add_listener(self._finished.put)
+
+    def poll(self) -> List[TriggerEvent]:
+        events = []
+        while True:
+            try:
+                tracked = self._finished.get_nowait()
+            except queue.Empty:
+                return events
+            outcome = "confirmed" if tracked.status == CONFIRMED else "failed"
+            events.append(TriggerEvent(
+                self.name,
+                f"Transaction {outcome}: {tracked.summary()}",
+                {"handle_id": tracked.handle_id, "status": tracked.status}))
+
+
+class TriggerScheduler:
+    """
+    Decides when the autonomous loop should call the LLM.
+
+    The triggers are polled every poll_interval seconds; wait() returns as
+    soon as any of them fires, or with no events once max_idle seconds
+    passed without one. Idle time is counted in polling intervals slept, so
+    a sleep function that compresses time (e.g. a replay) compresses the
+    idle fallback too.
+    """
+
+    def __init__(self,
+                 triggers: List[Trigger],
+                 poll_interval: float = 30.0,
+                 max_idle: float = 600.0,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Args:
+            triggers (List[Trigger]): Signals to poll
+            poll_interval (float): Seconds between polling rounds
+            max_idle (float): Seconds without events before wait() returns anyway
+            sleep (Callable): Used to wait between polling rounds
+        """
+        self.triggers = triggers
+        self.poll_interval = poll_interval
+        self.max_idle = max_idle
+        self.sleep = sleep
+        self.polls = 0
+        self.fired = 0
+        self.idle_wakeups = 0
+
+    def poll(self) -> List[TriggerEvent]:
+        """Poll every trigger once; a failing trigger is reported and skipped."""
+        self.polls += 1
+        events = []
+        for trigger in self.triggers:
+            try:
+                events.extend(trigger.poll())
+            except Exception as e:
+                metrics.inc("trigger_errors_total", trigger=trigger.name)
+                print(f"Trigger {trigger.name} failed: {str(e)}", file=sys.stderr)
+        for event in events:
+            metrics.inc("trigger_events_total", trigger=event.source)
+        return events
+
+    def wait(self) -> List[TriggerEvent]:
+        """
+        Block until a trigger fires or max_idle elapses.
+
+        Returns:
+            List[TriggerEvent]: The events that fired, empty after an idle timeout
+        """
+        idle = 0.0
+        while True:
+            self.sleep(self.poll_interval)
+            idle += self.poll_interval
+            events = self.poll()
+            if events:
+                self.fired += 1
+                return events
+            if idle >= self.max_idle:
+                self.idle_wakeups += 1
+                metrics.inc("trigger_idle_wakeups_total")
+                return []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "polls": self.polls,
+            "fired": self.fired,
+            "idle_wakeups": self.idle_wakeups,
+        }
+
+
+def format_trigger_prompt(thought: str, events: List[TriggerEvent]) -> str:
+    """Prefix the autonomous prompt with what changed since the last turn."""
+    if not events:
+        return f"Nothing changed on the watched signals for a while. {thought}"
+    changes = "\n".join(f"- [{event.source}] {event.summary}" for event in events)
+    return f"Since your last action:\n{changes}\n\nReact to these changes if worthwhile. {thought}"
@@ -0,0 +1,198 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from cdp import Transaction
+
+PENDING = "pending"
+CONFIRMED = "confirmed"
+FAILED = "failed"
+
+
+@dataclass
+class TrackedTransaction:
+    """A submitted CDP operation (contract deployment, invocation or trade) and its outcome."""
+
+    handle_id: str
+    kind: str
+    description: str
+    operation: Any
+    on_confirmed: Optional[Callable[[Any], str]] = None
+    status: str = PENDING
+    submitted_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    result: Optional[str] = None
+    error: Optional[str] = None
+    timed_out: bool = False
+
+    @property
+    def transaction_link(self) -> Optional[str]:
+        transaction = getattr(self.operation, "transaction", None)
+        return getattr(transaction, "transaction_link", None)
+
+    def summary(self) -> str:
+        """One-line status report for the agent."""
+        line = f"{self.handle_id} [{self.status}] {self.description}"
+        if self.status == CONFIRMED and self.result:
+            line += f": {self.result}"
+        elif self.status == FAILED and self.error:
+            line += f": {self.error}"
+        if self.transaction_link:
+            line += f" ({self.transaction_link})"
+        return line
+
+
+class TransactionTracker:
+    """
+    Tracks submitted CDP operations in the background until they land onchain.
+
+    A single daemon thread reloads every pending operation on each poll, so
+    many in-flight transactions cost one polling loop instead of one blocked
+    caller each. Listeners are called when an operation confirms or fails.
+    """
+
+    def __init__(self,
+                 poll_interval: float = 2.0,
+                 timeout: float = 600.0,
+                 max_workers: int = 8):
+        """
+        Args:
+            poll_interval (float): Seconds between polling rounds
+            timeout (float): Seconds after submission before a still-pending operation is marked failed
+            max_workers (int): Operations reloaded concurrently within one polling round
+        """
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self._max_workers = max_workers
+        self._transactions: Dict[str, TrackedTransaction] = {}
+        self._listeners: List[Callable[[TrackedTransaction], None]] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self,
+               kind: str,
+               operation: Any,
+               description: str,
+               on_confirmed: Optional[Callable[[Any], str]] = None) -> str:
+        """
+        Start tracking a submitted operation.
+
+        Args:
+            kind (str): Operation type, e.g. "swap" or "mint_nft"
+            operation: CDP SmartContract, ContractInvocation or Trade
+            description (str): Human readable description of the operation
+            on_confirmed (Callable): Builds the result message from the confirmed operation
+
+        Returns:
+            str: Handle id for get()
+        """
+        with self._lock:
+            handle_id = f"tx-{next(self._ids)}"
+            self._transactions[handle_id] = TrackedTransaction(
+                handle_id, kind, description, operation, on_confirmed)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run,
+                                                name="tx-tracker",
+                                                daemon=True)
+                self._thread.start()
+            self._wakeup.notify()
+        return handle_id
+
+    def get(self, handle_id: str) -> Optional[TrackedTransaction]:
+        with self._lock:
+            return self._transactions.get(handle_id)
+
+    def all(self) -> List[TrackedTransaction]:
+        with self._lock:
+            return list(self._transactions.values())
+
+    def pending(self) -> List[TrackedTransaction]:
+        with self._lock:
+            return [
+                tx for tx in self._transactions.values()
+                if tx.status == PENDING
+            ]
+
+    def add_listener(self, listener: Callable[[TrackedTransaction], None]):
+        """Call listener(tracked) whenever an operation confirms or fails."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def wait(self, handle_id: str,
+             timeout: Optional[float] = None) -> TrackedTransaction:
+        """Block until the operation leaves the pending state or timeout elapses."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._lock:
+            tracked = self._transactions[handle_id]
+            while tracked.status == PENDING:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._wakeup.wait(remaining)
+        return tracked
+
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=self._max_workers,
+                                thread_name_prefix="tx-poll") as pool:
+            while True:
+                with self._lock:
+                    while not any(tx.status == PENDING
+                                  for tx in self._transactions.values()):
+                        self._wakeup.wait()
+                pending = self.pending()
+                finished = [
+                    tx for tx in pool.map(self._poll, pending) if tx is not None
+                ]
+                with self._lock:
+                    listeners = list(self._listeners)
+                    if finished:
+                        self._wakeup.notify_all()
+                for tracked in finished:
+                    for listener in listeners:
+                        try:
+                            listener(tracked)
+                        except Exception:
+                            pass
+                time.sleep(self.poll_interval)
+
+    def _poll(self, tracked: TrackedTransaction) -> Optional[TrackedTransaction]:
+        """Reload one operation; returns it if it reached a terminal state."""
+        try:
+            tracked.operation.reload()
+            status = tracked.operation.transaction.status
+        except Exception as e:
+            status = None
+            tracked.error = f"Error polling transaction: {str(e)}"
+
+        if status == Transaction.Status.COMPLETE:
+            result = None
+            if tracked.on_confirmed:
+                try:
+                    result = tracked.on_confirmed(tracked.operation)
+                except Exception as e:
+                    result = f"Confirmed, but building the result failed: {str(e)}"
+            with self._lock:
+                tracked.result = result
+                tracked.error = None
+                tracked.status = CONFIRMED
+                tracked.finished_at = time.time()
+            return tracked
+
+        if status == Transaction.Status.FAILED or (
+                time.time() - tracked.submitted_at > self.timeout):
+            with self._lock:
+                if status != Transaction.Status.FAILED:
+                    tracked.error = f"No confirmation after {self.timeout:.0f}s"
+                    tracked.timed_out = True
+                else:
+                    tracked.error = "Transaction failed onchain"
+                tracked.status = FAILED
+                tracked.finished_at = time.time()
+            return tracked
+
+        return None
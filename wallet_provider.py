@@ -0,0 +1,121 @@
+import json
+import os
+import sys
+import threading
+from typing import Optional
+
+from cdp import Wallet, WalletData
+
+
+class WalletProvider:
+    """
+    Lazily loads or creates the agent's CDP wallet on first real use.
+
+    Nothing touches the CDP API at construction time. The first access to
+    `wallet` reuses a persisted wallet when one is available, in this order:
+    exported wallet data (`Wallet.export_data().to_dict()` saved as JSON),
+    then a seed file written by `Wallet.save_seed`. Only when neither exists
+    is a new wallet created, and its seed is saved for the next start.
+    """
+
+    def __init__(self,
+                 network_id: str = "base-sepolia",
+                 seed_file: Optional[str] = "wallet_seed.json",
+                 wallet_data_file: Optional[str] = None,
+                 wallet_id: Optional[str] = None,
+                 encrypt_seed: bool = True):
+        """
+        Args:
+            network_id (str): Network the wallet lives on (e.g. "base-sepolia" or "base-mainnet")
+            seed_file (str): Seed file to load from, and to save new wallets to
+            wallet_data_file (str): JSON file with exported wallet data, checked before the seed file
+            wallet_id (str): Wallet to pick from the seed file; defaults to the first one on network_id
+            encrypt_seed (bool): Encrypt the seed when saving a newly created wallet
+        """
+        self._network_id = network_id
+        self.seed_file = seed_file
+        self.wallet_data_file = wallet_data_file
+        self.wallet_id = wallet_id
+        self.encrypt_seed = encrypt_seed
+        self._wallet: Optional[Wallet] = None
+        self._address_id: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def network_id(self) -> str:
+        """The wallet's network, known without loading the wallet."""
+        if self._wallet is not None:
+            return self._wallet.network_id
+        return self._network_id
+
+    @property
+    def loaded(self) -> bool:
+        """True once the wallet has been loaded or created."""
+        return self._wallet is not None
+
+    @property
+    def wallet(self) -> Wallet:
+        """The agent's wallet, loaded or created on first access."""
+        if self._wallet is None:
+            with self._lock:
+                if self._wallet is None:
+                    self._wallet = self._load_or_create()
+        return self._wallet
+
+    @property
+    def address_id(self) -> str:
+        """The wallet's default address, cached after the first lookup."""
+        if self._address_id is None:
+            self._address_id = self.wallet.default_address.address_id
+        return self._address_id
+
+    def set_wallet(self, wallet: Wallet):
+        """Use an already constructed wallet instead of loading one."""
+        with self._lock:
+            self._wallet = wallet
+            self._address_id = None
+
+    def request_faucet(self, asset_id: Optional[str] = None):
+        """
+        Request testnet funds for the wallet.
+
+        Returns:
+            FaucetTransaction: The faucet transaction
+        """
+        return self.wallet.faucet(asset_id)
+
+    def _load_or_create(self) -> Wallet:
+        if self.wallet_data_file and os.path.exists(self.wallet_data_file):
+            with open(self.wallet_data_file) as f:
+                wallet = Wallet.import_data(WalletData.from_dict(json.load(f)))
+            print(f"Loaded wallet {wallet.id} from {self.wallet_data_file}", file=sys.stderr)
+            return wallet
+
+        wallet_id = self._seed_file_wallet_id()
+        if wallet_id:
+            wallet = Wallet.fetch(wallet_id)
+            wallet.load_seed_from_file(self.seed_file)
+            print(f"Loaded wallet {wallet.id} from {self.seed_file}", file=sys.stderr)
+            return wallet
+
+        wallet = Wallet.create(network_id=self._network_id)
+        if self.seed_file:
+            wallet.save_seed_to_file(self.seed_file, encrypt=self.encrypt_seed)
+            print(f"Seed for wallet {wallet.id} saved to {self.seed_file} ({self._network_id})",
+                  file=sys.stderr)
+        return wallet
+
+    def _seed_file_wallet_id(self) -> Optional[str]:
+        if not self.seed_file or not os.path.exists(self.seed_file):
+            return None
+
+        with open(self.seed_file) as f:
+            seeds = json.load(f)
+
+        if self.wallet_id:
+            return self.wallet_id if self.wallet_id in seeds else None
+
+        for wallet_id, seed_data in seeds.items():
+            if seed_data.get("network_id", self._network_id) == self._network_id:
+                return wallet_id
+        return None